@@ -1,7 +1,42 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 
+import importlib
+
 __version__ = "0.0.1"
 __author__ = "Christoph Friedrich <christoph.friedrich@vonaffenfels.de>"
 
-from .core import RGBMatrix, FrameCanvas, RGBMatrixOptions
+__all__ = ["RGBMatrix", "FrameCanvas", "VirtualCanvas", "RGBMatrixOptions",
+           "PresentationQueue", "ConfigureRenderThread", "RegisterPixelMapper",
+           "FrameScheduler", "AdaptivePWMBits", "Compositor", "ParticleSystem"]
+
+# The extension modules are only loaded when one of their names is first
+# used, so that "import rgbmatrix" is cheap and scripts can bring up other
+# things (argument parsing, a placeholder frame, ...) before paying for it.
+# The graphics submodule is imported on demand by the regular import system.
+_LAZY_ATTRIBUTES = {
+    "RGBMatrix": "core",
+    "FrameCanvas": "core",
+    "VirtualCanvas": "core",
+    "RGBMatrixOptions": "core",
+    "PresentationQueue": "core",
+    "ConfigureRenderThread": "core",
+    "RegisterPixelMapper": "core",
+    "FrameScheduler": "scheduler",
+    "AdaptivePWMBits": "adaptive",
+    "Compositor": "compositor",
+    "ParticleSystem": "particles",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module("." + module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Pick pwmBits per frame from what the frame actually shows.
+
+Every bit plane costs refresh time, but flat colors, text and clocks need
+only a few of them. AdaptivePWMBits lowers each frame's pwmBits to the
+fewest that reproduce it (FrameCanvas.RequiredPWMBits()), which raises the
+refresh rate and reduces flicker, also on camera:
+
+    pwm = AdaptivePWMBits(matrix, tolerance=0.005)
+    while True:
+        draw(canvas)               # always drawn at full pwmBits
+        pwm.Apply(canvas)
+        canvas = pwm.Restore(matrix.SwapOnVSync(canvas))
+
+FrameScheduler does the same if given pwm=AdaptivePWMBits(...).
+
+More bits are taken as soon as a frame needs them; fewer only once frames
+needed fewer for hold_frames in a row, so content that alternates between
+simple and rich doesn't make the refresh rate (and brightness timing) jump
+back and forth. A scene that knows its content can pass hint instead of
+having every frame analysed.
+"""
+from __future__ import absolute_import
+
+
+class AdaptivePWMBits(object):
+    def __init__(self, matrix, tolerance=0.0, hold_frames=30, hint=None):
+        if not 0 <= tolerance < 1:
+            raise ValueError("tolerance must be in [0, 1)")
+        self.max_bits = matrix.pwmBits
+        self.tolerance = tolerance
+        self.hold_frames = hold_frames
+        self.hint = hint
+        self.bits = self.max_bits
+        self.changes = 0
+        self._calm_frames = 0
+        self._wanted = 0   # Most bits needed by a frame since the last change.
+
+    def Apply(self, canvas):
+        """Lower the pwmBits of a drawn canvas; call right before swapping."""
+        if self.hint is not None:
+            needed = min(self.hint, self.max_bits)
+        else:
+            needed = canvas.RequiredPWMBits(self.tolerance)
+        if needed >= self.bits:
+            if needed > self.bits:
+                self.bits = needed
+                self.changes += 1
+            self._calm_frames = 0
+            self._wanted = 0
+        else:
+            self._calm_frames += 1
+            self._wanted = max(self._wanted, needed)
+            if self._calm_frames >= self.hold_frames:
+                self.bits = self._wanted
+                self.changes += 1
+                self._calm_frames = 0
+                self._wanted = 0
+        canvas.pwmBits = self.bits
+        return canvas
+
+    def Restore(self, canvas):
+        """Give a canvas back its full pwmBits before drawing into it again."""
+        canvas.pwmBits = self.max_bits
+        return canvas
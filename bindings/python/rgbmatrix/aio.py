@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""asyncio integration: swap canvases without blocking the event loop.
+
+SwapOnVSync() blocks the calling thread until the refresh thread has shown
+the new frame. Here the swap is only scheduled (RGBMatrix.ScheduleSwapOnVSync)
+and the coroutine sleeps on the matrix' vsync eventfd, so rendering, network
+I/O and timers can share one event loop:
+
+    async def render_loop(matrix):
+        async for canvas in matrix.frames(framerate_fraction=5):
+            canvas.Clear()
+            draw(canvas)            # shown at the next vsync
+
+    async def poll():
+        while True:
+            state.update(await fetch())
+            await asyncio.sleep(5)
+
+    await asyncio.gather(render_loop(matrix), poll())
+
+Only one swap may be pending per matrix at a time.
+"""
+from __future__ import absolute_import
+
+import asyncio
+import os
+
+
+def _reset(fd):
+    try:
+        os.read(fd, 8)
+    except BlockingIOError:
+        pass
+
+
+def swap(matrix, canvas, framerate_fraction=1):
+    """Swap canvas in at the next vsync; returns a future of the old canvas.
+
+    The future resolves once the swap happened, so the returned canvas is
+    off-screen and can be drawn into. Must be called from a running loop.
+    """
+    loop = asyncio.get_running_loop()
+    fd = matrix.vsyncEventFd
+    if fd < 0:
+        raise RuntimeError("The matrix refresh thread is not running")
+    future = loop.create_future()
+    # A signal left over from a cancelled swap must not complete this one.
+    _reset(fd)
+    previous = matrix.ScheduleSwapOnVSync(canvas, framerate_fraction)
+
+    def on_vsync():
+        try:
+            os.read(fd, 8)
+        except BlockingIOError:
+            return
+        if not future.done():
+            future.set_result(previous)
+
+    def on_done(_):
+        # Also runs if the awaiting task was cancelled.
+        loop.remove_reader(fd)
+
+    loop.add_reader(fd, on_vsync)
+    future.add_done_callback(on_done)
+    return future
+
+
+async def frames(matrix, canvas=None, framerate_fraction=1):
+    """Yield canvases to draw into; each is swapped in on the next iteration."""
+    if canvas is None:
+        canvas = matrix.CreateFrameCanvas()
+    while True:
+        yield canvas
+        canvas = await swap(matrix, canvas, framerate_fraction)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Split the canvas into regions that update at their own pace.
+
+Each region is drawn by its own widget into a cached VirtualCanvas, and only
+when its interval is up; frames are assembled by copying regions over with
+VirtualCanvas.CopyRectTo(). A clock that changes once a second then costs a
+rectangle copy per frame instead of a redraw, and doesn't hold back a ticker
+scrolling next to it:
+
+    compositor = Compositor(matrix.CreateFrameCanvas())
+    compositor.Add(draw_clock, 0, 0, 32, 16, interval=1.0)
+    compositor.Add(draw_ticker, 0, 16, 64, 16)     # interval 0: every frame
+    while True:
+        compositor.Render(canvas)
+        canvas = matrix.SwapOnVSync(canvas)
+
+A widget is a callable widget(canvas, now), or an object with a
+Render(canvas, now) method. It gets a cleared canvas of its region's size and
+the time (time.monotonic()) of the frame. Regions are copied in the order
+they were added, so later ones cover earlier ones where they overlap.
+
+Each target canvas remembers which version of every region it holds, so with
+double buffering a region is copied into each buffer once after it changed,
+not on every frame.
+"""
+from __future__ import absolute_import
+
+import time
+
+from .core import VirtualCanvas
+
+
+class Region(object):
+    def __init__(self, widget, x, y, buffer, interval):
+        self.render = getattr(widget, "Render", widget)
+        self.x = x
+        self.y = y
+        self.buffer = buffer
+        self.interval = interval
+        self.version = 0
+        self.due = None     # Time of the next render, None for right away.
+
+    @property
+    def width(self):
+        return self.buffer.width
+
+    @property
+    def height(self):
+        return self.buffer.height
+
+    def Overlaps(self, other):
+        return (self.x < other.x + other.width and other.x < self.x + self.width
+                and self.y < other.y + other.height
+                and other.y < self.y + self.height)
+
+    def Invalidate(self):
+        """Render this region again with the next frame."""
+        self.due = None
+
+
+class Compositor(object):
+    def __init__(self, prototype):
+        self.prototype = prototype
+        self.regions = []
+        self.renders = 0
+        self.copies = 0
+        self._versions = {}     # Canvas -> region versions it shows.
+
+    def Add(self, widget, x, y, width, height, interval=0):
+        """Add a region drawn by widget every interval seconds (0 = every frame)."""
+        if interval < 0:
+            raise ValueError("interval must not be negative")
+        region = Region(widget, x, y,
+                        VirtualCanvas(self.prototype, width, height), interval)
+        self.regions.append(region)
+        self._versions.clear()
+        return region
+
+    def Remove(self, region):
+        self.regions.remove(region)
+        self._versions.clear()
+
+    def Invalidate(self):
+        """Render all regions again with the next frame."""
+        for region in self.regions:
+            region.Invalidate()
+
+    def Update(self, now=None):
+        """Render the regions that are due. Returns how many were."""
+        if now is None:
+            now = time.monotonic()
+        rendered = 0
+        for region in self.regions:
+            if region.due is not None and now < region.due:
+                continue
+            region.buffer.Clear()
+            region.render(region.buffer, now)
+            region.version += 1
+            # Keep the cadence, unless we fell behind by more than a period.
+            if region.due is None or now - region.due >= region.interval:
+                region.due = now + region.interval
+            else:
+                region.due += region.interval
+            rendered += 1
+        self.renders += rendered
+        return rendered
+
+    def Render(self, canvas, now=None):
+        """Update due regions and bring them into canvas. Returns canvas."""
+        self.Update(now)
+        versions = self._versions.get(canvas)
+        if versions is None:
+            # Unknown canvas: the space between regions may hold anything.
+            canvas.Clear()
+            versions = self._versions[canvas] = [0] * len(self.regions)
+        copied = []
+        for index, region in enumerate(self.regions):
+            # A region must also go on top again of anything copied below it.
+            if (versions[index] != region.version
+                    or any(region.Overlaps(other) for other in copied)):
+                region.buffer.CopyRectTo(0, 0, region.width, region.height,
+                                         canvas, region.x, region.y)
+                versions[index] = region.version
+                copied.append(region)
+        self.copies += len(copied)
+        return canvas
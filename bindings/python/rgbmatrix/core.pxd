@@ -1,14 +1,45 @@
 # cython: language_level=3str
+from libc.stdint cimport uint8_t
 from . cimport cppinc
 
 cdef class Canvas:
-    cdef cppinc.Canvas *_getCanvas(self) except *
+    # Set once when the wrapper is created and never changed, so reading it
+    # needs no virtual call. NULL for the canvas a swap returns while no
+    # refresh thread is running.
+    cdef cppinc.Canvas *_canvas
+
+    cdef inline cppinc.Canvas *_getCanvas(self) except NULL:
+        if self._canvas == NULL:
+            raise Exception("Canvas was destroyed or not initialized, you cannot use this object anymore")
+        return self._canvas
 
 cdef class FrameCanvas(Canvas):
     cdef cppinc.FrameCanvas *__canvas
+    # Optional readable RGB copy of the canvas, see EnableShadow(). The
+    # shadow is shared by all canvases it was swapped through; __committed
+    # is what this canvas last encoded into its bitplanes.
+    cdef bytearray __shadow
+    cdef bytearray __committed
+    cdef bint __shadow_stale
+    cdef _adoptShadow(self, bytearray shadow)
+
+cdef class VirtualCanvas(Canvas):
+    cdef cppinc.VirtualCanvas *__canvas
+    cdef FrameCanvas __prototype
 
 cdef class RGBMatrix(Canvas):
     cdef cppinc.RGBMatrix *__matrix
+    # FrameCanvas wrappers by C++ pointer, so swaps return the same objects.
+    cdef dict __canvases
+    cdef FrameCanvas __wrapFrameCanvas(self, cppinc.FrameCanvas *canvas)
+    # The canvas handed to the last real swap, i.e. the one on the panel.
+    cdef FrameCanvas __active
+    cdef unsigned long __swaps_requested
+    cdef unsigned long __swaps_skipped
+
+cdef class PresentationQueue:
+    cdef cppinc.PresentationQueue *__queue
+    cdef RGBMatrix __matrix
 
 cdef class RGBMatrixOptions:
     cdef cppinc.Options __options
@@ -21,6 +52,53 @@ cdef class RGBMatrixOptions:
     cdef bytes __py_encoded_panel_type
     cdef bytes __py_encoded_drop_priv_user
     cdef bytes __py_encoded_drop_priv_group
+    # Applied to the thread creating the RGBMatrix, see ConfigureRenderThread().
+    cdef int __render_cpu_mask
+    cdef int __render_priority
+    cdef bint __lock_memory
+
+# C-level API for compiled renderers that `cimport rgbmatrix.core`. These
+# bypass Python method dispatch and can all be called without the GIL once
+# the canvas pointer has been fetched; fetching it raises for a canvas
+# without one.
+
+cdef inline cppinc.Canvas *canvas_ptr(Canvas canvas) except NULL:
+    return canvas._getCanvas()
+
+cdef inline cppinc.FrameCanvas *frame_canvas_ptr(FrameCanvas canvas) except NULL:
+    return <cppinc.FrameCanvas*>canvas._getCanvas()
+
+cdef inline void set_pixel(cppinc.Canvas *canvas, int x, int y,
+                           uint8_t red, uint8_t green, uint8_t blue) noexcept nogil:
+    canvas.SetPixel(x, y, red, green, blue)
+
+# Writes width packed RGB pixels starting at (x, y), clipped to the canvas.
+cdef inline void set_row(cppinc.Canvas *canvas, int x, int y, int width,
+                         const uint8_t *rgb) noexcept nogil:
+    cdef int col
+    cdef int col_start = -x if x < 0 else 0
+    cdef int col_end = canvas.width() - x
+    if y < 0 or y >= canvas.height():
+        return
+    if col_end > width:
+        col_end = width
+    for col in range(col_start, col_end):
+        canvas.SetPixel(x + col, y, rgb[col * 3], rgb[col * 3 + 1], rgb[col * 3 + 2])
+
+cdef inline void fill_rect(cppinc.Canvas *canvas, int x, int y, int width, int height,
+                           uint8_t red, uint8_t green, uint8_t blue) noexcept nogil:
+    cdef int row, col
+    cdef int x_start = x if x > 0 else 0
+    cdef int y_start = y if y > 0 else 0
+    cdef int x_end = x + width
+    cdef int y_end = y + height
+    if x_end > canvas.width():
+        x_end = canvas.width()
+    if y_end > canvas.height():
+        y_end = canvas.height()
+    for row in range(y_start, y_end):
+        for col in range(x_start, x_end):
+            canvas.SetPixel(col, row, red, green, blue)
 
 # Local Variables:
 # mode: python
@@ -1,8 +1,13 @@
 # distutils: language = c++
 
 from libcpp cimport bool
-from libc.stdint cimport uint8_t, uint32_t, uintptr_t
+from libc.stdint cimport uint8_t, uint32_t, int64_t, uintptr_t
+from libc.string cimport memcmp, memcpy
+from libc.errno cimport errno
+from libcpp.vector cimport vector
+from posix.mman cimport mlockall, MCL_CURRENT, MCL_FUTURE
 import cython
+import os
 
 cdef extern from "Python.h":
     void* PyCapsule_GetPointer(object capsule, const char* name)
@@ -21,9 +26,6 @@ cdef int** get_pillow_buffer(object capsule):
     return get_image32(image)
 
 cdef class Canvas:
-    cdef cppinc.Canvas* _getCanvas(self) except *:
-        raise Exception("Not implemented")
-
     def SetImage(self, image, int offset_x = 0, int offset_y = 0, unsafe=True):
         if (image.mode != "RGB"):
             raise Exception("Currently, only RGB mode is supported for SetImage(). Please create images with mode 'RGB' or convert first with image = image.convert('RGB'). Pull requests to support more modes natively are also welcome :)")
@@ -67,24 +69,109 @@ cdef class Canvas:
                 b = (pixel >> 16) & 0xFF
                 my_canvas.SetPixel(xstart+col, ystart+row, r, g, b)
 
-cdef class FrameCanvas(Canvas):
-    def __dealloc__(self):
-        if <void*>self.__canvas != NULL:
-            self.__canvas = NULL
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def SetPixelsRGB(self, int xstart, int ystart, int width, int height, data):
+        # Bulk write of packed 24-bit RGB rows from any C-contiguous buffer
+        # (bytes, bytearray, memoryview, shared memory, numpy array).
+        cdef const uint8_t[::1] buffer = memoryview(data).cast('B')
+        cdef cppinc.Canvas* my_canvas = self._getCanvas()
+        cdef int row, row_start, row_end
 
-    cdef cppinc.Canvas* _getCanvas(self) except *:
-        if <void*>self.__canvas != NULL:
-            return self.__canvas
-        raise Exception("Canvas was destroyed or not initialized, you cannot use this object anymore")
+        if buffer.shape[0] < width * height * 3:
+            raise ValueError("Buffer too small for %dx%d RGB pixels" % (width, height))
+
+        row_start = max(0, -ystart)
+        row_end = min(height, my_canvas.height() - ystart)
+        if width <= 0 or row_start >= row_end:
+            return
+
+        with nogil:
+            for row in range(row_start, row_end):
+                set_row(my_canvas, xstart, ystart + row, width, &buffer[row * width * 3])
+
+cdef class FrameCanvas(Canvas):
+    def __cinit__(self):
+        if not _creating_frame_canvas:
+            raise TypeError("Use RGBMatrix.CreateFrameCanvas() to create a FrameCanvas")
 
     def Fill(self, uint8_t red, uint8_t green, uint8_t blue):
         (<cppinc.FrameCanvas*>self._getCanvas()).Fill(red, green, blue)
+        if self.__shadow is not None:
+            self.__shadow[:] = bytes((red, green, blue)) * (len(self.__shadow) // 3)
+            self.__committed[:] = self.__shadow
 
     def Clear(self):
         (<cppinc.FrameCanvas*>self._getCanvas()).Clear()
+        if self.__shadow is not None:
+            self.__shadow[:] = bytes(len(self.__shadow))
+            self.__committed[:] = self.__shadow
 
     def SetPixel(self, int x, int y, uint8_t red, uint8_t green, uint8_t blue):
-        (<cppinc.FrameCanvas*>self._getCanvas()).SetPixel(x, y, red, green, blue)
+        cdef cppinc.Canvas* my_canvas = self._getCanvas()
+        cdef int offset
+        my_canvas.SetPixel(x, y, red, green, blue)
+        if self.__shadow is not None and 0 <= x < my_canvas.width() and 0 <= y < my_canvas.height():
+            offset = (y * my_canvas.width() + x) * 3
+            self.__shadow[offset] = self.__committed[offset] = red
+            self.__shadow[offset + 1] = self.__committed[offset + 1] = green
+            self.__shadow[offset + 2] = self.__committed[offset + 2] = blue
+
+    # The bitplane framebuffer cannot be read back. EnableShadow() adds a
+    # packed RGB copy of the canvas (row-major, 3 bytes per pixel) that can
+    # be read and written through the `shadow` memoryview, e.g. for fades or
+    # feedback effects:
+    #
+    #   canvas.EnableShadow()
+    #   pixels = numpy.asarray(canvas.shadow).reshape(canvas.height, canvas.width, 3)
+    #   while True:
+    #       pixels //= 2               # modify in place
+    #       canvas.Commit()            # encode the rows that changed
+    #       canvas = matrix.SwapOnVSync(canvas)
+    #
+    # SwapOnVSync() hands the same shadow to the returned canvas, so the view
+    # stays valid and always holds the latest image. Commit() compares rows
+    # against what this canvas last encoded and only re-encodes the changed
+    # ones. SetPixel/Fill/Clear keep the shadow in sync; drawing through
+    # rgbmatrix.graphics or SetImage does not, so mix those with care.
+    def EnableShadow(self):
+        if self.__shadow is None:
+            self._adoptShadow(bytearray(self.width * self.height * 3))
+
+    cdef _adoptShadow(self, bytearray shadow):
+        self.__shadow = shadow
+        self.__committed = bytearray(len(shadow))
+        self.__shadow_stale = True  # canvas content unknown, commit all rows
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def Commit(self):
+        if self.__shadow is None:
+            raise RuntimeError("Shadow buffer not enabled, call EnableShadow() first")
+        cdef cppinc.Canvas* my_canvas = self._getCanvas()
+        cdef int width = my_canvas.width()
+        cdef int height = my_canvas.height()
+        cdef int stride = width * 3
+        cdef uint8_t *shadow = <uint8_t*><char*>self.__shadow
+        cdef uint8_t *committed = <uint8_t*><char*>self.__committed
+        cdef bint stale = self.__shadow_stale
+        cdef int row, offset, changed = 0
+
+        with nogil:
+            for row in range(height):
+                offset = row * stride
+                if stale or memcmp(shadow + offset, committed + offset, stride) != 0:
+                    set_row(my_canvas, 0, row, width, shadow + offset)
+                    memcpy(committed + offset, shadow + offset, stride)
+                    changed += 1
+        self.__shadow_stale = False
+        return changed
+
+    property shadow:
+        def __get__(self):
+            if self.__shadow is None:
+                return None
+            return memoryview(self.__shadow)
 
 
     property width:
@@ -97,11 +184,135 @@ cdef class FrameCanvas(Canvas):
         def __get__(self): return (<cppinc.FrameCanvas*>self._getCanvas()).pwmbits()
         def __set__(self, pwmBits): (<cppinc.FrameCanvas*>self._getCanvas()).SetPWMBits(pwmBits)
 
+    # Fewest pwmBits that show the current content with no color channel off
+    # by more than tolerance (fraction of full brightness). Draw at full
+    # pwmBits, then lower them to this before swapping; see AdaptivePWMBits.
+    def RequiredPWMBits(self, float tolerance = 0):
+        cdef cppinc.FrameCanvas *canvas = <cppinc.FrameCanvas*>self._getCanvas()
+        cdef uint8_t bits
+        with nogil:
+            bits = canvas.RequiredPWMBits(tolerance)
+        return bits
+
     property brightness:
         def __get__(self): return (<cppinc.FrameCanvas*>self._getCanvas()).brightness()
         def __set__(self, val): (<cppinc.FrameCanvas*>self._getCanvas()).SetBrightness(val)
 
 
+# Content of any size, typically larger than the panel, that is encoded into
+# the panel's bitplane format once when it is drawn. CopyViewportTo() then
+# shows any window of it by copying pre-encoded rows, so scrolling costs the
+# same per frame no matter how large or complex the content is:
+#
+#   virtual = VirtualCanvas(canvas, text_width, canvas.height)
+#   graphics.DrawText(virtual, font, 0, 20, color, text)
+#   for x in itertools.count():
+#       virtual.CopyViewportTo(x, 0, canvas)   # wraps around at the edges
+#       canvas = matrix.SwapOnVSync(canvas)
+#
+# The prototype is any FrameCanvas of the matrix the content is shown on;
+# its brightness and luminance correction apply to pixels drawn afterwards.
+# Like drawing through rgbmatrix.graphics, copying a viewport bypasses the
+# target's shadow buffer.
+cdef class VirtualCanvas(Canvas):
+    def __cinit__(self, FrameCanvas prototype not None, int width, int height):
+        if width <= 0 or height <= 0:
+            raise ValueError("VirtualCanvas size must be positive, got %dx%d" % (width, height))
+        self.__canvas = new cppinc.VirtualCanvas(frame_canvas_ptr(prototype), width, height)
+        self._canvas = self.__canvas
+        self.__prototype = prototype
+
+    def __dealloc__(self):
+        if <void*>self.__canvas != NULL:
+            del self.__canvas
+
+    def Fill(self, uint8_t red, uint8_t green, uint8_t blue):
+        self.__canvas.Fill(red, green, blue)
+
+    def Clear(self):
+        self.__canvas.Clear()
+
+    def SetPixel(self, int x, int y, uint8_t red, uint8_t green, uint8_t blue):
+        self.__canvas.SetPixel(x, y, red, green, blue)
+
+    def CopyViewportTo(self, int x, int y, FrameCanvas target not None):
+        cdef cppinc.FrameCanvas *dest = frame_canvas_ptr(target)
+        with nogil:
+            self.__canvas.CopyViewportTo(x, y, dest)
+
+    def CopyRectTo(self, int x, int y, int width, int height,
+                   FrameCanvas target not None, int target_x, int target_y):
+        cdef cppinc.FrameCanvas *dest = frame_canvas_ptr(target)
+        with nogil:
+            self.__canvas.CopyRectTo(x, y, width, height, dest,
+                                     target_x, target_y)
+
+    property width:
+        def __get__(self): return self.__canvas.width()
+
+    property height:
+        def __get__(self): return self.__canvas.height()
+
+
+def ConfigureRenderThread(cpu_mask=0, priority=0, lock_memory=False):
+    """Pin the calling thread to the CPUs in cpu_mask (0 = leave as is), give
+    it SCHED_FIFO priority (1..99, 0 = leave as is) and optionally lock all
+    current and future memory of the process so page faults can't stall a
+    frame. Raises OSError if the kernel refuses, typically for lack of root.
+
+    Keep cpu_mask clear of RGBMatrixOptions.refresh_cpu_mask, so rendering
+    never competes with the refresh thread for its core.
+    """
+    if cpu_mask:
+        os.sched_setaffinity(0, [cpu for cpu in range(cpu_mask.bit_length())
+                                 if cpu_mask & (1 << cpu)])
+    if priority:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+    if lock_memory and mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        raise OSError(errno, os.strerror(errno))
+
+def RegisterPixelMapper(name, mapper, int width, int height):
+    """Register mapper as a pixel mapper called name, for use in
+    RGBMatrixOptions.pixel_mapper_config (e.g. "Rotate:90;MyWall").
+
+    mapper(x, y) is called once for every pixel of the width x height
+    visible canvas and returns the matrix position (x, y) it is shown at, or
+    None for pixels that are not shown. The result is kept as a lookup table
+    in the library, so drawing never calls back into Python. Names are
+    case-insensitive and can only be registered once, since the library
+    keeps every mapper for the lifetime of the process.
+    """
+    cdef vector[int] table
+    cdef int x, y
+    if width <= 0 or height <= 0:
+        raise ValueError("Mapper size must be positive, got %dx%d" % (width, height))
+    if not name or ";" in name or ":" in name:
+        raise ValueError("Invalid pixel mapper name %r" % (name,))
+    registered = [n.decode('utf-8').lower() for n in cppinc.GetAvailablePixelMappers()]
+    if name.lower() in registered:
+        raise ValueError("Pixel mapper %r is already registered" % (name,))
+    table.reserve(2 * width * height)
+    used = {}
+    for y in range(height):
+        for x in range(width):
+            position = mapper(x, y)
+            if position is None:
+                table.push_back(-1)
+                table.push_back(-1)
+                continue
+            matrix_x, matrix_y = position
+            if matrix_x < 0 or matrix_y < 0:
+                raise ValueError("(%d, %d) mapped to negative position (%d, %d)"
+                                 % (x, y, matrix_x, matrix_y))
+            other = used.setdefault((matrix_x, matrix_y), (x, y))
+            if other != (x, y):
+                raise ValueError("(%d, %d) and (%d, %d) both mapped to (%d, %d)"
+                                 % (other + (x, y, matrix_x, matrix_y)))
+            table.push_back(matrix_x)
+            table.push_back(matrix_y)
+    cppinc.RegisterPixelMapper(new cppinc.LookupTablePixelMapper(
+        name.encode('utf-8'), width, height, table))
+
 cdef class RGBMatrixOptions:
     def __cinit__(self):
         self.__options = cppinc.Options()
@@ -192,6 +403,28 @@ cdef class RGBMatrixOptions:
         def __get__(self): return self.__options.limit_refresh_rate_hz
         def __set__(self, value): self.__options.limit_refresh_rate_hz = value
 
+    property refresh_priority:
+        def __get__(self): return self.__options.refresh_priority
+        def __set__(self, uint8_t value): self.__options.refresh_priority = value
+
+    property refresh_cpu_mask:
+        def __get__(self): return self.__options.refresh_cpu_mask
+        def __set__(self, uint32_t value): self.__options.refresh_cpu_mask = value
+
+    # Render thread properties, applied by RGBMatrix to the creating thread
+
+    property render_cpu_mask:
+        def __get__(self): return self.__render_cpu_mask
+        def __set__(self, uint32_t value): self.__render_cpu_mask = value
+
+    property render_priority:
+        def __get__(self): return self.__render_priority
+        def __set__(self, uint8_t value): self.__render_priority = value
+
+    property lock_memory:
+        def __get__(self): return self.__lock_memory
+        def __set__(self, value): self.__lock_memory = value
+
 
     # RuntimeOptions properties
 
@@ -235,17 +468,32 @@ cdef class RGBMatrix(Canvas):
         if parallel > 0:
             options.parallel = parallel
 
+        # Before creating the matrix, while we still have the privileges. The
+        # refresh thread starts from these settings and then applies its own.
+        ConfigureRenderThread(options.__render_cpu_mask,
+                              options.__render_priority, options.__lock_memory)
+
         self.__matrix = cppinc.CreateMatrixFromOptions(options.__options,
             options.__runtime_options)
+        if <void*>self.__matrix == NULL:
+            raise RuntimeError("Failed to initialize the LED matrix")
+        self._canvas = self.__matrix
+        self.__canvases = {}
 
     def __dealloc__(self):
-        self.__matrix.Clear()
-        del self.__matrix
-
-    cdef cppinc.Canvas* _getCanvas(self) except *:
         if <void*>self.__matrix != NULL:
-            return self.__matrix
-        raise Exception("Canvas was destroyed or not initialized, you cannot use this object anymore")
+            self.__matrix.Clear()
+            del self.__matrix
+
+    cdef FrameCanvas __wrapFrameCanvas(self, cppinc.FrameCanvas *canvas):
+        # The C++ side only cycles between the canvases it created, so after
+        # the first round every swap is a dict hit instead of an allocation.
+        key = <uintptr_t>canvas
+        cdef FrameCanvas wrapper = self.__canvases.get(key)
+        if wrapper is None:
+            wrapper = __createFrameCanvas(canvas)
+            self.__canvases[key] = wrapper
+        return wrapper
 
     def Fill(self, uint8_t red, uint8_t green, uint8_t blue):
         self.__matrix.Fill(red, green, blue)
@@ -257,7 +505,7 @@ cdef class RGBMatrix(Canvas):
         self.__matrix.Clear()
 
     def CreateFrameCanvas(self):
-        return __createFrameCanvas(self.__matrix.CreateFrameCanvas())
+        return self.__wrapFrameCanvas(self.__matrix.CreateFrameCanvas())
 
     # The optional "framerate_fraction" parameter allows to choose which
     # multiple of the global frame-count to use. So it slows down your animation
@@ -267,8 +515,66 @@ cdef class RGBMatrix(Canvas):
     # 28Hz animation, nicely locked to the refresh-rate).
     # If you combine this with RGBMatrixOptions.limit_refresh_rate_hz you can create
     # time-correct animations.
-    def SwapOnVSync(self, FrameCanvas newFrame, uint8_t framerate_fraction = 1):
-        return __createFrameCanvas(self.__matrix.SwapOnVSync(newFrame.__canvas, framerate_fraction))
+    #
+    # With skip_unchanged, a newFrame whose encoded content is identical to
+    # the canvas on the panel is not swapped: the call returns newFrame right
+    # away without waiting for vsync, so the caller can keep drawing into it
+    # (and should pace itself, e.g. sleep until the content changes). See
+    # swapsRequested and swapsSkipped for how often that happened.
+    def SwapOnVSync(self, FrameCanvas newFrame not None, uint8_t framerate_fraction = 1,
+                    bint skip_unchanged = False):
+        cdef cppinc.FrameCanvas *new_canvas = frame_canvas_ptr(newFrame)
+        self.__swaps_requested += 1
+        if (skip_unchanged and self.__active is not None and self.__active is not newFrame
+                and _same_content(new_canvas, self.__active.__canvas)):
+            self.__swaps_skipped += 1
+            return newFrame
+        cdef FrameCanvas previous = self.__wrapFrameCanvas(
+            self.__matrix.SwapOnVSync(new_canvas, framerate_fraction))
+        self.__active = newFrame
+        if newFrame.__shadow is not None and previous.__shadow is not newFrame.__shadow:
+            previous._adoptShadow(newFrame.__shadow)
+        return previous
+
+    # Non-blocking SwapOnVSync(): newFrame (or nothing, if None) is swapped
+    # in at the next vsync, and the canvas on display until then is returned
+    # right away. Don't draw into it before vsyncEventFd has become readable;
+    # swap() and frames() below do that waiting on an asyncio event loop.
+    def ScheduleSwapOnVSync(self, FrameCanvas newFrame, uint8_t framerate_fraction = 1):
+        cdef cppinc.FrameCanvas *previous_canvas = self.__matrix.ScheduleSwapOnVSync(
+            frame_canvas_ptr(newFrame) if newFrame is not None else NULL, framerate_fraction)
+        if previous_canvas == NULL:
+            raise RuntimeError("The matrix refresh thread is not running")
+        cdef FrameCanvas previous = self.__wrapFrameCanvas(previous_canvas)
+        if newFrame is None:
+            return previous
+        self.__active = newFrame
+        if newFrame.__shadow is not None and previous.__shadow is not newFrame.__shadow:
+            previous._adoptShadow(newFrame.__shadow)
+        return previous
+
+    property vsyncEventFd:
+        def __get__(self): return self.__matrix.VSyncEventFd()
+
+    # asyncio versions of SwapOnVSync() and a render loop, see rgbmatrix.aio:
+    #
+    #   canvas = await matrix.swap(canvas)
+    #
+    #   async for canvas in matrix.frames():
+    #       draw(canvas)
+    def swap(self, FrameCanvas newFrame not None, uint8_t framerate_fraction = 1):
+        from .aio import swap
+        return swap(self, newFrame, framerate_fraction)
+
+    def frames(self, FrameCanvas canvas = None, uint8_t framerate_fraction = 1):
+        from .aio import frames
+        return frames(self, canvas, framerate_fraction)
+
+    property swapsRequested:
+        def __get__(self): return self.__swaps_requested
+
+    property swapsSkipped:
+        def __get__(self): return self.__swaps_skipped
 
     property luminanceCorrect:
         def __get__(self): return self.__matrix.luminance_correct()
@@ -288,9 +594,104 @@ cdef class RGBMatrix(Canvas):
     property width:
         def __get__(self): return self.__matrix.width()
 
-cdef __createFrameCanvas(cppinc.FrameCanvas* newCanvas):
-    canvas = FrameCanvas()
+# Shows pre-rendered frames at given times from a native thread, so that a
+# bursty producer (network receiver, decoder) can render ahead instead of
+# blocking on every vsync:
+#
+#   queue = PresentationQueue(matrix, depth=3)
+#   start = time.monotonic()
+#   for n, frame in enumerate(frames):
+#       canvas = queue.Acquire()         # waits until a canvas is free
+#       canvas.SetPixelsRGB(0, 0, width, height, frame)
+#       queue.Present(canvas, start + n / fps)
+#
+# Times are time.monotonic() seconds; frames that are due already are shown
+# at the next refresh, and of several due frames only the newest is shown.
+# Shown frames are recycled once the next one replaced them. Don't call
+# matrix.SwapOnVSync() while a queue is in use.
+cdef class PresentationQueue:
+    def __cinit__(self, RGBMatrix matrix not None, int depth = 3):
+        if depth < 2:
+            raise ValueError("depth must be at least 2")
+        self.__queue = new cppinc.PresentationQueue(matrix.__matrix, depth)
+        self.__matrix = matrix
+        # Swaps now happen behind SwapOnVSync()'s back.
+        matrix.__active = None
+
+    def __dealloc__(self):
+        if <void*>self.__queue != NULL:
+            del self.__queue
+
+    # Returns a free FrameCanvas, waiting up to timeout seconds (forever if
+    # None) for one; None on timeout. It still holds what was drawn before.
+    def Acquire(self, timeout = None):
+        cdef long timeout_ms = -1 if timeout is None else <long>(timeout * 1000)
+        cdef cppinc.FrameCanvas *canvas
+        with nogil:
+            canvas = self.__queue.AcquireFrame(timeout_ms)
+        if canvas == NULL:
+            return None
+        return self.__matrix.__wrapFrameCanvas(canvas)
+
+    # Both raise ValueError for a canvas that is not currently acquired, e.g.
+    # one presented or released already.
+    def Present(self, FrameCanvas canvas not None, double at = 0):
+        cdef cppinc.FrameCanvas *frame = frame_canvas_ptr(canvas)
+        cdef bint acquired
+        with nogil:
+            acquired = self.__queue.Present(frame, <int64_t>(at * 1e6))
+        if not acquired:
+            raise ValueError("Canvas was not acquired from this queue")
+
+    # Hand back an acquired canvas without showing it.
+    def Release(self, FrameCanvas canvas not None):
+        if not self.__queue.Release(frame_canvas_ptr(canvas)):
+            raise ValueError("Canvas was not acquired from this queue")
+
+    property queued:
+        def __get__(self): return self.__queue.queued()
+
+    property framesPresented:
+        def __get__(self): return self.__queue.frames_presented()
+
+    property framesDropped:
+        def __get__(self): return self.__queue.frames_dropped()
+
+    # Seconds between a frame's presentation time and the swap showing it.
+    property meanLateness:
+        def __get__(self):
+            presented = self.__queue.frames_presented()
+            return self.__queue.total_lateness_us() / 1e6 / presented if presented else 0.0
+
+    property maxLateness:
+        def __get__(self): return self.__queue.max_lateness_us() / 1e6
+
+# Compares the encoded bitplanes, which is cheaper than hashing RGB and also
+# catches differences in brightness or PWM bits.
+cdef bint _same_content(cppinc.FrameCanvas *a, cppinc.FrameCanvas *b):
+    cdef const char *a_data
+    cdef const char *b_data
+    cdef size_t a_len, b_len
+    cdef bint same
+    if a.pwmbits() != b.pwmbits():
+        return False
+    with nogil:
+        a.Serialize(&a_data, &a_len)
+        b.Serialize(&b_data, &b_len)
+        same = a_len == b_len and memcmp(a_data, b_data, a_len) == 0
+    return same
+
+cdef bint _creating_frame_canvas = False
+
+cdef FrameCanvas __createFrameCanvas(cppinc.FrameCanvas* newCanvas):
+    global _creating_frame_canvas
+    _creating_frame_canvas = True
+    try:
+        canvas = FrameCanvas()
+    finally:
+        _creating_frame_canvas = False
     canvas.__canvas = newCanvas
+    canvas._canvas = newCanvas
     return canvas
 
 # Local Variables:
@@ -1,5 +1,8 @@
 from libcpp cimport bool
-from libc.stdint cimport uint8_t, uint32_t
+from libcpp.string cimport string
+from libcpp.vector cimport vector
+from libc.stdint cimport uint8_t, uint32_t, int64_t, uint64_t
+from libc.stddef cimport size_t
 
 ########################
 ### External classes ###
@@ -7,8 +10,8 @@ from libc.stdint cimport uint8_t, uint32_t
 
 cdef extern from "canvas.h" namespace "rgb_matrix":
     cdef cppclass Canvas:
-        int width()
-        int height()
+        int width() nogil
+        int height() nogil
         void SetPixel(int, int, uint8_t, uint8_t, uint8_t) nogil
         void Clear() nogil
         void Fill(uint8_t, uint8_t, uint8_t) nogil
@@ -23,13 +26,23 @@ cdef extern from "led-matrix.h" namespace "rgb_matrix":
         uint8_t brightness()
         FrameCanvas *CreateFrameCanvas()
         FrameCanvas *SwapOnVSync(FrameCanvas*, uint8_t)
+        FrameCanvas *ScheduleSwapOnVSync(FrameCanvas*, uint8_t)
+        int VSyncEventFd()
 
     cdef cppclass FrameCanvas(Canvas):
+        void SubFill(int, int, int, int, uint8_t, uint8_t, uint8_t) nogil
+        void Serialize(const char**, size_t*) nogil
         bool SetPWMBits(uint8_t)
         uint8_t pwmbits()
+        uint8_t RequiredPWMBits(float) nogil
         void SetBrightness(uint8_t)
         uint8_t brightness()
 
+    cdef cppclass VirtualCanvas(Canvas):
+        VirtualCanvas(FrameCanvas*, int, int) except +
+        void CopyViewportTo(int, int, FrameCanvas*) nogil
+        void CopyRectTo(int, int, int, int, FrameCanvas*, int, int) nogil
+
     struct RuntimeOptions:
       RuntimeOptions() except +
       int gpio_slowdown
@@ -43,6 +56,30 @@ cdef extern from "led-matrix.h" namespace "rgb_matrix":
 
 
 
+cdef extern from "presentation-queue.h" namespace "rgb_matrix":
+    cdef cppclass PresentationQueue:
+        PresentationQueue(RGBMatrix*, int) except +
+        FrameCanvas *AcquireFrame(long) nogil
+        bint Present(FrameCanvas*, int64_t) nogil
+        bint Release(FrameCanvas*)
+        int queued()
+        uint64_t frames_presented()
+        uint64_t frames_dropped()
+        int64_t total_lateness_us()
+        int64_t max_lateness_us()
+
+
+cdef extern from "pixel-mapper.h" namespace "rgb_matrix":
+    cdef cppclass PixelMapper:
+        pass
+
+    cdef cppclass LookupTablePixelMapper(PixelMapper):
+        LookupTablePixelMapper(const char*, int, int, const vector[int]&) except +
+
+    void RegisterPixelMapper(PixelMapper*)
+    vector[string] GetAvailablePixelMappers()
+
+
 cdef extern from "led-matrix.h" namespace "rgb_matrix::RGBMatrix":
     cdef struct Options:
         Options() except +
@@ -61,6 +98,8 @@ cdef extern from "led-matrix.h" namespace "rgb_matrix::RGBMatrix":
         int multiplexing
         int pwm_dither_bits
         int limit_refresh_rate_hz
+        int refresh_priority
+        int refresh_cpu_mask
 
         bool disable_hardware_pulsing
         bool show_refresh_rate
@@ -83,8 +122,8 @@ cdef extern from "graphics.h" namespace "rgb_matrix":
         int height()
         int baseline()
         int CharacterWidth(uint32_t)
-        int DrawGlyph(Canvas*, int, int, const Color, uint32_t);
+        int DrawGlyph(Canvas*, int, int, const Color, uint32_t) nogil
 
     cdef int DrawText(Canvas*, const Font, int, int, const Color, const char*)
     cdef void DrawCircle(Canvas*, int, int, int, const Color)
-    cdef void DrawLine(Canvas*, int, int, int, int, const Color)
+    cdef void DrawLine(Canvas*, int, int, int, int, const Color) nogil
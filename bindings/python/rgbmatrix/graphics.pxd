@@ -1,4 +1,5 @@
 # cython: language_level=3str
+from libc.stdint cimport uint32_t
 from . cimport cppinc
 
 cdef class Color:
@@ -7,6 +8,34 @@ cdef class Color:
 cdef class Font:
     cdef cppinc.Font __font
 
+cdef class TrueTypeFont:
+    cdef object __font
+    # Glyphs by code point, least recently used first; their alpha bitmaps
+    # are in slots of __atlas, each __cell_width * __cell_height bytes.
+    cdef object __glyphs
+    cdef bytearray __atlas
+    cdef int __cell_width
+    cdef int __cell_height
+    cdef int __cache_size
+    cdef int __ascent
+    cdef int __descent
+    cdef readonly int hits
+    cdef readonly int misses
+    cdef _resetAtlas(self, int cell_width, int cell_height)
+    cdef tuple _glyph(self, uint32_t char)
+
+# C-level API, see core.pxd.
+
+cdef inline cppinc.Font *font_ptr(Font font):
+    return &font.__font
+
+cdef inline cppinc.Color color_value(Color color):
+    return color.__color
+
+cdef inline int draw_glyph(cppinc.Canvas *canvas, cppinc.Font *font, int x, int y,
+                           cppinc.Color color, uint32_t codepoint) noexcept nogil:
+    return font.DrawGlyph(canvas, x, y, color, codepoint)
+
 # Local Variables:
 # mode: python
 # End:
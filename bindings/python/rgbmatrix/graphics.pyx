@@ -1,7 +1,13 @@
 # distutils: language = c++
 
 from libcpp cimport bool
-from libc.stdint cimport uint8_t, uint32_t
+from libc.stdint cimport uint8_t, uint32_t, int64_t
+from libc.math cimport floor, ceil, sqrt
+from libc.stdlib cimport malloc, free
+from array import array
+from collections import OrderedDict
+import cython
+import operator
 
 from . cimport core
 
@@ -40,8 +46,184 @@ cdef class Font:
     property baseline:
         def __get__(self): return self.__font.baseline()
 
-def DrawText(core.Canvas c, Font f, int x, int y, Color color, text):
-    return cppinc.DrawText(c._getCanvas(), f.__font, x, y, color.__color, text.encode('utf-8'))
+# Anti-aliased text from TrueType/OpenType fonts, rendered with Pillow.
+# Each glyph is rasterized once at the font's pixel size into an 8-bit alpha
+# bitmap in a slot of one atlas buffer; drawing blends straight from the atlas
+# natively. The least recently used glyph gives up its slot once cache_size
+# are held. Slots are as large as the largest glyph seen so far; a larger one
+# grows them, which starts the atlas over.
+#
+# Edges are blended against the canvas' shadow buffer (see
+# FrameCanvas.EnableShadow()), which is kept in sync, or else against
+# background (black if not given), since the framebuffer cannot be read
+# back. With a background, the full character cells are filled, like the
+# BDF DrawText() does.
+#
+#   font = graphics.TrueTypeFont()
+#   font.LoadFont("DejaVuSans.ttf", 12)
+#   graphics.DrawText(canvas, font, 2, font.baseline, graphics.Color(255, 200, 0), "12:45")
+cdef class TrueTypeFont:
+    def __init__(self, int cache_size = 256):
+        if cache_size <= 0:
+            raise ValueError("cache_size must be positive")
+        self.__cache_size = cache_size
+        self.__glyphs = OrderedDict()
+        self._resetAtlas(0, 0)
+
+    cdef _resetAtlas(self, int cell_width, int cell_height):
+        self.__glyphs.clear()
+        self.__cell_width = cell_width
+        self.__cell_height = cell_height
+        self.__atlas = bytearray(self.__cache_size * cell_width * cell_height)
+
+    def LoadFont(self, file, int size):
+        from PIL import ImageFont   # Only needed for TrueType fonts.
+        self.__font = ImageFont.truetype(file, size)
+        self.__ascent, self.__descent = self.__font.getmetrics()
+        self._resetAtlas(size, self.__ascent + self.__descent)
+
+    cdef tuple _glyph(self, uint32_t char):
+        glyph = self.__glyphs.get(char)
+        if glyph is not None:
+            self.__glyphs.move_to_end(char)
+            self.hits += 1
+            return glyph
+        if self.__font is None:
+            raise ValueError("No font loaded, call LoadFont() first")
+        from PIL import Image, ImageDraw
+        text = chr(char)
+        left, top, right, bottom = self.__font.getbbox(text, anchor="ls")
+        width = max(0, right - left)
+        height = max(0, bottom - top) if width else 0
+        if width > self.__cell_width or height > self.__cell_height:
+            self._resetAtlas(max(width, self.__cell_width), max(height, self.__cell_height))
+        if len(self.__glyphs) < self.__cache_size:
+            slot = len(self.__glyphs)
+        else:
+            slot = self.__glyphs.popitem(last=False)[1][0]
+        if width:
+            bitmap = Image.new("L", (width, height))
+            ImageDraw.Draw(bitmap).text((-left, -top), text, font=self.__font,
+                                        fill=255, anchor="ls")
+            offset = slot * self.__cell_width * self.__cell_height
+            self.__atlas[offset:offset + width * height] = bitmap.tobytes()
+        # (slot, width, height, left, top, advance)
+        glyph = (slot, width, height, left, top, self.__font.getlength(text))
+        self.__glyphs[char] = glyph
+        self.misses += 1
+        return glyph
+
+    def CharacterWidth(self, uint32_t char):
+        return int(round(self._glyph(char)[5]))
+
+    def DrawGlyph(self, core.Canvas c, int x, int y, Color color, uint32_t char,
+                  Color background = None):
+        return self.DrawText(c, x, y, color, chr(char), background)
+
+    # Returns the width of the text, like DrawText() for BDF fonts.
+    def DrawText(self, core.Canvas c, int x, int y, Color color, text,
+                 Color background = None):
+        cdef core.cppinc.Canvas *canvas = core.canvas_ptr(c)
+        cdef _Target target = _target(c, canvas)
+        cdef cppinc.Color bg
+        cdef bint fill = background is not None
+        cdef const uint8_t *atlas
+        cdef double pen = x
+        cdef int slot, start, end, width, height, left, top
+        bg.r = bg.g = bg.b = 0
+        if fill:
+            bg = background.__color
+        for char in text:
+            slot, width, height, left, top, advance = self._glyph(ord(char))
+            # Fetched per glyph, since a larger glyph replaces the atlas.
+            atlas = <const uint8_t*><char*>self.__atlas
+            start = <int>(pen + 0.5)
+            pen += advance
+            end = <int>(pen + 0.5)
+            with nogil:
+                if fill:
+                    _fill_rect(target, start, y - self.__ascent, end - start,
+                               self.__ascent + self.__descent, bg)
+                if width > 0:
+                    _draw_alpha(target, atlas + slot * self.__cell_width * self.__cell_height,
+                                width, height, start + left, y + top, color.__color, bg, fill)
+        return <int>(pen + 0.5) - x
+
+    property height:
+        def __get__(self): return self.__ascent + self.__descent
+
+    property baseline:
+        def __get__(self): return self.__ascent
+
+    property cached:
+        def __get__(self): return len(self.__glyphs)
+
+# Where text is drawn: the canvas and, if it has one, its shadow buffer and
+# the copy of it the canvas last committed, which are updated along with it.
+cdef struct _Target:
+    core.cppinc.Canvas *canvas
+    uint8_t *shadow
+    uint8_t *committed
+
+cdef _Target _target(core.Canvas c, core.cppinc.Canvas *canvas):
+    cdef _Target target
+    target.canvas = canvas
+    target.shadow = target.committed = NULL
+    if isinstance(c, core.FrameCanvas) and (<core.FrameCanvas>c).__shadow is not None:
+        target.shadow = <uint8_t*><char*>(<core.FrameCanvas>c).__shadow
+        target.committed = <uint8_t*><char*>(<core.FrameCanvas>c).__committed
+    return target
+
+cdef inline void _put(_Target target, int x, int y, uint8_t r, uint8_t g, uint8_t b) noexcept nogil:
+    # (x, y) has to be on the canvas.
+    cdef int offset
+    target.canvas.SetPixel(x, y, r, g, b)
+    if target.shadow != NULL:
+        offset = (y * target.canvas.width() + x) * 3
+        target.shadow[offset] = target.committed[offset] = r
+        target.shadow[offset + 1] = target.committed[offset + 1] = g
+        target.shadow[offset + 2] = target.committed[offset + 2] = b
+
+cdef void _fill_rect(_Target target, int x, int y, int width, int height,
+                     cppinc.Color color) noexcept nogil:
+    cdef int row, col
+    for row in range(max(y, 0), min(y + height, target.canvas.height())):
+        for col in range(max(x, 0), min(x + width, target.canvas.width())):
+            _put(target, col, row, color.r, color.g, color.b)
+
+# Blends color over background by an 8-bit alpha bitmap. Without a background,
+# pixels with zero alpha are left as they are, and the others are blended
+# against the shadow buffer if there is one.
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _draw_alpha(_Target target, const uint8_t *alpha,
+                      int width, int height, int x, int y, cppinc.Color color,
+                      cppinc.Color background, bint fill) noexcept nogil:
+    cdef int col_start = max(0, -x)
+    cdef int col_end = min(width, target.canvas.width() - x)
+    cdef int row_start = max(0, -y)
+    cdef int row_end = min(height, target.canvas.height() - y)
+    cdef int row, col, a, b, offset
+    for row in range(row_start, row_end):
+        for col in range(col_start, col_end):
+            a = alpha[row * width + col]
+            if a == 0 and not fill:
+                continue
+            if target.shadow != NULL and not fill:
+                offset = ((y + row) * target.canvas.width() + x + col) * 3
+                background.r = target.shadow[offset]
+                background.g = target.shadow[offset + 1]
+                background.b = target.shadow[offset + 2]
+            b = 255 - a
+            _put(target, x + col, y + row,
+                 (color.r * a + background.r * b + 127) // 255,
+                 (color.g * a + background.g * b + 127) // 255,
+                 (color.b * a + background.b * b + 127) // 255)
+
+def DrawText(core.Canvas c, f, int x, int y, Color color, text):
+    if isinstance(f, TrueTypeFont):
+        return (<TrueTypeFont>f).DrawText(c, x, y, color, text)
+    return cppinc.DrawText(c._getCanvas(), (<Font?>f).__font, x, y, color.__color, text.encode('utf-8'))
 
 def DrawCircle(core.Canvas c, int x, int y, int r, Color color):
     cppinc.DrawCircle(c._getCanvas(), x, y, r, color.__color)
@@ -49,6 +231,462 @@ def DrawCircle(core.Canvas c, int x, int y, int r, Color color):
 def DrawLine(core.Canvas c, int x1, int y1, int x2, int y2, Color color):
     cppinc.DrawLine(c._getCanvas(), x1, y1, x2, y2, color.__color)
 
+# Batched primitives. Each call draws a whole array of primitives natively,
+# so the Python call overhead is paid once per batch instead of per shape.
+# Primitives are flat int records, given as any integer buffer (array('i'),
+# numpy arrays of any int dtype; int32 ones are used without a copy) or as a
+# sequence of tuples:
+#
+#   DrawPoints   (x, y, r, g, b)
+#   DrawLines    (x0, y0, x1, y1, r, g, b)
+#   FillRects    (x, y, width, height, r, g, b)
+#   FillCircles  (x, y, radius, r, g, b)
+#   FillPolygons (vertex_count, r, g, b), with the vertices given separately
+#
+# If a Color is passed, the records omit their trailing r, g, b and all
+# primitives use that color. Otherwise r, g and b have to be in 0..255.
+
+def _ints(items):
+    # Flattens records given as ints (numpy scalars too) or as sequences.
+    for item in items:
+        if hasattr(item, '__iter__'):
+            for value in item:
+                yield operator.index(value)
+        else:
+            yield operator.index(item)
+
+cdef const int[::1] _records(data, int fields, Color color, bint colored = True):
+    if color is not None:
+        fields -= 3
+        colored = False
+    try:
+        view = memoryview(data)
+    except TypeError:
+        view = None
+    if (view is None or view.format not in ('i', '=i', '@i') or view.itemsize != 4
+            or not view.c_contiguous):
+        items = view.tolist() if view is not None else data
+        view = memoryview(array('i', _ints(items)))
+    cdef const int[::1] records = view.cast('B').cast('i')
+    cdef Py_ssize_t i
+    if records.shape[0] % fields:
+        raise ValueError("Expected records of %d ints, got %d ints" % (fields, records.shape[0]))
+    if colored:
+        for i in range(records.shape[0]):
+            if i % fields >= fields - 3 and not 0 <= records[i] <= 255:
+                raise ValueError("Color value %d of record %d is not in 0..255"
+                                 % (records[i], i // fields))
+    return records
+
+cdef inline void _span(core.cppinc.Canvas *canvas, int x0, int x1, int y,
+                       uint8_t r, uint8_t g, uint8_t b) noexcept nogil:
+    # Horizontal run [x0, x1], clipped to the canvas.
+    if y < 0 or y >= canvas.height():
+        return
+    if x0 < 0:
+        x0 = 0
+    if x1 >= canvas.width():
+        x1 = canvas.width() - 1
+    while x0 <= x1:
+        canvas.SetPixel(x0, y, r, g, b)
+        x0 += 1
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def DrawPoints(core.Canvas c, points, Color color = None):
+    cdef const int[::1] rec = _records(points, 5, color)
+    cdef core.cppinc.Canvas *canvas = core.canvas_ptr(c)
+    cdef int stride = 2 if color is not None else 5
+    cdef uint8_t r = 0, g = 0, b = 0
+    cdef Py_ssize_t i, k
+    if color is not None:
+        r, g, b = color.__color.r, color.__color.g, color.__color.b
+    with nogil:
+        for k in range(rec.shape[0] // stride):
+            i = k * stride
+            if stride == 5:
+                r, g, b = rec[i + 2], rec[i + 3], rec[i + 4]
+            canvas.SetPixel(rec[i], rec[i + 1], r, g, b)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def DrawLines(core.Canvas c, lines, Color color = None):
+    cdef const int[::1] rec = _records(lines, 7, color)
+    cdef core.cppinc.Canvas *canvas = core.canvas_ptr(c)
+    cdef int stride = 4 if color is not None else 7
+    cdef cppinc.Color line_color
+    cdef Py_ssize_t i, k
+    if color is not None:
+        line_color = color.__color
+    with nogil:
+        for k in range(rec.shape[0] // stride):
+            i = k * stride
+            if stride == 7:
+                line_color.r, line_color.g, line_color.b = rec[i + 4], rec[i + 5], rec[i + 6]
+            cppinc.DrawLine(canvas, rec[i], rec[i + 1], rec[i + 2], rec[i + 3], line_color)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def FillRects(core.Canvas c, rects, Color color = None):
+    cdef const int[::1] rec = _records(rects, 7, color)
+    cdef core.cppinc.Canvas *canvas = core.canvas_ptr(c)
+    cdef int stride = 4 if color is not None else 7
+    cdef uint8_t r = 0, g = 0, b = 0
+    cdef Py_ssize_t i, k
+    if color is not None:
+        r, g, b = color.__color.r, color.__color.g, color.__color.b
+    with nogil:
+        for k in range(rec.shape[0] // stride):
+            i = k * stride
+            if stride == 7:
+                r, g, b = rec[i + 4], rec[i + 5], rec[i + 6]
+            core.fill_rect(canvas, rec[i], rec[i + 1], rec[i + 2], rec[i + 3], r, g, b)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def FillCircles(core.Canvas c, circles, Color color = None):
+    cdef const int[::1] rec = _records(circles, 6, color)
+    cdef core.cppinc.Canvas *canvas = core.canvas_ptr(c)
+    cdef int stride = 3 if color is not None else 6
+    cdef uint8_t r = 0, g = 0, b = 0
+    cdef int x, y, radius, dy, half
+    cdef Py_ssize_t i, k
+    if color is not None:
+        r, g, b = color.__color.r, color.__color.g, color.__color.b
+    with nogil:
+        for k in range(rec.shape[0] // stride):
+            i = k * stride
+            x, y, radius = rec[i], rec[i + 1], rec[i + 2]
+            if stride == 6:
+                r, g, b = rec[i + 3], rec[i + 4], rec[i + 5]
+            for dy in range(-radius, radius + 1):
+                half = <int>sqrt(<double>(radius * radius - dy * dy) + 0.5)
+                _span(canvas, x - half, x + half, y + dy, r, g, b)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fill_polygon(core.cppinc.Canvas *canvas, const int *v, int n,
+                        double *crossings, uint8_t r, uint8_t g, uint8_t b) noexcept nogil:
+    # Even-odd scanline fill of the n (x, y) vertices at v, sampling each row
+    # at its pixel centers. crossings has room for n values.
+    cdef int i, j, k, count, y, y_min, y_max
+    cdef double sample_y, x_cross, t
+    if n < 3:
+        return
+    y_min = y_max = v[1]
+    for i in range(1, n):
+        y_min = min(y_min, v[i * 2 + 1])
+        y_max = max(y_max, v[i * 2 + 1])
+    y_min = max(y_min, 0)
+    y_max = min(y_max, canvas.height() - 1)
+    for y in range(y_min, y_max + 1):
+        sample_y = y + 0.5
+        count = 0
+        j = n - 1
+        for i in range(n):
+            if (v[i * 2 + 1] + 0.5 <= sample_y) != (v[j * 2 + 1] + 0.5 <= sample_y):
+                t = (sample_y - v[i * 2 + 1] - 0.5) / (v[j * 2 + 1] - v[i * 2 + 1])
+                x_cross = v[i * 2] + t * (v[j * 2] - v[i * 2])
+                # Insertion sort; polygons have few crossings per row.
+                k = count
+                while k > 0 and crossings[k - 1] > x_cross:
+                    crossings[k] = crossings[k - 1]
+                    k -= 1
+                crossings[k] = x_cross
+                count += 1
+            j = i
+        for i in range(0, count - 1, 2):
+            _span(canvas, <int>ceil(crossings[i] - 0.5), <int>ceil(crossings[i + 1] - 0.5) - 1,
+                  y, r, g, b)
+
+# Fills a polygon given as (x, y) vertex pairs with the even-odd rule,
+# sampling each row at its pixel centers.
+def FillPolygon(core.Canvas c, vertices, Color color not None):
+    cdef const int[::1] v = _records(vertices, 2, None, False)
+    cdef core.cppinc.Canvas *canvas = core.canvas_ptr(c)
+    cdef int n = v.shape[0] // 2
+    cdef uint8_t r = color.__color.r, g = color.__color.g, b = color.__color.b
+    cdef double *crossings
+    if n < 3:
+        return
+    crossings = <double*>malloc(n * sizeof(double))
+    if crossings == NULL:
+        raise MemoryError()
+    with nogil:
+        _fill_polygon(canvas, &v[0], n, crossings, r, g, b)
+    free(crossings)
+
+# Fills many polygons in one call, like FillPolygon(). vertices holds the
+# (x, y) pairs of all polygons one after the other; polygons holds one
+# (vertex_count, r, g, b) record per polygon, or just (vertex_count) with a
+# Color for all of them.
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def FillPolygons(core.Canvas c, vertices, polygons, Color color = None):
+    cdef const int[::1] v = _records(vertices, 2, None, False)
+    cdef const int[::1] rec = _records(polygons, 4, color)
+    cdef core.cppinc.Canvas *canvas = core.canvas_ptr(c)
+    cdef int stride = 1 if color is not None else 4
+    cdef uint8_t r = 0, g = 0, b = 0
+    cdef Py_ssize_t i, k, n, total = 0, largest = 0
+    cdef double *crossings
+    for k in range(rec.shape[0] // stride):
+        n = rec[k * stride]
+        if n < 0:
+            raise ValueError("Negative vertex count %d" % n)
+        total += n
+        largest = max(largest, n)
+    if total * 2 != v.shape[0]:
+        raise ValueError("Polygons have %d vertices, got %d" % (total, v.shape[0] // 2))
+    if color is not None:
+        r, g, b = color.__color.r, color.__color.g, color.__color.b
+    crossings = <double*>malloc(max(largest, 1) * sizeof(double))
+    if crossings == NULL:
+        raise MemoryError()
+    with nogil:
+        total = 0
+        for k in range(rec.shape[0] // stride):
+            i = k * stride
+            n = rec[i]
+            if stride == 4:
+                r, g, b = rec[i + 1], rec[i + 2], rec[i + 3]
+            if n > 0:
+                _fill_polygon(canvas, &v[total * 2], n, crossings, r, g, b)
+            total += n
+    free(crossings)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _transform_blit(core.cppinc.Canvas *canvas, const uint8_t[::1] image,
+                          int image_width, int image_height, double[6] inverse,
+                          int x_start, int x_end, int y_start, int y_end,
+                          bint bilinear) noexcept nogil:
+    # Walks the destination pixels and inverse-maps their centers into the
+    # image in 16.16 fixed point, stepping incrementally along each row.
+    cdef int64_t du_dx = <int64_t>(inverse[0] * 65536)
+    cdef int64_t dv_dx = <int64_t>(inverse[3] * 65536)
+    cdef int64_t u_limit = <int64_t>image_width << 16
+    cdef int64_t v_limit = <int64_t>image_height << 16
+    cdef int64_t u, v, us, vs
+    cdef int x, y, c, iu, iv, iu1, iv1, fu, fv
+    cdef const uint8_t *p00
+    cdef const uint8_t *p01
+    cdef const uint8_t *p10
+    cdef const uint8_t *p11
+    cdef uint8_t rgb[3]
+    cdef int stride = image_width * 3
+
+    for y in range(y_start, y_end):
+        u = <int64_t>((inverse[0] * (x_start + 0.5) + inverse[1] * (y + 0.5) + inverse[2]) * 65536)
+        v = <int64_t>((inverse[3] * (x_start + 0.5) + inverse[4] * (y + 0.5) + inverse[5]) * 65536)
+        for x in range(x_start, x_end):
+            if 0 <= u < u_limit and 0 <= v < v_limit:
+                if bilinear:
+                    # Sample around the pixel centers, clamping at the edges.
+                    us = u - 32768
+                    vs = v - 32768
+                    iu = <int>(us >> 16)
+                    iv = <int>(vs >> 16)
+                    fu = <int>((us >> 8) & 0xFF)
+                    fv = <int>((vs >> 8) & 0xFF)
+                    iu1 = iu + 1 if iu + 1 < image_width else image_width - 1
+                    iv1 = iv + 1 if iv + 1 < image_height else image_height - 1
+                    if iu < 0:
+                        iu = 0
+                    if iv < 0:
+                        iv = 0
+                    p00 = &image[iv * stride + iu * 3]
+                    p01 = &image[iv * stride + iu1 * 3]
+                    p10 = &image[iv1 * stride + iu * 3]
+                    p11 = &image[iv1 * stride + iu1 * 3]
+                    for c in range(3):
+                        rgb[c] = ((p00[c] * (256 - fu) + p01[c] * fu) * (256 - fv)
+                                  + (p10[c] * (256 - fu) + p11[c] * fu) * fv + 32768) >> 16
+                    canvas.SetPixel(x, y, rgb[0], rgb[1], rgb[2])
+                else:
+                    p00 = &image[(v >> 16) * stride + (u >> 16) * 3]
+                    canvas.SetPixel(x, y, p00[0], p00[1], p00[2])
+            u += du_dx
+            v += dv_dx
+
+# Draws an RGB image through the affine transform (a, b, c, d, e, f), which
+# maps image coordinates to canvas coordinates:
+#
+#   x = a * u + b * v + c
+#   y = d * u + e * v + f
+#
+# The transform may also be given as two rows ((a, b, c), (d, e, f)). Every
+# covered canvas pixel is inverse-mapped into the image, so rotated and scaled
+# images have no holes; pixels outside the image are left untouched. image is
+# a PIL image in RGB mode, or a packed RGB buffer together with width/height.
+def DrawImageTransformed(core.Canvas c, image, transform, bint bilinear = False,
+                         int width = 0, int height = 0):
+    cdef double[6] inverse
+    cdef const uint8_t[::1] buffer
+    cdef double a, b, tx, d, e, ty, det, px, py
+    cdef double min_x, max_x, min_y, max_y
+    cdef int x_start, x_end, y_start, y_end
+    cdef core.cppinc.Canvas *canvas = core.canvas_ptr(c)
+
+    if width <= 0 or height <= 0:
+        if image.mode != "RGB":
+            raise ValueError("Only RGB images are supported, convert with image.convert('RGB')")
+        width, height = image.size
+        buffer = image.tobytes()
+    else:
+        buffer = memoryview(image).cast('B')
+        if buffer.shape[0] < width * height * 3:
+            raise ValueError("Buffer too small for %dx%d RGB pixels" % (width, height))
+
+    if len(transform) == 2:
+        transform = tuple(transform[0]) + tuple(transform[1])
+    a, b, tx, d, e, ty = transform
+    det = a * e - b * d
+    if det == 0:
+        raise ValueError("Transform is not invertible")
+    inverse[0] = e / det
+    inverse[1] = -b / det
+    inverse[2] = (b * ty - e * tx) / det
+    inverse[3] = -d / det
+    inverse[4] = a / det
+    inverse[5] = (d * tx - a * ty) / det
+
+    # Only visit the bounding box of the transformed image.
+    min_x = max_x = tx
+    min_y = max_y = ty
+    for px, py in ((width, 0), (0, height), (width, height)):
+        min_x = min(min_x, a * px + b * py + tx)
+        max_x = max(max_x, a * px + b * py + tx)
+        min_y = min(min_y, d * px + e * py + ty)
+        max_y = max(max_y, d * px + e * py + ty)
+    x_start = <int>max(0.0, floor(min_x))
+    x_end = <int>min(<double>canvas.width(), ceil(max_x))
+    y_start = <int>max(0.0, floor(min_y))
+    y_end = <int>min(<double>canvas.height(), ceil(max_y))
+    if x_start >= x_end or y_start >= y_end:
+        return
+
+    with nogil:
+        _transform_blit(canvas, buffer, width, height, inverse,
+                        x_start, x_end, y_start, y_end, bilinear)
+
+# Compositing operations. The LED framebuffer itself cannot be read back, so
+# these work on the canvas' RGB shadow (FrameCanvas.EnableShadow()) and take
+# effect on the next canvas.Commit(). They run in C without the GIL.
+#
+# Rectangles default to the whole canvas (width/height of -1 extend to the
+# edge) and are clipped. Source buffers are packed, row-major: RGB for
+# BlendAdd/BlendMax, RGBA for AlphaComposite.
+
+cdef enum BlendMode:
+    BLEND_ADD
+    BLEND_MAX
+    BLEND_ALPHA
+
+cdef uint8_t[::1] _shadow_of(core.FrameCanvas c):
+    if c.__shadow is None:
+        raise ValueError("Canvas has no shadow buffer, call EnableShadow() first")
+    return c.__shadow
+
+# Multiplies every channel in the rectangle by factor, saturating at 255.
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def Fade(core.FrameCanvas c, float factor, int x = 0, int y = 0, int width = -1, int height = -1):
+    cdef uint8_t[::1] shadow = _shadow_of(c)
+    cdef int canvas_width = core.canvas_ptr(c).width()
+    cdef int canvas_height = core.canvas_ptr(c).height()
+    cdef uint8_t table[256]
+    cdef int v, row, i, start, end
+    cdef float scaled
+
+    if width < 0:
+        width = canvas_width - x
+    if height < 0:
+        height = canvas_height - y
+    if x < 0:
+        width += x
+        x = 0
+    if y < 0:
+        height += y
+        y = 0
+    width = min(width, canvas_width - x)
+    height = min(height, canvas_height - y)
+    if width <= 0 or height <= 0:
+        return
+
+    for v in range(256):
+        scaled = v * factor
+        table[v] = 255 if scaled >= 255 else (0 if scaled <= 0 else <uint8_t>scaled)
+
+    with nogil:
+        for row in range(y, y + height):
+            start = (row * canvas_width + x) * 3
+            end = start + width * 3
+            for i in range(start, end):
+                shadow[i] = table[shadow[i]]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _blend(uint8_t[::1] shadow, int canvas_width, int canvas_height,
+                 const uint8_t[::1] source, int x, int y, int width, int height,
+                 int channels, BlendMode mode, int opacity) noexcept nogil:
+    cdef int col_start = max(0, -x)
+    cdef int col_end = min(width, canvas_width - x)
+    cdef int row_start = max(0, -y)
+    cdef int row_end = min(height, canvas_height - y)
+    cdef int row, col, c, d, s, a
+    cdef Py_ssize_t di, si
+
+    for row in range(row_start, row_end):
+        di = ((y + row) * canvas_width + x + col_start) * 3
+        si = (row * width + col_start) * channels
+        for col in range(col_start, col_end):
+            if mode == BLEND_ALPHA:
+                a = source[si + 3] * opacity
+                for c in range(3):
+                    shadow[di + c] = (source[si + c] * a
+                                      + shadow[di + c] * (65025 - a) + 32512) // 65025
+            else:
+                for c in range(3):
+                    d = shadow[di + c]
+                    s = source[si + c]
+                    if mode == BLEND_ADD:
+                        d = d + s
+                        shadow[di + c] = 255 if d > 255 else d
+                    elif s > d:
+                        shadow[di + c] = s
+            di += 3
+            si += channels
+
+cdef _composite(core.FrameCanvas c, source, int x, int y, int width, int height,
+                int channels, BlendMode mode, int opacity):
+    cdef uint8_t[::1] shadow = _shadow_of(c)
+    cdef const uint8_t[::1] buffer = memoryview(source).cast('B')
+    cdef int canvas_width = core.canvas_ptr(c).width()
+    cdef int canvas_height = core.canvas_ptr(c).height()
+    if width <= 0 or height <= 0:
+        return
+    if buffer.shape[0] < width * height * channels:
+        raise ValueError("Buffer too small for %dx%d pixels with %d channels"
+                         % (width, height, channels))
+    with nogil:
+        _blend(shadow, canvas_width, canvas_height, buffer, x, y, width, height,
+               channels, mode, opacity)
+
+# Adds a packed RGB buffer onto the canvas at (x, y), saturating at 255.
+def BlendAdd(core.FrameCanvas c, source, int x, int y, int width, int height):
+    _composite(c, source, x, y, width, height, 3, BLEND_ADD, 255)
+
+# Brightest-wins blend of a packed RGB buffer onto the canvas at (x, y).
+def BlendMax(core.FrameCanvas c, source, int x, int y, int width, int height):
+    _composite(c, source, x, y, width, height, 3, BLEND_MAX, 255)
+
+# Draws a packed RGBA sprite over the canvas at (x, y); opacity scales the
+# sprite's own alpha.
+def AlphaComposite(core.FrameCanvas c, sprite, int x, int y, int width, int height,
+                   uint8_t opacity = 255):
+    _composite(c, sprite, x, y, width, height, 4, BLEND_ALPHA, opacity)
+
 # Local Variables:
 # mode: python
 # End:
@@ -0,0 +1,304 @@
+# distutils: language = c++
+
+from libc.stdint cimport uint8_t, uint32_t
+from libc.stdlib cimport calloc, free
+from libc.math cimport cos, sin, sqrt, floor, fmod, M_PI
+import cython
+
+from . cimport core
+
+# Particle engine for streak/meteor style effects. Particles are stored as
+# struct-of-arrays and stepped, respawned and drawn in C without the GIL.
+#
+#   particles = ParticleSystem(1000, canvas.width, canvas.height)
+#   particles.tail_color = (255, 40, 0)                  # optional gradient
+#   particles.speed_min, particles.speed_max = 20, 90   # pixels per second
+#   particles.Emit(1000, scatter=True)
+#   while True:
+#       particles.Step(dt)
+#       particles.Render(canvas)
+#
+# New particles get a random speed and direction (angle +- angle_spread, or
+# the opposite direction too if bidirectional) and a random color around hue.
+# They enter from just outside the canvas edge they travel away from, unless
+# scatter=True places them anywhere. A particle that leaves the canvas or
+# outlives lifetime (seconds, 0 = forever) is respawned if respawn is set.
+#
+# Each particle is drawn as a trail of pixels behind its head; trail holds
+# the brightness (0-255) of each trail pixel, head first. The trail has the
+# particle's color, or with tail_color set, a gradient that interpolates in
+# RGB from the particle's color at the head to tail_color at the last pixel.
+# A system may have capacity 0; it then never has particles. Rendering into a
+# FrameCanvas with a shadow buffer max-blends into the shadow (call Commit()
+# afterwards), otherwise pixels are set directly.
+
+DEFAULT_TRAIL = (255, 178, 127, 76, 63, 51, 25, 12)
+
+cdef enum:
+    MAX_TRAIL = 64
+
+cdef inline void _hsv_to_rgb(float h, float s, float v, uint8_t *rgb) noexcept nogil:
+    cdef float f, p, q, t
+    cdef int i
+    h = <float>fmod(h, 1.0)
+    if h < 0:
+        h += 1
+    h *= 6
+    i = <int>h
+    f = h - i
+    p = v * (1 - s)
+    q = v * (1 - s * f)
+    t = v * (1 - s * (1 - f))
+    if i == 0:
+        rgb[0], rgb[1], rgb[2] = <uint8_t>(v * 255), <uint8_t>(t * 255), <uint8_t>(p * 255)
+    elif i == 1:
+        rgb[0], rgb[1], rgb[2] = <uint8_t>(q * 255), <uint8_t>(v * 255), <uint8_t>(p * 255)
+    elif i == 2:
+        rgb[0], rgb[1], rgb[2] = <uint8_t>(p * 255), <uint8_t>(v * 255), <uint8_t>(t * 255)
+    elif i == 3:
+        rgb[0], rgb[1], rgb[2] = <uint8_t>(p * 255), <uint8_t>(q * 255), <uint8_t>(v * 255)
+    elif i == 4:
+        rgb[0], rgb[1], rgb[2] = <uint8_t>(t * 255), <uint8_t>(p * 255), <uint8_t>(v * 255)
+    else:
+        rgb[0], rgb[1], rgb[2] = <uint8_t>(v * 255), <uint8_t>(p * 255), <uint8_t>(q * 255)
+
+cdef class ParticleSystem:
+    cdef int capacity
+    cdef int count
+    cdef int width
+    cdef int height
+    cdef float *x
+    cdef float *y
+    cdef float *vx
+    cdef float *vy
+    cdef float *age
+    cdef uint8_t *rgb
+    cdef uint32_t rng
+    cdef uint8_t trail_levels[MAX_TRAIL]
+    cdef int trail_length
+    cdef uint8_t tail_rgb[3]
+    cdef bint has_tail_color
+
+    cdef public float speed_min, speed_max
+    cdef public float angle, angle_spread
+    cdef public bint bidirectional
+    cdef public float hue, hue_jitter
+    cdef public float saturation_min, saturation_max
+    cdef public float value_min, value_max
+    cdef public float lifetime
+    cdef public bint respawn
+
+    def __cinit__(self, int capacity, int width, int height, uint32_t seed = 0x9E3779B9):
+        if capacity < 0:
+            raise ValueError("capacity must not be negative")
+        self.capacity = capacity
+        self.width = width
+        self.height = height
+        # calloc(0) may return NULL; always allocate at least one particle.
+        capacity = max(capacity, 1)
+        self.x = <float*>calloc(capacity, sizeof(float))
+        self.y = <float*>calloc(capacity, sizeof(float))
+        self.vx = <float*>calloc(capacity, sizeof(float))
+        self.vy = <float*>calloc(capacity, sizeof(float))
+        self.age = <float*>calloc(capacity, sizeof(float))
+        self.rgb = <uint8_t*>calloc(capacity * 3, sizeof(uint8_t))
+        if (self.x == NULL or self.y == NULL or self.vx == NULL or self.vy == NULL
+                or self.age == NULL or self.rgb == NULL):
+            raise MemoryError()
+        self.rng = seed or 1
+        self.trail = DEFAULT_TRAIL
+
+        self.speed_min = 20
+        self.speed_max = 90
+        self.angle = 0
+        self.angle_spread = 0
+        self.bidirectional = True
+        self.hue = 0.55
+        self.hue_jitter = 0.08
+        self.saturation_min = 0.7
+        self.saturation_max = 1.0
+        self.value_min = 0.7
+        self.value_max = 1.0
+        self.lifetime = 0
+        self.respawn = True
+
+    def __dealloc__(self):
+        free(self.x)
+        free(self.y)
+        free(self.vx)
+        free(self.vy)
+        free(self.age)
+        free(self.rgb)
+
+    cdef inline float _random(self) noexcept nogil:
+        # xorshift32, uniform in [0, 1)
+        self.rng ^= self.rng << 13
+        self.rng ^= self.rng >> 17
+        self.rng ^= self.rng << 5
+        return (self.rng >> 8) * (1.0 / 16777216.0)
+
+    cdef inline float _uniform(self, float lo, float hi) noexcept nogil:
+        return lo + (hi - lo) * self._random()
+
+    cdef void _spawn(self, int i, bint scatter) noexcept nogil:
+        cdef float direction = self.angle + self._uniform(-self.angle_spread, self.angle_spread)
+        cdef float speed = self._uniform(self.speed_min, self.speed_max)
+        cdef float px, py, t, tx, ty, vx, vy
+        if self.bidirectional and self._random() < 0.5:
+            direction += M_PI
+        vx = speed * cos(direction)
+        vy = speed * sin(direction)
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.age[i] = 0
+        _hsv_to_rgb(self.hue + self._uniform(-self.hue_jitter, self.hue_jitter),
+                    self._uniform(self.saturation_min, self.saturation_max),
+                    self._uniform(self.value_min, self.value_max),
+                    &self.rgb[i * 3])
+
+        px = self._uniform(0, self.width)
+        py = self._uniform(0, self.height)
+        if not scatter and speed > 0:
+            # Walk back along the velocity to just outside the canvas.
+            tx = ty = 1e30
+            if vx > 0:
+                tx = px / vx
+            elif vx < 0:
+                tx = (px - self.width) / vx
+            if vy > 0:
+                ty = py / vy
+            elif vy < 0:
+                ty = (py - self.height) / vy
+            t = tx if tx < ty else ty
+            px -= vx * t + vx / speed
+            py -= vy * t + vy / speed
+        self.x[i] = px
+        self.y[i] = py
+
+    def Emit(self, int count, bint scatter = False):
+        """Add up to count particles; returns how many were added."""
+        cdef int i
+        count = min(count, self.capacity - self.count)
+        with nogil:
+            for i in range(self.count, self.count + count):
+                self._spawn(i, scatter)
+        self.count += count
+        return count
+
+    def Clear(self):
+        self.count = 0
+
+    @cython.cdivision(True)
+    def Step(self, float dt):
+        """Advance all particles by dt seconds, respawning those that left."""
+        cdef int i = 0
+        cdef float margin = self.trail_length + 1
+        cdef bint gone
+        with nogil:
+            while i < self.count:
+                self.x[i] += self.vx[i] * dt
+                self.y[i] += self.vy[i] * dt
+                self.age[i] += dt
+                gone = (self.x[i] < -margin or self.x[i] >= self.width + margin
+                        or self.y[i] < -margin or self.y[i] >= self.height + margin
+                        or (self.lifetime > 0 and self.age[i] >= self.lifetime))
+                if gone:
+                    if self.respawn:
+                        self._spawn(i, False)
+                    else:
+                        # Swap-remove to keep the arrays dense.
+                        self.count -= 1
+                        self.x[i] = self.x[self.count]
+                        self.y[i] = self.y[self.count]
+                        self.vx[i] = self.vx[self.count]
+                        self.vy[i] = self.vy[self.count]
+                        self.age[i] = self.age[self.count]
+                        self.rgb[i * 3] = self.rgb[self.count * 3]
+                        self.rgb[i * 3 + 1] = self.rgb[self.count * 3 + 1]
+                        self.rgb[i * 3 + 2] = self.rgb[self.count * 3 + 2]
+                        continue
+                i += 1
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    def Render(self, core.Canvas c):
+        """Draw all particles with their trails."""
+        cdef core.cppinc.Canvas *canvas = core.canvas_ptr(c)
+        cdef uint8_t[::1] shadow
+        cdef bint use_shadow = False
+        cdef int width = canvas.width()
+        cdef int height = canvas.height()
+        cdef int i, k, ch, px, py, offset, level, last
+        cdef float speed, dx, dy, fade
+        cdef uint8_t color[3]
+
+        if isinstance(c, core.FrameCanvas) and (<core.FrameCanvas>c).__shadow is not None:
+            shadow = (<core.FrameCanvas>c).__shadow
+            use_shadow = True
+
+        with nogil:
+            for i in range(self.count):
+                speed = sqrt(self.vx[i] * self.vx[i] + self.vy[i] * self.vy[i])
+                if speed > 0:
+                    dx = self.vx[i] / speed
+                    dy = self.vy[i] / speed
+                else:
+                    dx = dy = 0
+                fade = 1
+                if self.lifetime > 0:
+                    fade = 1 - self.age[i] / self.lifetime
+                last = self.trail_length - 1
+                for k in range(self.trail_length):
+                    px = <int>floor(self.x[i] - dx * k)
+                    py = <int>floor(self.y[i] - dy * k)
+                    if px < 0 or px >= width or py < 0 or py >= height:
+                        continue
+                    level = <int>(self.trail_levels[k] * fade)
+                    for ch in range(3):
+                        if self.has_tail_color and last > 0:
+                            color[ch] = ((self.rgb[i * 3 + ch] * (last - k)
+                                          + self.tail_rgb[ch] * k) // last * level) // 255
+                        else:
+                            color[ch] = (self.rgb[i * 3 + ch] * level) // 255
+                    if use_shadow:
+                        offset = (py * width + px) * 3
+                        for ch in range(3):
+                            if color[ch] > shadow[offset + ch]:
+                                shadow[offset + ch] = color[ch]
+                    else:
+                        canvas.SetPixel(px, py, color[0], color[1], color[2])
+
+    property count:
+        def __get__(self): return self.count
+
+    property capacity:
+        def __get__(self): return self.capacity
+
+    property trail:
+        def __get__(self):
+            return tuple(self.trail_levels[k] for k in range(self.trail_length))
+        def __set__(self, levels):
+            levels = tuple(levels)
+            if not 0 < len(levels) <= MAX_TRAIL:
+                raise ValueError("trail needs 1 to %d levels" % MAX_TRAIL)
+            for k, level in enumerate(levels):
+                self.trail_levels[k] = level
+            self.trail_length = len(levels)
+
+    property tail_color:
+        def __get__(self):
+            if not self.has_tail_color:
+                return None
+            return (self.tail_rgb[0], self.tail_rgb[1], self.tail_rgb[2])
+        def __set__(self, color):
+            if color is None:
+                self.has_tail_color = False
+                return
+            r, g, b = color
+            self.tail_rgb[0], self.tail_rgb[1], self.tail_rgb[2] = r, g, b
+            self.has_tail_color = True
+
+# Local Variables:
+# mode: python
+# End:
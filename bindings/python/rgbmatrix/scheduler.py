@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""Fixed-timestep frame loop locked to the matrix refresh clock.
+
+Instead of sleeping after every SwapOnVSync(), a FrameScheduler lets the
+vsync wait do the pacing: frames are swapped every framerate_fraction
+refreshes, the smallest that keeps them at or below fps, while the simulation
+advances in fixed steps of 1/update_hz seconds, independent of how long
+rendering took.
+
+refresh_hz has to be the rate the panel actually refreshes at. Set
+RGBMatrixOptions.limit_refresh_rate_hz so it is stable, but note that it is
+only a cap: a panel that can't refresh that fast runs slower, and pacing by
+the cap then gives too low a frame rate.
+
+    def update(dt):            # advance the state by exactly dt seconds
+        ...
+
+    def render(canvas, alpha): # draw the state; alpha in [0, 1) is how far
+        ...                    # we are between the last and the next update
+
+    FrameScheduler(matrix, refresh_hz=150, fps=30).Run(update, render)
+
+If a frame falls behind, the missed updates are caught up first and the render
+of that frame is skipped, so motion stays time-correct while the frame rate
+degrades.
+
+A rendered frame that is identical to the one on the panel is not swapped
+(see RGBMatrix.SwapOnVSync(skip_unchanged=True)); frames_unchanged counts
+those and unchanged_ratio gives their share. Once the content has been static
+for idle_after seconds, the loop drops to idle_fps until a frame differs
+again, which keeps static scenes (clocks, logos, still images) from burning
+CPU. Changes then show up with up to 1/idle_fps seconds of delay.
+
+Pass pwm=AdaptivePWMBits(matrix) to lower each frame's pwmBits to what its
+content needs (see rgbmatrix.adaptive).
+"""
+from __future__ import absolute_import
+
+import math
+import time
+
+
+class FrameScheduler(object):
+    def __init__(self, matrix, refresh_hz, fps, update_hz=None,
+                 max_frame_skip=5, idle_fps=None, idle_after=1.0, pwm=None):
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.matrix = matrix
+        if refresh_hz > 0:
+            self.framerate_fraction = max(1, int(math.ceil(refresh_hz / float(fps))))
+            self.frame_period = self.framerate_fraction / float(refresh_hz)
+        else:
+            # Unknown refresh rate; swap on the next vsync and pace by time.
+            self.framerate_fraction = 1
+            self.frame_period = 1.0 / fps
+        self._paced_by_vsync = refresh_hz > 0
+        self.update_period = 1.0 / (update_hz or fps)
+        self.max_frame_skip = max_frame_skip
+        if idle_fps is not None and idle_fps <= 0:
+            raise ValueError("idle_fps must be positive")
+        self.idle_period = 1.0 / idle_fps if idle_fps else None
+        self.idle_after = idle_after
+        self.pwm = pwm
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+        self.frames_unchanged = 0
+        self._running = False
+
+    @property
+    def fps(self):
+        return 1.0 / self.frame_period
+
+    @property
+    def unchanged_ratio(self):
+        """Share of rendered frames that were identical to the previous one."""
+        if not self.frames_rendered:
+            return 0.0
+        return self.frames_unchanged / float(self.frames_rendered)
+
+    def Stop(self):
+        self._running = False
+
+    def Run(self, update, render, canvas=None):
+        """Loop until Stop() is called. Returns the canvas to draw on next."""
+        if canvas is None:
+            canvas = self.matrix.CreateFrameCanvas()
+        dt = self.update_period
+        # Never try to catch up more than this in one frame, otherwise a long
+        # stall (e.g. blocking I/O in update) turns into a burst of updates.
+        max_lag = dt * (self.max_frame_skip + 1)
+        if self.idle_period is not None:
+            # An idle sleep is not a stall; its time has to be simulated.
+            max_lag = max(max_lag, self.idle_period + dt)
+        accumulator = 0.0
+        skipped_in_row = 0
+        unchanged_since = None
+        previous = time.monotonic()
+        next_frame = previous + self.frame_period
+        self._running = True
+        while self._running:
+            now = time.monotonic()
+            accumulator = min(accumulator + (now - previous), max_lag)
+            previous = now
+
+            steps = 0
+            while accumulator >= dt:
+                update(dt)
+                accumulator -= dt
+                steps += 1
+
+            if (steps > 1 and skipped_in_row < self.max_frame_skip
+                    and time.monotonic() > next_frame):
+                # Over budget: already late for this frame's vsync slot.
+                self.frames_skipped += 1
+                skipped_in_row += 1
+                next_frame += self.frame_period
+                continue
+            skipped_in_row = 0
+
+            render(canvas, accumulator / dt)
+            if self.pwm is not None:
+                self.pwm.Apply(canvas)
+            if not self._paced_by_vsync:
+                delay = next_frame - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            swaps_skipped = self.matrix.swapsSkipped
+            canvas = self.matrix.SwapOnVSync(canvas, self.framerate_fraction,
+                                             skip_unchanged=True)
+            if self.pwm is not None:
+                self.pwm.Restore(canvas)
+            self.frames_rendered += 1
+            if self.matrix.swapsSkipped == swaps_skipped:
+                unchanged_since = None
+                next_frame = max(next_frame + self.frame_period, time.monotonic())
+                continue
+
+            # Nothing was swapped, so there was no vsync wait to pace us.
+            self.frames_unchanged += 1
+            now = time.monotonic()
+            if unchanged_since is None:
+                unchanged_since = now
+            if (self.idle_period is not None
+                    and now - unchanged_since >= self.idle_after):
+                time.sleep(self.idle_period)
+                # Updates caught up after the nap are no reason to skip.
+                next_frame = time.monotonic() + self.frame_period
+            else:
+                # Sleep until the vsync the swap would have waited for.
+                time.sleep(max(0.0, next_frame - now))
+                next_frame = max(next_frame + self.frame_period, time.monotonic())
+        return canvas
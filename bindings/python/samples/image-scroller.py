@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 import time
 from samplebase import SampleBase
+from rgbmatrix import VirtualCanvas
 from PIL import Image
 
 
@@ -17,15 +18,19 @@ class ImageScroller(SampleBase):
         double_buffer = self.matrix.CreateFrameCanvas()
         img_width, img_height = self.image.size
 
+        # Encode the image once; every step then only copies the visible
+        # window, which wraps around at the end of the image.
+        content = VirtualCanvas(double_buffer, img_width, self.matrix.height)
+        content.SetImage(self.image)
+
         # let's scroll
         xpos = 0
         while True:
             xpos += 1
-            if (xpos > img_width):
+            if (xpos >= img_width):
                 xpos = 0
 
-            double_buffer.SetImage(self.image, -xpos)
-            double_buffer.SetImage(self.image, -xpos + img_width)
+            content.CopyViewportTo(xpos, 0, double_buffer)
 
             double_buffer = self.matrix.SwapOnVSync(double_buffer)
             time.sleep(0.01)
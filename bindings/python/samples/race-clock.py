@@ -1,85 +1,132 @@
-import time  # type: ignore
-import datetime  # type: ignore
-from signal import pause  # type: ignore
-from samplebase import SampleBase  # type: ignore
-from rgbmatrix import RGBMatrix, RGBMatrixOptions, graphics  # type: ignore
-import subprocess  # For system audio playback
-
-# Matrix and Graphics Configuration
-options = RGBMatrixOptions()
-options.rows = 32
-options.cols = 64
-options.chain_length = 1
-options.parallel = 1
-options.hardware_mapping = 'adafruit-hat'
-options.drop_privileges = False
-options.gpio_slowdown = 3 # set 3 to decrease glitches (works well with pi4b)
-options.pwm_bits = 1
-matrix = RGBMatrix(options=options)
-
-# Fonts
-font = graphics.Font()
-font.LoadFont("~/rpi-rgb-led-matrix/fonts/6x10.bdf")
-font1 = graphics.Font()
-font1.LoadFont("~/rpi-rgb-led-matrix/fonts/8x13B.bdf")
-font2 = graphics.Font()
-font2.LoadFont("~/rpi-rgb-led-matrix/fonts/6x9.bdf")
-
-# Colors
-red = graphics.Color(255, 0, 0)
-green = graphics.Color(0, 255, 0)
-blue = graphics.Color(0, 0, 255)
-white = graphics.Color(255, 255, 255)
-
-# Audio Configuration
-red_alert_sound = "~/rpi-rgb-led-matrix/bindings/python/samples/REPLACE_WITH_YOUR_AUDIO.wav"  # Replace with your WAV file path
-
-# Utility Functions
-def clear_screen():
-    matrix.Clear()
-
-def play_audio(file_path):
-    # Play the .wav file using system command
-    subprocess.Popen(["aplay", file_path])
-
-def display_clock():
-    global sound_played
-    clear_screen()
-    graphics.DrawText(matrix, font, 3, 10, red, clockwork)  # Render clock
-
-    # Countdown logic
-    if countdown > 5:
-        sound_played = False  # Reset the flag when not in the red zone
-        graphics.DrawText(matrix, font, 15, 26, white, f": {countdown}")
-    elif countdown <= 5:
-        graphics.DrawText(matrix, font, 15, 26, red, f": {countdown}")
-        if countdown == 4 and not sound_played:
-            play_audio(red_alert_sound)  # Play audio when countdown is 4
-            sound_played = True
-    if countdown == 1:
-        graphics.DrawText(matrix, font, 15, 26, red, f": {countdown}")
-        time.sleep(1)
-        clear_screen()
-        graphics.DrawText(matrix, font1, 12, 21, green, "START")
-        time.sleep(1)
-
-# Main Loop
-countdown_length = 10  # Set the countdown length
-time_buffer = []
-sound_played = False  # Audio flag for 4-second countdown
-
-while True:
-    start_time = datetime.datetime.now()  # Record start of loop
-    clockwork = start_time.strftime("%H:%M:%S")  # Current time
-
-    # Countdown calculation
-    countdown = abs((int(start_time.second) % countdown_length) - countdown_length)
-
-    # Display the clock and countdown
-    display_clock()
-
-    # Calculate time spent in this loop iteration
-    elapsed_time = (datetime.datetime.now() - start_time).total_seconds()
-
-    # Adjust sleep to ensure each loop runs precisely for 1 second
-    time.sleep(max(0, 1 - elapsed_time))
+#!/usr/bin/env python
+# Wall clock with a repeating countdown, e.g. for race starts.
+#
+# Digits are rendered once per font and color into sprites, and each frame
+# only copies in the characters that differ from what that canvas showed
+# before. Frames are drawn a second ahead and queued to appear exactly at
+# the second boundary, so the process sleeps between ticks.
+import datetime
+import os
+import subprocess
+import threading
+import time
+
+from samplebase import SampleBase
+from rgbmatrix import PresentationQueue, VirtualCanvas, graphics
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../fonts")
+CLOCK_FONT = os.path.join(FONT_DIR, "6x10.bdf")
+START_FONT = os.path.join(FONT_DIR, "8x13B.bdf")
+
+RED = graphics.Color(255, 0, 0)
+GREEN = graphics.Color(0, 255, 0)
+WHITE = graphics.Color(255, 255, 255)
+
+SPRITE_CHARS = "0123456789: "
+
+
+class Sprites(object):
+    """Characters of one font and color, pre-rendered into VirtualCanvases."""
+    def __init__(self, prototype, font, color, chars=SPRITE_CHARS):
+        self.baseline = font.baseline
+        self.glyphs = {}
+        for char in chars:
+            glyph = VirtualCanvas(prototype, font.CharacterWidth(ord(char)), font.height)
+            graphics.DrawText(glyph, font, 0, font.baseline, color, char)
+            self.glyphs[char] = glyph
+
+    def __getitem__(self, char):
+        return self.glyphs[char]
+
+
+class SpriteText(object):
+    """A line of text at (x, y) that only redraws the characters that changed.
+
+    What each canvas shows is tracked separately, as double buffering hands
+    out the canvases in turn.
+    """
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.shown = {}
+
+    def Draw(self, canvas, sprites, text):
+        shown = self.shown.get(canvas, [])
+        # Blank out the rest of a longer previous text.
+        text = text.ljust(len(shown))
+        x = self.x
+        top = self.y - sprites.baseline
+        for i, char in enumerate(text):
+            glyph = sprites[char]
+            if i >= len(shown) or shown[i] != (sprites, char):
+                glyph.CopyRectTo(0, 0, glyph.width, glyph.height, canvas, x, top)
+            x += glyph.width
+        self.shown[canvas] = [(sprites, char) for char in text]
+
+    def Forget(self, canvas):
+        self.shown.pop(canvas, None)
+
+
+class RaceClock(SampleBase):
+    def __init__(self, *args, **kwargs):
+        super(RaceClock, self).__init__(*args, **kwargs)
+        self.parser.add_argument("--countdown", type=int, default=10,
+                                 help="Countdown length in seconds. Default: 10")
+        self.parser.add_argument("--sound", default=None,
+                                 help="WAV file played with aplay 4 seconds before the start")
+        # Only pure colors are shown, one bit plane gives the fastest refresh.
+        self.parser.set_defaults(led_cols=64, led_pwm_bits=1, led_slowdown_gpio=3,
+                                 led_gpio_mapping="adafruit-hat", drop_privileges=False)
+
+    def run(self):
+        queue = PresentationQueue(self.matrix, depth=2)
+        prototype = queue.Acquire()
+        clock_font = graphics.Font()
+        clock_font.LoadFont(CLOCK_FONT)
+        self.start_font = graphics.Font()
+        self.start_font.LoadFont(START_FONT)
+        self.clock_sprites = Sprites(prototype, clock_font, RED)
+        self.count_sprites = Sprites(prototype, clock_font, WHITE)
+        queue.Release(prototype)
+
+        self.clock_text = SpriteText(3, 10)
+        self.count_text = SpriteText(15, 26)
+        self.cleared = set()   # Canvases set up for the clock, not START.
+
+        second = int(time.time()) + 1
+        while True:
+            canvas = queue.Acquire()
+            if second < time.time():
+                second = int(time.time()) + 1   # Fell behind, or the clock jumped.
+            countdown = self.Draw(canvas, datetime.datetime.fromtimestamp(second))
+            at = time.monotonic() + (second - time.time())
+            queue.Present(canvas, at)
+            if countdown == 4 and self.args.sound:
+                threading.Timer(at - time.monotonic(), subprocess.Popen,
+                                [["aplay", "-q", self.args.sound]]).start()
+            second += 1
+
+    def Draw(self, canvas, moment):
+        countdown = self.args.countdown - moment.second % self.args.countdown
+        if countdown == self.args.countdown:
+            canvas.Clear()
+            graphics.DrawText(canvas, self.start_font, 12, 21, GREEN, "START")
+            self.clock_text.Forget(canvas)
+            self.count_text.Forget(canvas)
+            self.cleared.discard(canvas)
+            return countdown
+
+        if canvas not in self.cleared:
+            canvas.Clear()
+            self.cleared.add(canvas)
+        self.clock_text.Draw(canvas, self.clock_sprites, moment.strftime("%H:%M:%S"))
+        sprites = self.count_sprites if countdown > 5 else self.clock_sprites
+        self.count_text.Draw(canvas, sprites, ": %d" % countdown)
+        return countdown
+
+
+# Main function
+if __name__ == "__main__":
+    race_clock = RaceClock()
+    if (not race_clock.process()):
+        race_clock.print_help()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 from samplebase import SampleBase
+from rgbmatrix import graphics
 import math
 
 
@@ -11,10 +12,6 @@ def scale_col(val, lo, hi):
     return 255 * (val - lo) / (hi - lo)
 
 
-def rotate(x, y, sin, cos):
-    return x * cos - y * sin, x * sin + y * cos
-
-
 class RotatingBlockGenerator(SampleBase):
     def __init__(self, *args, **kwargs):
         super(RotatingBlockGenerator, self).__init__(*args, **kwargs)
@@ -23,22 +20,20 @@ class RotatingBlockGenerator(SampleBase):
         cent_x = self.matrix.width / 2
         cent_y = self.matrix.height / 2
 
-        rotate_square = min(self.matrix.width, self.matrix.height) * 1.41
-        min_rotate = cent_x - rotate_square / 2
-        max_rotate = cent_x + rotate_square / 2
+        size = int(min(self.matrix.width, self.matrix.height) * 0.7)
 
-        display_square = min(self.matrix.width, self.matrix.height) * 0.7
-        min_display = cent_x - display_square / 2
-        max_display = cent_x + display_square / 2
+        # Pre calculate the block once as packed RGB; it is rotated natively
+        # every frame.
+        block = bytearray()
+        for y in range(size):
+            y_col = int(scale_col(y, 0, size - 1))
+            for x in range(size):
+                x_col = int(scale_col(x, 0, size - 1))
+                block += bytes((x_col, 255 - y_col, y_col))
 
         deg_to_rad = 2 * 3.14159265 / 360
         rotation = 0
 
-        # Pre calculate colors
-        col_table = []
-        for x in range(int(min_rotate), int(max_rotate)):
-            col_table.insert(x, scale_col(x, min_display, max_display))
-
         offset_canvas = self.matrix.CreateFrameCanvas()
 
         while True:
@@ -50,18 +45,14 @@ class RotatingBlockGenerator(SampleBase):
             sin = math.sin(angle)
             cos = math.cos(angle)
 
-            for x in range(int(min_rotate), int(max_rotate)):
-                for y in range(int(min_rotate), int(max_rotate)):
-                    # Our rotate center is always offset by cent_x
-                    rot_x, rot_y = rotate(x - cent_x, y - cent_x, sin, cos)
-
-                    if x >= min_display and x < max_display and y >= min_display and y < max_display:
-                        x_col = col_table[x]
-                        y_col = col_table[y]
-                        offset_canvas.SetPixel(rot_x + cent_x, rot_y + cent_y, x_col, 255 - y_col, y_col)
-                    else:
-                        offset_canvas.SetPixel(rot_x + cent_x, rot_y + cent_y, 0, 0, 0)
+            # Rotate around the block's center and move that to the canvas center.
+            half = size / 2
+            transform = (cos, -sin, cent_x - cos * half + sin * half,
+                         sin, cos, cent_y - sin * half - cos * half)
 
+            offset_canvas.Clear()
+            graphics.DrawImageTransformed(offset_canvas, block, transform,
+                                          width=size, height=size)
             offset_canvas = self.matrix.SwapOnVSync(offset_canvas)
 
 
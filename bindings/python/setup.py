@@ -22,6 +22,16 @@ graphics_ext = Extension(
     language            = 'c++'
 )
 
+particles_ext = Extension(
+    name                = 'particles',
+    sources             = ['rgbmatrix/particles.cpp'],
+    include_dirs        = ['../../include'],
+    library_dirs        = ['../../lib'],
+    libraries           = ['rgbmatrix'],
+    extra_compile_args  = ["-O3", "-march=native", "-mtune=native", "-flto=2", "-Wall"],
+    language            = 'c++'
+)
+
 setup(
     name                = 'rgbmatrix',
     version             = '0.0.1',
@@ -29,6 +39,8 @@ setup(
     author_email        = 'christoph.friedrich@vonaffenfels.de',
     classifiers         = ['Development Status :: 3 - Alpha'],
     ext_package         = 'rgbmatrix',
-    ext_modules         = [core_ext, graphics_ext],
-    packages            = ['rgbmatrix']
+    ext_modules         = [core_ext, graphics_ext, particles_ext],
+    packages            = ['rgbmatrix'],
+    # Ship the .pxd files so compiled scenes can `cimport rgbmatrix.core`.
+    package_data        = {'rgbmatrix': ['*.pxd']}
 )
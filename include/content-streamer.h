@@ -6,7 +6,9 @@
 // the Pi to avoid stuttering or brightness glitches.
 //
 // The disadvantage is, that this represents the full expanded internal
-// representation of a frame, so is very large memory wise.
+// representation of a frame, so is very large memory wise. Streams can
+// optionally be compressed (see StreamWriter), which shrinks animations
+// by about an order of magnitude.
 //
 // These abstractions are used in util/led-image-viewer.cc to read and
 // write such animations to disk. It is also used in util/video-viewer.cc
@@ -20,6 +22,8 @@
 #include <sys/types.h>
 
 #include <string>
+#include <utility>
+#include <vector>
 
 namespace rgb_matrix {
 class FrameCanvas;
@@ -41,6 +45,15 @@ public:
   // Write bytes from buffer. Similar to Posix behavior that allows short
   // writes.
   virtual ssize_t Append(const void *buf, size_t count) = 0;
+
+  // Go to "offset" bytes from the beginning of the stream. The default
+  // rewinds and reads up to there.
+  virtual bool Seek(size_t offset);
+
+  // Streams that hold their content in memory can return a pointer to the
+  // next "count" bytes instead of copying them, and advance past them.
+  // Returns NULL if not supported or not available; use Read() then.
+  virtual const char *ReadInPlace(size_t count) { return NULL; }
 };
 
 class FileStreamIO : public StreamIO {
@@ -51,6 +64,7 @@ public:
   void Rewind() final;
   ssize_t Read(void *buf, size_t count) final;
   ssize_t Append(const void *buf, size_t count) final;
+  bool Seek(size_t offset) final;
 
 private:
   const int fd_;
@@ -62,6 +76,8 @@ public:
   void Rewind() final;
   ssize_t Read(void *buf, size_t count) final;
   ssize_t Append(const void *buf, size_t count) final;
+  bool Seek(size_t offset) final;
+  const char *ReadInPlace(size_t count) final;
 
 private:
   std::string buffer_;  // super simplistic.
@@ -79,6 +95,8 @@ public:
 
   void Rewind() final;
   ssize_t Read(void *buf, size_t count) final;
+  bool Seek(size_t offset) final;
+  const char *ReadInPlace(size_t count) final;
 
   // No append, this is purely read-only.
   ssize_t Append(const void *buf, size_t count) final { return -1; }
@@ -92,7 +110,14 @@ private:
 class StreamWriter {
 public:
   // Does not take ownership of StreamIO
-  StreamWriter(StreamIO *io);
+  //
+  // With a "keyframe_interval" > 0, frames are stored compressed: as the
+  // run-length coded XOR difference to the previous frame, with a complete
+  // (also run-length coded) keyframe every keyframe_interval frames that
+  // StreamReader::SeekToFrame() can start from. Streams written like that
+  // can't be played by versions of this library before this format.
+  StreamWriter(StreamIO *io, int keyframe_interval = 0);
+  ~StreamWriter();
 
   // Stream out given canvas at the given time. "hold_time_us" indicates
   // for how long this frame is to be shown in microseconds.
@@ -103,6 +128,10 @@ private:
 
   StreamIO *const io_;
   bool header_written_;
+  const int keyframe_interval_;
+  int frames_since_keyframe_;
+  char *previous_frame_;      // Last frame written, for compressed streams.
+  std::string encoded_;
 };
 
 class StreamReader {
@@ -118,6 +147,17 @@ public:
   // or end of stream reached..
   bool GetNext(FrameCanvas *frame, uint32_t* hold_time_us);
 
+  // Make the next GetNext() return frame number "frame_number" (counting
+  // from 0). Compressed streams are decoded from the closest keyframe
+  // before it. There is no keyframe index in the stream: keyframe positions
+  // are only learned as frames are read. So the first seek into a part of
+  // the stream not read yet reads and decodes every frame up to the target,
+  // which takes time linear in frame_number even for a mmap()ed file. After
+  // that, seeking anywhere before the furthest frame read costs at most
+  // keyframe_interval frames. Returns 'false' if the stream ends before
+  // that frame.
+  bool SeekToFrame(const FrameCanvas &frame, uint32_t frame_number);
+
 private:
   enum State {
     STREAM_AT_BEGIN,
@@ -125,12 +165,20 @@ private:
     STREAM_ERROR,
   };
   bool ReadFileHeader(const FrameCanvas &frame);
+  // Read the next frame and point "data" to it: current_frame_, or the
+  // stream's memory for uncompressed frames if the stream supports that.
+  bool ReadFrame(uint32_t* hold_time_us, const char **data);
 
   StreamIO *io_;
   size_t frame_buf_size_;
   State state_;
 
-  char *header_frame_buffer_;
+  char *current_frame_;       // Frame read or decoded last.
+  std::string payload_;       // Compressed frame, if not read in place.
+  size_t offset_;             // Current position in the stream.
+  uint32_t frame_number_;     // Number of the next frame.
+  // Frame number and stream offset of keyframes seen so far, in order.
+  std::vector<std::pair<uint32_t, size_t> > keyframes_;
 };
 // Helpers for external C bridge wrappers.
 bool StreamIOIsCompatibleWithCanvas(StreamIO* io, FrameCanvas* frame);
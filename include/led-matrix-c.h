@@ -158,6 +158,13 @@ struct RGBLedMatrixOptions {
    * processes when waiting and renders single core boards more responsive.
    */
   bool disable_busy_waiting;     /* Corresponding flag: --led-busy-waiting */
+
+  /* Realtime priority and CPU bitmask of the refresh thread. 0 keeps the
+   * defaults (priority 99 on the last core); -1 keeps the scheduling or CPUs
+   * of the thread that creates the matrix (0 in RGBMatrix::Options).
+   */
+  int refresh_priority;  /* Corresponding flag: --led-refresh-priority */
+  int refresh_cpu_mask;  /* Corresponding flag: --led-refresh-cpu-mask */
 };
 
 /**
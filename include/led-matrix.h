@@ -159,6 +159,16 @@ public:
     // Sleep instead of busy wait to free CPU cycles but get slightly less
     // accurate frame timing.
     bool disable_busy_waiting;   // Flag: --led-busy-waiting
+
+    // Realtime (SCHED_FIFO) priority of the refresh thread, 1..99.
+    // 0 keeps the scheduling of the thread that creates the matrix.
+    int refresh_priority;        // Flag: --led-refresh-priority
+
+    // Bitmask of the CPUs the refresh thread may run on. Default is the
+    // last core of a Pi 2 or later, so the refresh is not interrupted by
+    // other work; keep your render threads off that core. 0 keeps the
+    // CPUs of the thread that creates the matrix.
+    int refresh_cpu_mask;        // Flag: --led-refresh-cpu-mask
   };
 
   // Factory to create a matrix. Additional functionality includes dropping
@@ -238,6 +248,22 @@ public:
   // time-correct animations.
   FrameCanvas *SwapOnVSync(FrameCanvas *other, unsigned framerate_fraction = 1);
 
+  // Non-blocking SwapOnVSync() for programs built around an event loop.
+  //
+  // Hands "other" to the refresh thread to be swapped in at the next vsync
+  // (or, as with SwapOnVSync(), only waits for it if NULL) and returns the
+  // currently active buffer right away. That buffer is still on display
+  // until the swap happened, which is signalled on the file descriptor
+  // returned by VSyncEventFd(): wait for it to become readable, then read()
+  // its 8 byte counter to reset it. Only one swap can be pending at a time.
+  FrameCanvas *ScheduleSwapOnVSync(FrameCanvas *other,
+                                   unsigned framerate_fraction = 1);
+
+  // An eventfd that becomes readable once a swap scheduled with
+  // ScheduleSwapOnVSync() happened. Owned by the RGBMatrix. Returns -1 if
+  // the refresh thread is not running.
+  int VSyncEventFd();
+
   // -- Setting shape and behavior of matrix.
 
   // Apply a pixel mapper. This is used to re-map pixels according to some
@@ -335,6 +361,7 @@ private:
 
 namespace internal {
 class Framebuffer;
+class VirtualFramebuffer;
 }
 
 class FrameCanvas : public Canvas {
@@ -346,6 +373,14 @@ public:
   bool SetPWMBits(uint8_t value);
   uint8_t pwmbits();
 
+  // Fewest PWM bits, up to pwmbits(), that show what is currently drawn
+  // with no color channel off by more than "tolerance" (a fraction of full
+  // brightness; 0 = exact). Saturated colors and text need few bits, and
+  // fewer bits refresh faster. Lowering the PWM bits afterwards keeps the content,
+  // but anything drawn at low PWM bits loses the lower bit planes, so draw
+  // at full PWM bits and lower them just before SwapOnVSync().
+  uint8_t RequiredPWMBits(float tolerance = 0) const;
+
   // Map brightness of output linearly to input with CIE1931 profile.
   void set_luminance_correct(bool on);
   bool luminance_correct() const;
@@ -390,6 +425,7 @@ public:
   
 private:
   friend class RGBMatrix;
+  friend class VirtualCanvas;
 
   FrameCanvas(internal::Framebuffer *frame) : frame_(frame){}
   virtual ~FrameCanvas();   // Any FrameCanvas is owned by RGBMatrix.
@@ -398,6 +434,48 @@ private:
   internal::Framebuffer *const frame_;
 };
 
+// A canvas of any size, typically larger than the display, whose pixels are
+// encoded into the internal FrameCanvas representation once when they are
+// set. CopyViewportTo() then fills a FrameCanvas with any window of it by
+// copying pre-encoded rows, so scrolling over large content costs about the
+// same as a CopyFrom() per frame, independent of the content.
+//
+// Colors are mapped with the brightness and luminance correction the
+// prototype FrameCanvas has at the time a pixel is set. Rows are only copied
+// with the standard panel layout; with multiplexing or pixel mappers the
+// viewport is copied pixel by pixel (still correct, just not faster).
+//
+// Unlike a FrameCanvas, the VirtualCanvas is owned by the caller.
+class VirtualCanvas : public Canvas {
+public:
+  // Create a width x height canvas for FrameCanvases like "prototype", which
+  // has to be owned by an RGBMatrix that outlives this canvas.
+  VirtualCanvas(FrameCanvas *prototype, int width, int height);
+  virtual ~VirtualCanvas();
+
+  // Copy the window starting at (x, y) into "target", which has to belong
+  // to the same RGBMatrix as the prototype. The window has the size of the
+  // target; the content wraps around at its edges, so any x and y are valid.
+  void CopyViewportTo(int x, int y, FrameCanvas *target) const;
+
+  // Copy the width x height rectangle starting at (x, y) to position
+  // (target_x, target_y) of "target", leaving the rest of the target as it
+  // is. The source wraps around like above; the destination is clipped.
+  void CopyRectTo(int x, int y, int width, int height,
+                  FrameCanvas *target, int target_x, int target_y) const;
+
+  // -- Canvas interface.
+  virtual int width() const;
+  virtual int height() const;
+  virtual void SetPixel(int x, int y,
+                        uint8_t red, uint8_t green, uint8_t blue);
+  virtual void Clear();
+  virtual void Fill(uint8_t red, uint8_t green, uint8_t blue);
+
+private:
+  internal::VirtualFramebuffer *const frame_;
+};
+
 // Runtime options to simplify doing common things for many programs such as
 // dropping privileges and becoming a daemon.
 struct RuntimeOptions {
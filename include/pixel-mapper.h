@@ -90,6 +90,45 @@ public:
   virtual MappingType GetMappingType() const { return VisibleToMatrix; }
 };
 
+// A PixelMapper that takes the position of every visible pixel from a table,
+// e.g. one computed once by a script for an odd wall geometry. Since the
+// matrix is set up through a lookup table anyway, this costs nothing once
+// applied.
+//
+// "table" holds a matrix (x, y) pair for each visible pixel, row by row, so
+// 2 * visible_width * visible_height entries. Visible pixels mapped to (-1, -1)
+// are not shown, e.g. for gaps in a wall.
+class LookupTablePixelMapper : public PixelMapper {
+public:
+  LookupTablePixelMapper(const char *name, int visible_width,
+                         int visible_height, const std::vector<int> &table);
+
+  virtual const char *GetName() const { return name_.c_str(); }
+  virtual bool SetParameters(int chain, int parallel,
+                             const char *parameter_string);
+  virtual bool GetSizeMapping(int matrix_width, int matrix_height,
+                              int *visible_width, int *visible_height) const;
+  virtual void MapVisibleToMatrix(int matrix_width, int matrix_height,
+                                  int visible_x, int visible_y,
+                                  int *matrix_x, int *matrix_y) const;
+  virtual bool MapMatrixToVisible(int matrix_width, int matrix_height,
+                                  int matrix_x, int matrix_y,
+                                  int *visible_x, int *visible_y) const;
+  // Looked up from the matrix side, so that hidden pixels don't show up as
+  // mapping errors.
+  virtual MappingType GetMappingType() const { return MatrixToVisible; }
+
+private:
+  const std::string name_;
+  const int visible_width_;
+  const int visible_height_;
+  const std::vector<int> table_;
+  // Inverse of table_: visible index per matrix pixel, -1 if not shown.
+  // Built in GetSizeMapping(), where the matrix size becomes known.
+  mutable std::vector<int> inverse_;
+  mutable int matrix_width_;
+};
+
 // This is a place to register PixelMappers globally. If you register your
 // PixelMapper before calling RGBMatrix::CreateFromFlags(), the named
 // PixelMapper is available in the --led-pixel-mapper options.
@@ -0,0 +1,119 @@
+// -*- mode: c++; c-basic-offset: 2; indent-tabs-mode: nil; -*-
+//
+// A queue of pre-rendered FrameCanvases that are put on the matrix at given
+// times by a background thread.
+//
+// With plain SwapOnVSync(), rendering and presenting happen in lockstep: the
+// renderer blocks until its frame is shown. Producers that deliver frames in
+// bursts (network receivers, video decoders) then either stall or show frames
+// early. With a PresentationQueue they draw ahead into free canvases and queue
+// each one with the time it should appear; the queue thread swaps it in at
+// that time and hands the canvas it replaced back to the free list.
+//
+// Example:
+/*
+  rgb_matrix::PresentationQueue queue(matrix, 3);  // triple buffering
+  for (;;) {
+    FrameCanvas *frame = queue.AcquireFrame();     // waits for a free one
+    DrawNextFrame(frame);
+    queue.Present(frame, start_us + n++ * frame_period_us);
+  }
+*/
+
+#ifndef RPI_PRESENTATION_QUEUE_H
+#define RPI_PRESENTATION_QUEUE_H
+
+#include <stdint.h>
+#include <pthread.h>
+
+#include <deque>
+#include <vector>
+
+#include "thread.h"
+
+namespace rgb_matrix {
+class RGBMatrix;
+class FrameCanvas;
+
+class PresentationQueue {
+public:
+  // Creates "depth" FrameCanvases on "matrix", which has to outlive the
+  // queue. Once the first frame is shown, one canvas is always on display,
+  // so depth - 1 frames can be drawn or waiting at the same time. A depth
+  // of 3 is classic triple buffering.
+  //
+  // While a queue is active, don't call SwapOnVSync() on the matrix
+  // yourself.
+  PresentationQueue(RGBMatrix *matrix, int depth);
+  ~PresentationQueue();
+
+  // Current time on the clock used for presentation times: CLOCK_MONOTONIC
+  // in microseconds.
+  static int64_t Now();
+
+  // Returns a free canvas to draw the next frame into. If none is free,
+  // waits up to "timeout_ms" (forever if negative) for the queue to recycle
+  // one. Returns NULL on timeout.
+  //
+  // The canvas still holds whatever was drawn into it before.
+  FrameCanvas *AcquireFrame(long timeout_ms = -1);
+
+  // Queue a canvas obtained from AcquireFrame() to be shown at
+  // "present_at_us" (see Now()); frames due already are shown right away.
+  // Frames are shown in the order they were queued, each at the first
+  // refresh after its time. If several queued frames are due at once, only
+  // the newest of them is shown and the others are dropped.
+  //
+  // Returns false and ignores the canvas if it is not currently acquired,
+  // e.g. when it was presented or released already.
+  bool Present(FrameCanvas *frame, int64_t present_at_us);
+
+  // Give back a canvas obtained from AcquireFrame() without showing it.
+  // Returns false and ignores the canvas if it is not currently acquired.
+  bool Release(FrameCanvas *frame);
+
+  // Number of frames waiting to be shown.
+  int queued() const;
+
+  // Statistics. Lateness is the time between a frame's presentation time
+  // and the swap that put it on the matrix.
+  uint64_t frames_presented() const;
+  uint64_t frames_dropped() const;
+  int64_t total_lateness_us() const;
+  int64_t max_lateness_us() const;
+
+private:
+  class PresenterThread;
+  friend class PresenterThread;
+
+  struct Entry {
+    FrameCanvas *frame;
+    int64_t present_at_us;
+  };
+
+  void PresentLoop();
+  void Recycle(FrameCanvas *frame);   // Call with mutex_ held.
+  bool GiveBack(FrameCanvas *frame);  // Call with mutex_ held.
+
+  RGBMatrix *const matrix_;
+  std::vector<FrameCanvas*> frames_;  // All canvases this queue created.
+
+  mutable pthread_mutex_t mutex_;
+  pthread_cond_t queue_changed_;      // Waited on by the presenter.
+  pthread_cond_t frame_freed_;        // Waited on by AcquireFrame().
+  std::deque<Entry> queue_;
+  std::vector<FrameCanvas*> free_;
+  std::vector<FrameCanvas*> acquired_;  // Handed out by AcquireFrame().
+  bool running_;
+
+  uint64_t frames_presented_;
+  uint64_t frames_dropped_;
+  int64_t total_lateness_us_;
+  int64_t max_lateness_us_;
+
+  PresenterThread *presenter_;
+};
+
+}  // namespace rgb_matrix
+
+#endif  // RPI_PRESENTATION_QUEUE_H
@@ -48,6 +48,149 @@ struct FrameHeader {
   uint64_t future_use3;
 };
 STATIC_ASSERT(file_header_size_changed, sizeof(FrameHeader) == 32);
+
+// Frames of compressed streams. Their FrameHeader::size is the size of the
+// run-length coded payload. Keyframes code the frame itself, delta frames
+// the XOR with the previous frame, which is mostly zero for animations.
+static const uint32_t kKeyFrameMagicValue = 0x12345679;
+static const uint32_t kDeltaFrameMagicValue = 0x1234567A;
+
+// The payload is a sequence of runs over the gpio_bits_t words of the
+// frame, each starting with a uint32_t control word: the run type in the
+// top two bits, the number of words in the rest.
+enum RunType {
+  kZeroRun = 0,     // No data follows.
+  kRepeatRun = 1,   // One word follows, repeated.
+  kLiteralRun = 2,  // The words follow.
+};
+static const int kRunTypeShift = 30;
+static const uint32_t kMaxRunLength = (1u << kRunTypeShift) - 1;
+
+// Streams may be mmap()ed, so words are not necessarily aligned.
+static inline gpio_bits_t LoadWord(const char *data) {
+  gpio_bits_t result;
+  memcpy(&result, data, sizeof(result));
+  return result;
+}
+
+class RunEncoder {
+public:
+  // Encode "data", XORed with "reference" unless that is NULL.
+  RunEncoder(const char *data, const char *reference, size_t len)
+    : data_(data), reference_(reference), size_(len / sizeof(gpio_bits_t)) {}
+
+  void EncodeTo(std::string *out) const {
+    size_t i = 0;
+    while (i < size_) {
+      const gpio_bits_t value = Word(i);
+      size_t run = 1;
+      while (i + run < size_ && run < kMaxRunLength && Word(i + run) == value)
+        ++run;
+      if (value == 0) {
+        AppendControl(kZeroRun, run, out);
+        i += run;
+        continue;
+      }
+      if (run >= 3) {  // Shorter repeats are cheaper as literals.
+        AppendControl(kRepeatRun, run, out);
+        out->append((const char*)&value, sizeof(value));
+        i += run;
+        continue;
+      }
+      // Literals up to the next zero or repeat.
+      size_t end = i;
+      while (end < size_ && end - i < kMaxRunLength) {
+        const gpio_bits_t v = Word(end);
+        if (v == 0) break;
+        if (end + 2 < size_ && Word(end + 1) == v && Word(end + 2) == v) break;
+        ++end;
+      }
+      AppendControl(kLiteralRun, end - i, out);
+      for (; i < end; ++i) {
+        const gpio_bits_t v = Word(i);
+        out->append((const char*)&v, sizeof(v));
+      }
+    }
+  }
+
+private:
+  gpio_bits_t Word(size_t i) const {
+    const size_t offset = i * sizeof(gpio_bits_t);
+    const gpio_bits_t value = LoadWord(data_ + offset);
+    return reference_ ? value ^ LoadWord(reference_ + offset) : value;
+  }
+
+  static void AppendControl(RunType type, size_t count, std::string *out) {
+    const uint32_t control = ((uint32_t)type << kRunTypeShift) | count;
+    out->append((const char*)&control, sizeof(control));
+  }
+
+  const char *const data_;
+  const char *const reference_;
+  const size_t size_;
+};
+
+// Decode runs into "frame" of "len" bytes, XORing them into what is there
+// for delta frames. Returns false on a corrupt payload.
+static bool DecodeRuns(const char *in, size_t in_len, bool is_delta,
+                       char *frame, size_t len) {
+  gpio_bits_t *const words = reinterpret_cast<gpio_bits_t*>(frame);
+  const size_t size = len / sizeof(gpio_bits_t);
+  const char *const end = in + in_len;
+  size_t pos = 0;
+  while (in < end) {
+    if (end - in < (ssize_t)sizeof(uint32_t)) return false;
+    uint32_t control;
+    memcpy(&control, in, sizeof(control));
+    in += sizeof(control);
+    const size_t count = control & kMaxRunLength;
+    if (count > size - pos) return false;
+    switch (control >> kRunTypeShift) {
+    case kZeroRun:
+      if (!is_delta) memset(words + pos, 0, count * sizeof(gpio_bits_t));
+      break;
+    case kRepeatRun: {
+      if (end - in < (ssize_t)sizeof(gpio_bits_t)) return false;
+      const gpio_bits_t value = LoadWord(in);
+      in += sizeof(gpio_bits_t);
+      if (is_delta) {
+        for (size_t i = pos; i < pos + count; ++i) words[i] ^= value;
+      } else {
+        std::fill(words + pos, words + pos + count, value);
+      }
+      break;
+    }
+    case kLiteralRun: {
+      const size_t bytes = count * sizeof(gpio_bits_t);
+      if ((size_t)(end - in) < bytes) return false;
+      if (is_delta) {
+        for (size_t i = 0; i < count; ++i) {
+          words[pos + i] ^= LoadWord(in + i * sizeof(gpio_bits_t));
+        }
+      } else {
+        memcpy(words + pos, in, bytes);
+      }
+      in += bytes;
+      break;
+    }
+    default:
+      return false;
+    }
+    pos += count;
+  }
+  return pos == size;
+}
+}
+
+bool StreamIO::Seek(size_t offset) {
+  Rewind();
+  char buffer[4096];
+  while (offset > 0) {
+    const ssize_t r = Read(buffer, std::min(offset, sizeof(buffer)));
+    if (r <= 0) return false;
+    offset -= r;
+  }
+  return true;
 }
 
 FileStreamIO::FileStreamIO(int fd) : fd_(fd) {
@@ -65,6 +208,10 @@ ssize_t FileStreamIO::Append(const void *buf, const size_t count) {
   return write(fd_, buf, count);
 }
 
+bool FileStreamIO::Seek(size_t offset) {
+  return lseek(fd_, offset, SEEK_SET) == (off_t)offset;
+}
+
 void MemStreamIO::Rewind() { pos_ = 0; }
 ssize_t MemStreamIO::Read(void *buf, size_t count) {
   const size_t amount = std::min(count, buffer_.size() - pos_);
@@ -76,6 +223,17 @@ ssize_t MemStreamIO::Append(const void *buf, size_t count) {
   buffer_.append((const char*)buf, count);
   return count;
 }
+bool MemStreamIO::Seek(size_t offset) {
+  if (offset > buffer_.size()) return false;
+  pos_ = offset;
+  return true;
+}
+const char *MemStreamIO::ReadInPlace(size_t count) {
+  if (count > buffer_.size() - pos_) return NULL;
+  const char *result = buffer_.data() + pos_;
+  pos_ += count;
+  return result;
+}
 
 MemMapViewInput::MemMapViewInput(int fd) : buffer_(nullptr) {
   struct stat s;
@@ -101,11 +259,22 @@ MemMapViewInput::MemMapViewInput(int fd) : buffer_(nullptr) {
 
 void MemMapViewInput::Rewind() { pos_ = buffer_; }
 ssize_t MemMapViewInput::Read(void *buf, size_t count) {
-  if (pos_ + count >= end_) return -1;
+  if (count > (size_t)(end_ - pos_)) return -1;
   memcpy(buf, pos_, count);
   pos_ += count;
   return count;
 }
+bool MemMapViewInput::Seek(size_t offset) {
+  if (offset > (size_t)(end_ - buffer_)) return false;
+  pos_ = buffer_ + offset;
+  return true;
+}
+const char *MemMapViewInput::ReadInPlace(size_t count) {
+  if (count > (size_t)(end_ - pos_)) return NULL;
+  const char *result = pos_;
+  pos_ += count;
+  return result;
+}
 
 MemMapViewInput::~MemMapViewInput() {
   if (buffer_) munmap(buffer_, end_ - buffer_);
@@ -136,7 +305,11 @@ static bool FullAppend(StreamIO *io, const void *buf, const size_t count) {
   return remaining == 0;
 }
 
-StreamWriter::StreamWriter(StreamIO *io) : io_(io), header_written_(false) {}
+StreamWriter::StreamWriter(StreamIO *io, int keyframe_interval)
+  : io_(io), header_written_(false), keyframe_interval_(keyframe_interval),
+    frames_since_keyframe_(0), previous_frame_(NULL) {}
+StreamWriter::~StreamWriter() { delete [] previous_frame_; }
+
 bool StreamWriter::Stream(const FrameCanvas &frame, uint32_t hold_time_us) {
   const char *data;
   size_t len;
@@ -146,11 +319,26 @@ bool StreamWriter::Stream(const FrameCanvas &frame, uint32_t hold_time_us) {
     WriteFileHeader(frame, len);
   }
   FrameHeader h = {};
-  h.magic = kFrameMagicValue;
-  h.size = len;
   h.hold_time_us = hold_time_us;
+  if (keyframe_interval_ <= 0) {
+    h.magic = kFrameMagicValue;
+    h.size = len;
+    FullAppend(io_, &h, sizeof(h));
+    return FullAppend(io_, data, len);
+  }
+
+  const bool keyframe = (previous_frame_ == NULL
+                         || frames_since_keyframe_ >= keyframe_interval_);
+  if (previous_frame_ == NULL) previous_frame_ = new char [len];
+  encoded_.clear();
+  RunEncoder(data, keyframe ? NULL : previous_frame_, len).EncodeTo(&encoded_);
+  memcpy(previous_frame_, data, len);
+  frames_since_keyframe_ = keyframe ? 1 : frames_since_keyframe_ + 1;
+
+  h.magic = keyframe ? kKeyFrameMagicValue : kDeltaFrameMagicValue;
+  h.size = encoded_.size();
   FullAppend(io_, &h, sizeof(h));
-  return FullAppend(io_, data, len) == (ssize_t)len;
+  return FullAppend(io_, encoded_.data(), encoded_.size());
 }
 
 void StreamWriter::WriteFileHeader(const FrameCanvas &frame, size_t len) {
@@ -165,10 +353,11 @@ void StreamWriter::WriteFileHeader(const FrameCanvas &frame, size_t len) {
 }
 
 StreamReader::StreamReader(StreamIO *io)
-  : io_(io), state_(STREAM_AT_BEGIN), header_frame_buffer_(NULL) {
+  : io_(io), state_(STREAM_AT_BEGIN), current_frame_(NULL),
+    offset_(0), frame_number_(0) {
   io_->Rewind();
 }
-StreamReader::~StreamReader() { delete [] header_frame_buffer_; }
+StreamReader::~StreamReader() { delete [] current_frame_; }
 
 void StreamReader::Rewind() {
   io_->Rewind();
@@ -179,31 +368,86 @@ bool StreamReader::GetNext(FrameCanvas *frame, uint32_t* hold_time_us) {
   if (state_ == STREAM_AT_BEGIN && !ReadFileHeader(*frame)) return false;
   if (state_ != STREAM_READING) return false;
 
-  // Read header and expected buffer size.
-  if (!FullRead(io_, header_frame_buffer_,
-                sizeof(FrameHeader) + frame_buf_size_)) {
-    return false;
+  const char *data;
+  if (!ReadFrame(hold_time_us, &data)) return false;
+  return frame->Deserialize(data, frame_buf_size_);
+}
+
+bool StreamReader::SeekToFrame(const FrameCanvas &frame,
+                               uint32_t frame_number) {
+  if (state_ == STREAM_AT_BEGIN && !ReadFileHeader(frame)) return false;
+  if (state_ != STREAM_READING) return false;
+
+  // Closest known keyframe; the first frame always is one.
+  std::pair<uint32_t, size_t> start(0, sizeof(FileHeader));
+  for (size_t i = 0; i < keyframes_.size(); ++i) {
+    if (keyframes_[i].first > frame_number) break;
+    start = keyframes_[i];
+  }
+  // Unless we are between that keyframe and the frame already.
+  if (frame_number_ <= start.first || frame_number_ > frame_number) {
+    if (!io_->Seek(start.second)) return false;
+    offset_ = start.second;
+    frame_number_ = start.first;
   }
+  while (frame_number_ < frame_number) {
+    const char *data;
+    if (!ReadFrame(NULL, &data)) return false;
+  }
+  return true;
+}
 
-  const FrameHeader &h = *reinterpret_cast<FrameHeader*>(header_frame_buffer_);
+bool StreamReader::ReadFrame(uint32_t* hold_time_us, const char **data) {
+  FrameHeader h;
+  if (!FullRead(io_, &h, sizeof(h))) return false;
 
   // TODO: we might allow for this to be a kFileMagicValue, to allow people
   // to just concatenate streams. In that case, we just would need to read
   // ahead past this header (both headers are designed to be same size)
-  if (h.magic != kFrameMagicValue) {
+  const bool is_key = (h.magic == kFrameMagicValue
+                       || h.magic == kKeyFrameMagicValue);
+  if (!is_key && h.magic != kDeltaFrameMagicValue) {
     state_ = STREAM_ERROR;
     return false;
   }
 
   // In the future, we might allow larger buffers (audio?), but never smaller.
-  // For now, we need to make sure to exactly match the size, as our assumption
-  // above is that we can read the full header + frame in one FullRead().
-  if (h.size != frame_buf_size_)
+  // For now, we need to make sure to exactly match the size.
+  if (h.magic == kFrameMagicValue && h.size != frame_buf_size_)
     return false;
 
+  // Uncompressed frames are used in place if possible. A stream is either
+  // compressed or not, so this never leaves a delta without its reference.
+  const char *payload = io_->ReadInPlace(h.size);
+  if (payload == NULL) {
+    char *buffer = current_frame_;
+    if (h.magic != kFrameMagicValue) {
+      payload_.resize(h.size);
+      buffer = &payload_[0];
+    }
+    if (!FullRead(io_, buffer, h.size)) return false;
+    payload = buffer;
+  }
+
+  if (is_key && (keyframes_.empty()
+                 || keyframes_.back().first < frame_number_)) {
+    keyframes_.push_back(std::make_pair(frame_number_, offset_));
+  }
+  offset_ += sizeof(h) + h.size;
+  ++frame_number_;
+
+  if (h.magic == kFrameMagicValue) {
+    *data = payload;
+  } else {
+    if (!DecodeRuns(payload, h.size, h.magic == kDeltaFrameMagicValue,
+                    current_frame_, frame_buf_size_)) {
+      state_ = STREAM_ERROR;
+      return false;
+    }
+    *data = current_frame_;
+  }
   if (hold_time_us) *hold_time_us = h.hold_time_us;
-  return frame->Deserialize(header_frame_buffer_ + sizeof(FrameHeader),
-                            frame_buf_size_);
+  return true;
 }
 
 bool StreamReader::ReadFileHeader(const FrameCanvas &frame) {
@@ -232,8 +476,10 @@ bool StreamReader::ReadFileHeader(const FrameCanvas &frame) {
   }
   state_ = STREAM_READING;
   frame_buf_size_ = header.buf_size;
-  if (!header_frame_buffer_)
-    header_frame_buffer_ = new char [ sizeof(FrameHeader) + header.buf_size ];
+  if (!current_frame_)
+    current_frame_ = new char [ header.buf_size ];
+  offset_ = sizeof(header);
+  frame_number_ = 0;
   return true;
 }
 // Namespace-scoped helper for canvas-aware compatibility so it can access
@@ -106,6 +106,11 @@ public:
   bool SetPWMBits(uint8_t value);
   uint8_t pwmbits() { return pwm_bits_; }
 
+  // Fewest PWM bits (at most pwmbits()) that show the current content with
+  // no color channel off by more than "tolerance" (a fraction of full
+  // brightness) compared to showing it with pwmbits().
+  uint8_t RequiredPWMBits(float tolerance) const;
+
   // Map brightness of output linearly to input with CIE1931 profile.
   void set_luminance_correct(bool on) { do_luminance_correct_ = on; }
   bool luminance_correct() const { return do_luminance_correct_; }
@@ -134,6 +139,8 @@ public:
   void SubFill(int x, int y, int width, int height, uint8_t red, uint8_t green, uint8_t blue);
 
 private:
+  friend class VirtualFramebuffer;
+
   static const struct HardwareMapping *hardware_mapping_;
   static RowAddressSetter *row_setter_;
 
@@ -174,6 +181,53 @@ private:
 
   PixelDesignatorMap **shared_mapper_;  // Storage in RGBMatrix.
 };
+
+// Content of arbitrary size, stored in the bitplane representation of the
+// Framebuffers it was created for, so that any window of it can be copied
+// into such a Framebuffer without encoding pixels again.
+//
+// A Framebuffer double-row holds the same row of each (chain, upper/lower
+// half) band, each band using its own color bits. Every row of the content
+// is therefore encoded once per band; a viewport is assembled by copying the
+// bitplane columns of the right row for the first band and OR-ing in the
+// others. This only works with the default panel layout; with multiplexing
+// or pixel mappers applied, pixels are copied one by one instead.
+class VirtualFramebuffer {
+public:
+  VirtualFramebuffer(Framebuffer *prototype, int width, int height);
+  ~VirtualFramebuffer();
+
+  int width() const { return width_; }
+  int height() const { return height_; }
+  void SetPixel(int x, int y, uint8_t red, uint8_t green, uint8_t blue);
+  void Fill(uint8_t red, uint8_t green, uint8_t blue);
+
+  // Copy the window of target's size starting at (x, y) into target. The
+  // content wraps around in both directions.
+  void CopyViewportTo(int x, int y, Framebuffer *target) const;
+
+  // Copy the width x height rectangle at (x, y) to (target_x, target_y) in
+  // target, leaving the rest of target alone. The source wraps around like
+  // in CopyViewportTo(); the destination is clipped to the target.
+  void CopyRectTo(int x, int y, int width, int height,
+                  Framebuffer *target, int target_x, int target_y) const;
+
+private:
+  static constexpr int kBitPlanes = Framebuffer::kBitPlanes;
+
+  bool CheckDefaultLayout();
+  inline gpio_bits_t *EncodedRow(int y, int band, int bit) const;
+
+  Framebuffer *const prototype_;  // Color mapping and layout.
+  const int width_;
+  const int height_;
+  const int bands_;
+  const PixelDesignatorMap *layout_;  // Mapper the encoding is valid for.
+  std::vector<PixelDesignator> band_bits_;
+  gpio_bits_t unused_bits_;  // Other chains' bits, set with inverse colors.
+  uint8_t *rgb_;             // Plain copy for the per-pixel fallback.
+  gpio_bits_t *bitplanes_;   // NULL if the layout is not supported.
+};
 }  // namespace internal
 }  // namespace rgb_matrix
 #endif // RPI_RGBMATRIX_FRAMEBUFFER_INTERNAL_H
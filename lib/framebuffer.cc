@@ -614,6 +614,48 @@ bool Framebuffer::SetPWMBits(uint8_t value) {
   return true;
 }
 
+uint8_t Framebuffer::RequiredPWMBits(float tolerance) const {
+  const PixelDesignator &fill = (*shared_mapper_)->GetFillColorBits();
+  const gpio_bits_t color_bits = fill.r_bit | fill.g_bit | fill.b_bit;
+  const int min_bit_plane = kBitPlanes - pwm_bits_;
+  const int full = (1 << kBitPlanes) - 1;
+
+  // Collect the channel values that occur in the frame.
+  bool present[1 << kBitPlanes] = {};
+  for (int row = 0; row < double_rows_; ++row) {
+    for (int col = 0; col < columns_; ++col) {
+      const gpio_bits_t *const data = bitplane_buffer_
+        + row * (columns_ * kBitPlanes) + col;
+      for (gpio_bits_t remaining = color_bits; remaining; ) {
+        const gpio_bits_t color_bit = remaining & (~remaining + 1);
+        remaining &= ~color_bit;
+        int value = 0;
+        for (int bit = min_bit_plane; bit < kBitPlanes; ++bit) {
+          if (data[bit * columns_] & color_bit) value |= 1 << bit;
+        }
+        // With inverse colors, a cleared bit is a lit one.
+        if (inverse_color_) value = ~value & full & ~((1 << min_bit_plane) - 1);
+        present[value] = true;
+      }
+    }
+  }
+
+  // Fewer bit planes make the refresh shorter, so the planes that remain
+  // get a bigger share of it: brightness is relative to the planes shown.
+  const float reference_full = full & ~((1 << min_bit_plane) - 1);
+  for (int bits = 1; bits < pwm_bits_; ++bits) {
+    const int kept = full & ~((1 << (kBitPlanes - bits)) - 1);
+    bool good_enough = true;
+    for (int value = 0; value <= full && good_enough; ++value) {
+      if (!present[value]) continue;
+      const float error = (value & kept) / (float)kept - value / reference_full;
+      good_enough = fabsf(error) <= tolerance;
+    }
+    if (good_enough) return bits;
+  }
+  return pwm_bits_;
+}
+
 inline gpio_bits_t *Framebuffer::ValueAt(int double_row, int column, int bit) {
   return &bitplane_buffer_[ double_row * (columns_ * kBitPlanes)
                             + bit * columns_
@@ -973,5 +1015,209 @@ void Framebuffer::DumpToMatrix(GPIO *io, int pwm_low_bit) {
     }
   }
 }
+
+VirtualFramebuffer::VirtualFramebuffer(Framebuffer *prototype,
+                                       int width, int height)
+  : prototype_(prototype), width_(width), height_(height),
+    bands_(prototype->height_ / prototype->double_rows_),
+    layout_(NULL), unused_bits_(0), bitplanes_(NULL) {
+  assert(width_ > 0 && height_ > 0);
+  rgb_ = new uint8_t[width_ * height_ * 3];
+  if (CheckDefaultLayout()) {
+    bitplanes_ = new gpio_bits_t[(size_t)width_ * height_ * bands_ * kBitPlanes];
+  }
+  Fill(0, 0, 0);
+}
+
+VirtualFramebuffer::~VirtualFramebuffer() {
+  delete [] bitplanes_;
+  delete [] rgb_;
+}
+
+// Rows can only be copied if every pixel still sits where
+// InitDefaultDesignator() put it, and all pixels of a band share color bits.
+bool VirtualFramebuffer::CheckDefaultLayout() {
+  PixelDesignatorMap *const mapper = *prototype_->shared_mapper_;
+  const int double_rows = prototype_->double_rows_;
+  if (mapper->width() != prototype_->columns_ ||
+      mapper->height() != prototype_->height_)
+    return false;
+  const gpio_bits_t *const base = prototype_->bitplane_buffer_;
+  band_bits_.resize(bands_);
+  for (int band = 0; band < bands_; ++band) {
+    band_bits_[band] = *mapper->get(0, band * double_rows);
+  }
+  for (int y = 0; y < mapper->height(); ++y) {
+    const PixelDesignator &band = band_bits_[y / double_rows];
+    for (int x = 0; x < mapper->width(); ++x) {
+      const PixelDesignator *d = mapper->get(x, y);
+      if (d == NULL
+          || d->gpio_word != prototype_->ValueAt(y % double_rows, x, 0) - base
+          || d->r_bit != band.r_bit || d->g_bit != band.g_bit
+          || d->b_bit != band.b_bit)
+        return false;
+    }
+  }
+  if (prototype_->inverse_color_) {
+    // Fill() sets the color bits of all possible chains, so do we.
+    const PixelDesignator &fill = mapper->GetFillColorBits();
+    unused_bits_ = fill.r_bit | fill.g_bit | fill.b_bit;
+    for (int band = 0; band < bands_; ++band) {
+      unused_bits_ &= band_bits_[band].mask;
+    }
+  }
+  layout_ = mapper;
+  return true;
+}
+
+inline gpio_bits_t *VirtualFramebuffer::EncodedRow(int y, int band,
+                                                   int bit) const {
+  return &bitplanes_[(((size_t)y * bands_ + band) * kBitPlanes + bit) * width_];
+}
+
+void VirtualFramebuffer::SetPixel(int x, int y,
+                                  uint8_t r, uint8_t g, uint8_t b) {
+  if (x < 0 || x >= width_ || y < 0 || y >= height_) return;
+  uint8_t *rgb = rgb_ + (y * width_ + x) * 3;
+  rgb[0] = r;
+  rgb[1] = g;
+  rgb[2] = b;
+  if (bitplanes_ == NULL) return;
+
+  uint16_t red, green, blue;
+  prototype_->MapColors(r, g, b, &red, &green, &blue);
+  for (int band = 0; band < bands_; ++band) {
+    const PixelDesignator &bits = band_bits_[band];
+    gpio_bits_t *word = EncodedRow(y, band, 0) + x;
+    for (int bit = 0; bit < kBitPlanes; ++bit) {
+      const uint16_t mask = 1 << bit;
+      gpio_bits_t color_bits = 0;
+      if (red & mask)   color_bits |= bits.r_bit;
+      if (green & mask) color_bits |= bits.g_bit;
+      if (blue & mask)  color_bits |= bits.b_bit;
+      *word = color_bits;
+      word += width_;
+    }
+  }
+}
+
+void VirtualFramebuffer::Fill(uint8_t r, uint8_t g, uint8_t b) {
+  for (int x = 0; x < width_; ++x) {
+    SetPixel(x, 0, r, g, b);
+  }
+  // All rows are alike now, replicate the first one.
+  for (int y = 1; y < height_; ++y) {
+    memcpy(rgb_ + y * width_ * 3, rgb_, width_ * 3);
+    if (bitplanes_) {
+      memcpy(EncodedRow(y, 0, 0), EncodedRow(0, 0, 0),
+             bands_ * kBitPlanes * width_ * sizeof(gpio_bits_t));
+    }
+  }
+}
+
+void VirtualFramebuffer::CopyViewportTo(int x, int y,
+                                        Framebuffer *target) const {
+  x %= width_;
+  if (x < 0) x += width_;
+  y %= height_;
+  if (y < 0) y += height_;
+
+  if (bitplanes_ == NULL || *target->shared_mapper_ != layout_) {
+    const int target_width = target->width();
+    const int target_height = target->height();
+    for (int row = 0; row < target_height; ++row) {
+      const uint8_t *src = rgb_ + ((y + row) % height_) * width_ * 3;
+      for (int col = 0; col < target_width; ++col) {
+        const uint8_t *rgb = src + ((x + col) % width_) * 3;
+        target->SetPixel(col, row, rgb[0], rgb[1], rgb[2]);
+      }
+    }
+    return;
+  }
+
+  const int columns = target->columns_;
+  const int double_rows = target->double_rows_;
+  for (int row = 0; row < double_rows; ++row) {
+    for (int bit = kBitPlanes - target->pwm_bits_; bit < kBitPlanes; ++bit) {
+      gpio_bits_t *const dest = target->ValueAt(row, 0, bit);
+      for (int band = 0; band < bands_; ++band) {
+        const gpio_bits_t *const src =
+          EncodedRow((y + band * double_rows + row) % height_, band, bit);
+        // Copy in runs up to the right edge of the content, then wrap.
+        for (int col = 0, src_col = x; col < columns; src_col = 0) {
+          const int run = std::min(columns - col, width_ - src_col);
+          if (band == 0) {
+            memcpy(dest + col, src + src_col, run * sizeof(gpio_bits_t));
+          } else {
+            for (int i = 0; i < run; ++i) {
+              dest[col + i] |= src[src_col + i];
+            }
+          }
+          col += run;
+        }
+      }
+      if (unused_bits_) {
+        for (int col = 0; col < columns; ++col) {
+          dest[col] |= unused_bits_;
+        }
+      }
+    }
+  }
+}
+
+void VirtualFramebuffer::CopyRectTo(int x, int y, int width, int height,
+                                    Framebuffer *target,
+                                    int target_x, int target_y) const {
+  if (target_x < 0) {
+    x -= target_x;
+    width += target_x;
+    target_x = 0;
+  }
+  if (target_y < 0) {
+    y -= target_y;
+    height += target_y;
+    target_y = 0;
+  }
+  width = std::min(width, target->width() - target_x);
+  height = std::min(height, target->height() - target_y);
+  if (width <= 0 || height <= 0) return;
+  x %= width_;
+  if (x < 0) x += width_;
+  y %= height_;
+  if (y < 0) y += height_;
+
+  if (bitplanes_ == NULL || *target->shared_mapper_ != layout_) {
+    for (int row = 0; row < height; ++row) {
+      const uint8_t *src = rgb_ + ((y + row) % height_) * width_ * 3;
+      for (int col = 0; col < width; ++col) {
+        const uint8_t *rgb = src + ((x + col) % width_) * 3;
+        target->SetPixel(target_x + col, target_y + row, rgb[0], rgb[1], rgb[2]);
+      }
+    }
+    return;
+  }
+
+  // Unlike a full viewport, a rectangle shares its target words with pixels
+  // outside of it, so only the bits of its own band are replaced.
+  const int double_rows = target->double_rows_;
+  for (int row = 0; row < height; ++row) {
+    const int target_row = target_y + row;
+    const int band = target_row / double_rows;
+    const gpio_bits_t keep = band_bits_[band].mask;
+    const int src_row = (y + row) % height_;
+    for (int bit = kBitPlanes - target->pwm_bits_; bit < kBitPlanes; ++bit) {
+      gpio_bits_t *const dest =
+        target->ValueAt(target_row % double_rows, target_x, bit);
+      const gpio_bits_t *const src = EncodedRow(src_row, band, bit);
+      for (int col = 0, src_col = x; col < width; src_col = 0) {
+        const int run = std::min(width - col, width_ - src_col);
+        for (int i = 0; i < run; ++i) {
+          dest[col + i] = (dest[col + i] & keep) | src[src_col + i];
+        }
+        col += run;
+      }
+    }
+  }
+}
 }  // namespace internal
 }  // namespace rgb_matrix
@@ -90,6 +90,12 @@ static struct RGBLedMatrix *led_matrix_create_from_options_optional_edit(
     OPT_COPY_IF_SET(limit_refresh_rate_hz);
     OPT_COPY_IF_SET(disable_busy_waiting);
 #undef OPT_COPY_IF_SET
+    // Here, 0 is the default, so -1 stands for the C++ 0: inherit.
+#define OPT_COPY_INHERIT_IF_SET(o) \
+    if (opts->o) default_opts.o = (opts->o < 0) ? 0 : opts->o
+    OPT_COPY_INHERIT_IF_SET(refresh_priority);
+    OPT_COPY_INHERIT_IF_SET(refresh_cpu_mask);
+#undef OPT_COPY_INHERIT_IF_SET
   }
 
   if (rt_opts) {
@@ -137,6 +143,10 @@ static struct RGBLedMatrix *led_matrix_create_from_options_optional_edit(
     ACTUAL_VALUE_BACK_TO_OPT(limit_refresh_rate_hz);
     ACTUAL_VALUE_BACK_TO_OPT(disable_busy_waiting);
 #undef ACTUAL_VALUE_BACK_TO_OPT
+#define INHERIT_VALUE_BACK_TO_OPT(o) opts->o = matrix_options.o ? matrix_options.o : -1
+    INHERIT_VALUE_BACK_TO_OPT(refresh_priority);
+    INHERIT_VALUE_BACK_TO_OPT(refresh_cpu_mask);
+#undef INHERIT_VALUE_BACK_TO_OPT
   }
 
   if (rt_opts) {
@@ -24,6 +24,7 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <sys/eventfd.h>
 #include <sys/time.h>
 #include <sys/types.h>
 #include <time.h>
@@ -74,6 +75,9 @@ public:
 
   FrameCanvas *CreateFrameCanvas();
   FrameCanvas *SwapOnVSync(FrameCanvas *other, unsigned framerate_fraction);
+  FrameCanvas *ScheduleSwapOnVSync(FrameCanvas *other,
+                                   unsigned framerate_fraction);
+  int VSyncEventFd();
   bool ApplyPixelMapper(const PixelMapper *mapper);
 
   bool SetPWMBits(uint8_t value);
@@ -127,7 +131,8 @@ public:
       allow_busy_waiting_(allow_busy_waiting),
       running_(true),
       current_frame_(initial_frame), next_frame_(NULL),
-      requested_frame_multiple_(1) {
+      requested_frame_multiple_(1), notify_swap_(false),
+      vsync_event_fd_(eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC)) {
     pthread_cond_init(&frame_done_, NULL);
     pthread_cond_init(&input_change_, NULL);
     switch (pwm_dither_bits) {
@@ -146,6 +151,10 @@ public:
     }
   }
 
+  virtual ~UpdateThread() {
+    if (vsync_event_fd_ >= 0) close(vsync_event_fd_);
+  }
+
   void Stop() {
     MutexLock l(&running_mutex_);
     running_ = false;
@@ -183,6 +192,13 @@ public:
             next_frame_ = NULL;
           }
           pthread_cond_signal(&frame_done_);
+          if (notify_swap_) {
+            notify_swap_ = false;
+            const uint64_t one = 1;
+            if (write(vsync_event_fd_, &one, sizeof(one)) < 0) {
+              // Only fails if the counter overflows; nothing to wake then.
+            }
+          }
         }
       }
 
@@ -235,6 +251,18 @@ public:
     return previous;
   }
 
+  FrameCanvas *ScheduleSwapOnVSync(FrameCanvas *other,
+                                   unsigned frame_fraction) {
+    MutexLock l(&frame_sync_);
+    FrameCanvas *previous = current_frame_;
+    next_frame_ = other;
+    requested_frame_multiple_ = frame_fraction;
+    notify_swap_ = true;
+    return previous;
+  }
+
+  int vsync_event_fd() const { return vsync_event_fd_; }
+
   gpio_bits_t AwaitInputChange(int timeout_ms) {
     MutexLock l(&input_sync_);
     input_sync_.WaitOn(&input_change_, timeout_ms);
@@ -265,6 +293,8 @@ private:
   FrameCanvas *current_frame_;
   FrameCanvas *next_frame_;
   unsigned requested_frame_multiple_;
+  bool notify_swap_;  // Signal vsync_event_fd_ at the next swap.
+  const int vsync_event_fd_;
 };
 
 // Some defaults. See options-initialize.cc for the command line parsing.
@@ -325,10 +355,11 @@ RGBMatrix::Options::Options() :
   limit_refresh_rate_hz(0),
 #endif
 #ifdef DISABLE_BUSY_WAITING
-    disable_busy_waiting(true)
+    disable_busy_waiting(true),
 #else
-    disable_busy_waiting(false)
+    disable_busy_waiting(false),
 #endif
+  refresh_priority(99), refresh_cpu_mask(1<<3)
 {
   // Nothing to see here.
 }
@@ -360,6 +391,8 @@ static void PrintOptions(const RGBMatrix::Options &o) {
   P_STR(panel_type);
   P_INT(limit_refresh_rate_hz);
   P_BOOL(disable_busy_waiting);
+  P_INT(refresh_priority);
+  P_INT(refresh_cpu_mask);
 #undef P_INT
 #undef P_STR
 #undef P_BOOL
@@ -485,12 +518,12 @@ bool RGBMatrix::Impl::StartRefresh() {
                                 !params_.disable_busy_waiting);
     // If we have multiple processors, the kernel
     // jumps around between these, creating some global flicker.
-    // So let's tie it to the last CPU available.
+    // So by default we tie it to the last CPU available.
     // The Raspberry Pi2 has 4 cores, our attempt to bind it to
     //   core #3 will succeed.
     // The Raspberry Pi1 only has one core, so this affinity
     //   call will simply fail and we keep using the only core.
-    updater_->Start(99, (1<<3));  // Prio: high. Also: put on last CPU.
+    updater_->Start(params_.refresh_priority, params_.refresh_cpu_mask);
   }
   return updater_ != NULL;
 }
@@ -540,6 +573,20 @@ FrameCanvas *RGBMatrix::Impl::SwapOnVSync(FrameCanvas *other,
   return previous;
 }
 
+FrameCanvas *RGBMatrix::Impl::ScheduleSwapOnVSync(FrameCanvas *other,
+                                                  unsigned frame_fraction) {
+  if (frame_fraction == 0) frame_fraction = 1; // correct user error.
+  if (!updater_) return NULL;
+  FrameCanvas *const previous =
+    updater_->ScheduleSwapOnVSync(other, frame_fraction);
+  if (other) active_ = other;
+  return previous;
+}
+
+int RGBMatrix::Impl::VSyncEventFd() {
+  return updater_ ? updater_->vsync_event_fd() : -1;
+}
+
 uint64_t RGBMatrix::Impl::AwaitInputChange(int timeout_ms) {
   if (!updater_) return 0;
   return updater_->AwaitInputChange(timeout_ms);
@@ -749,6 +796,11 @@ FrameCanvas *RGBMatrix::SwapOnVSync(FrameCanvas *other,
                                     unsigned framerate_fraction) {
   return impl_->SwapOnVSync(other, framerate_fraction);
 }
+FrameCanvas *RGBMatrix::ScheduleSwapOnVSync(FrameCanvas *other,
+                                            unsigned framerate_fraction) {
+  return impl_->ScheduleSwapOnVSync(other, framerate_fraction);
+}
+int RGBMatrix::VSyncEventFd() { return impl_->VSyncEventFd(); }
 bool RGBMatrix::ApplyPixelMapper(const PixelMapper *mapper) {
   return impl_->ApplyPixelMapper(mapper);
 }
@@ -823,6 +875,9 @@ void FrameCanvas::SubFill(int x, int y, int width, int height, uint8_t red, uint
 }
 bool FrameCanvas::SetPWMBits(uint8_t value) { return frame_->SetPWMBits(value); }
 uint8_t FrameCanvas::pwmbits() { return frame_->pwmbits(); }
+uint8_t FrameCanvas::RequiredPWMBits(float tolerance) const {
+  return frame_->RequiredPWMBits(tolerance);
+}
 
 // Map brightness of output linearly to input with CIE1931 profile.
 void FrameCanvas::set_luminance_correct(bool on) { frame_->set_luminance_correct(on); }
@@ -840,4 +895,27 @@ bool FrameCanvas::Deserialize(const char *data, size_t len) {
 void FrameCanvas::CopyFrom(const FrameCanvas &other) {
   frame_->CopyFrom(other.frame_);
 }
+
+VirtualCanvas::VirtualCanvas(FrameCanvas *prototype, int width, int height)
+  : frame_(new VirtualFramebuffer(prototype->framebuffer(), width, height)) {}
+VirtualCanvas::~VirtualCanvas() { delete frame_; }
+int VirtualCanvas::width() const { return frame_->width(); }
+int VirtualCanvas::height() const { return frame_->height(); }
+void VirtualCanvas::SetPixel(int x, int y,
+                             uint8_t red, uint8_t green, uint8_t blue) {
+  frame_->SetPixel(x, y, red, green, blue);
+}
+void VirtualCanvas::Clear() { frame_->Fill(0, 0, 0); }
+void VirtualCanvas::Fill(uint8_t red, uint8_t green, uint8_t blue) {
+  frame_->Fill(red, green, blue);
+}
+void VirtualCanvas::CopyViewportTo(int x, int y, FrameCanvas *target) const {
+  frame_->CopyViewportTo(x, y, target->framebuffer());
+}
+void VirtualCanvas::CopyRectTo(int x, int y, int width, int height,
+                               FrameCanvas *target,
+                               int target_x, int target_y) const {
+  frame_->CopyRectTo(x, y, width, height, target->framebuffer(),
+                     target_x, target_y);
+}
 }  // end namespace rgb_matrix
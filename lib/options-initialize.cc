@@ -186,6 +186,12 @@ static bool FlagInit(int &argc, char **&argv,
       if (ConsumeIntFlag("limit-refresh", it, end,
                          &mopts->limit_refresh_rate_hz, &err))
         continue;
+      if (ConsumeIntFlag("refresh-priority", it, end,
+                         &mopts->refresh_priority, &err))
+        continue;
+      if (ConsumeIntFlag("refresh-cpu-mask", it, end,
+                         &mopts->refresh_cpu_mask, &err))
+        continue;
       if (ConsumeBoolFlag("show-refresh", it, &mopts->show_refresh_rate))
         continue;
       if (ConsumeBoolFlag("inverse", it, &mopts->inverse_colors))
@@ -345,7 +351,11 @@ void PrintMatrixFlags(FILE *out, const RGBMatrix::Options &d,
           "(Default: 0)\n"
           "\t--led-%shardware-pulse   : %sse hardware pin-pulse generation.\n"
           "\t--led-panel-type=<name>   : Needed to initialize special panels. Supported: 'FM6126A', 'FM6127'\n"
-          "\t--led-%sbusy-waiting     : %sse busy waiting when limiting refresh rate.\n",
+          "\t--led-%sbusy-waiting     : %sse busy waiting when limiting refresh rate.\n"
+          "\t--led-refresh-priority=<0..99>: Realtime priority of the refresh thread. 0=inherit "
+          "(Default: %d).\n"
+          "\t--led-refresh-cpu-mask=<mask>: Bitmask of CPUs the refresh thread may run on. 0=inherit "
+          "(Default: %d).\n",
           d.hardware_mapping,
           d.rows, d.cols, d.chain_length, d.parallel,
           (int) muxers.size(), CreateAvailableMultiplexString(muxers).c_str(),
@@ -359,7 +369,8 @@ void PrintMatrixFlags(FILE *out, const RGBMatrix::Options &d,
           !d.disable_hardware_pulsing ? "no-" : "",
           !d.disable_hardware_pulsing ? "Don't u" : "U",
           !d.disable_busy_waiting ? "no-" : "",
-          !d.disable_busy_waiting ? "Don't u" : "U");
+          !d.disable_busy_waiting ? "Don't u" : "U",
+          d.refresh_priority, d.refresh_cpu_mask);
 
   fprintf(out,
           "\t--led-slowdown-gpio=<%d..4>: "
@@ -467,6 +478,16 @@ bool RGBMatrix::Options::Validate(std::string *err_in) const {
     success = false;
   }
 
+  if (refresh_priority < 0 || refresh_priority > 99) {
+    err->append("Invalid range of refresh-priority (0..99 allowed).\n");
+    success = false;
+  }
+
+  if (refresh_cpu_mask < 0) {
+    err->append("refresh-cpu-mask must not be negative.\n");
+    success = false;
+  }
+
   if (led_rgb_sequence == NULL || strlen(led_rgb_sequence) != 3) {
     err->append("led-sequence needs to be three characters long.\n");
     success = false;
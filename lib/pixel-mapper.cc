@@ -550,6 +550,71 @@ static MapperByName *GetMapperMap() {
 }
 }  // anonymous namespace
 
+LookupTablePixelMapper::LookupTablePixelMapper(const char *name,
+                                               int visible_width,
+                                               int visible_height,
+                                               const std::vector<int> &table)
+  : name_(name), visible_width_(visible_width),
+    visible_height_(visible_height), table_(table), matrix_width_(0) {
+  assert((int)table_.size() == 2 * visible_width_ * visible_height_);
+}
+
+bool LookupTablePixelMapper::SetParameters(int chain, int parallel,
+                                           const char *param) {
+  if (param != NULL && *param) {
+    fprintf(stderr, "%s mapper takes no parameters, got '%s'\n",
+            GetName(), param);
+    return false;
+  }
+  return true;
+}
+
+bool LookupTablePixelMapper::GetSizeMapping(int matrix_width,
+                                            int matrix_height,
+                                            int *visible_width,
+                                            int *visible_height) const {
+  inverse_.assign(matrix_width * matrix_height, -1);
+  matrix_width_ = matrix_width;
+  for (int i = 0; i < visible_width_ * visible_height_; ++i) {
+    const int x = table_[2 * i];
+    const int y = table_[2 * i + 1];
+    if (x == -1 && y == -1) continue;
+    if (x < 0 || y < 0 || x >= matrix_width || y >= matrix_height) {
+      fprintf(stderr, "%s: (%d, %d) -> (%d, %d) is outside of the %dx%d "
+              "matrix\n", GetName(), i % visible_width_, i / visible_width_,
+              x, y, matrix_width, matrix_height);
+      return false;
+    }
+    inverse_[y * matrix_width + x] = i;
+  }
+  *visible_width = visible_width_;
+  *visible_height = visible_height_;
+  return true;
+}
+
+void LookupTablePixelMapper::MapVisibleToMatrix(int matrix_width,
+                                                int matrix_height,
+                                                int x, int y,
+                                                int *matrix_x,
+                                                int *matrix_y) const {
+  const int i = y * visible_width_ + x;
+  *matrix_x = table_[2 * i];
+  *matrix_y = table_[2 * i + 1];
+}
+
+bool LookupTablePixelMapper::MapMatrixToVisible(int matrix_width,
+                                                int matrix_height,
+                                                int x, int y,
+                                                int *visible_x,
+                                                int *visible_y) const {
+  if (matrix_width != matrix_width_) return false;  // Not prepared for it.
+  const int i = inverse_[y * matrix_width + x];
+  if (i < 0) return false;
+  *visible_x = i % visible_width_;
+  *visible_y = i / visible_width_;
+  return true;
+}
+
 // Public API.
 void RegisterPixelMapper(PixelMapper *mapper) {
   RegisterPixelMapperInternal(GetMapperMap(), mapper);
@@ -0,0 +1,207 @@
+// -*- mode: c++; c-basic-offset: 2; indent-tabs-mode: nil; -*-
+
+#include "presentation-queue.h"
+#include "led-matrix.h"
+
+#include <assert.h>
+#include <time.h>
+
+#include <algorithm>
+
+namespace rgb_matrix {
+namespace {
+struct timespec ToTimespec(int64_t us) {
+  struct timespec t;
+  t.tv_sec = us / 1000000;
+  t.tv_nsec = (us % 1000000) * 1000;
+  return t;
+}
+}  // anonymous namespace
+
+class PresentationQueue::PresenterThread : public Thread {
+public:
+  PresenterThread(PresentationQueue *queue) : queue_(queue) {}
+  virtual void Run() { queue_->PresentLoop(); }
+
+private:
+  PresentationQueue *const queue_;
+};
+
+PresentationQueue::PresentationQueue(RGBMatrix *matrix, int depth)
+  : matrix_(matrix), running_(true),
+    frames_presented_(0), frames_dropped_(0),
+    total_lateness_us_(0), max_lateness_us_(0) {
+  assert(depth >= 2);
+  pthread_mutex_init(&mutex_, NULL);
+  // Presentation times are on the monotonic clock, so wait on that one.
+  pthread_condattr_t attr;
+  pthread_condattr_init(&attr);
+  pthread_condattr_setclock(&attr, CLOCK_MONOTONIC);
+  pthread_cond_init(&queue_changed_, &attr);
+  pthread_condattr_destroy(&attr);
+  pthread_cond_init(&frame_freed_, NULL);
+
+  for (int i = 0; i < depth; ++i) {
+    frames_.push_back(matrix_->CreateFrameCanvas());
+  }
+  free_ = frames_;
+
+  presenter_ = new PresenterThread(this);
+  presenter_->Start();
+}
+
+PresentationQueue::~PresentationQueue() {
+  pthread_mutex_lock(&mutex_);
+  running_ = false;
+  pthread_cond_signal(&queue_changed_);
+  pthread_mutex_unlock(&mutex_);
+  delete presenter_;  // Waits for PresentLoop() to return.
+
+  pthread_cond_destroy(&frame_freed_);
+  pthread_cond_destroy(&queue_changed_);
+  pthread_mutex_destroy(&mutex_);
+}
+
+/* static */ int64_t PresentationQueue::Now() {
+  struct timespec t;
+  clock_gettime(CLOCK_MONOTONIC, &t);
+  return (int64_t)t.tv_sec * 1000000 + t.tv_nsec / 1000;
+}
+
+FrameCanvas *PresentationQueue::AcquireFrame(long timeout_ms) {
+  pthread_mutex_lock(&mutex_);
+  if (free_.empty() && timeout_ms != 0) {
+    if (timeout_ms < 0) {
+      while (free_.empty()) pthread_cond_wait(&frame_freed_, &mutex_);
+    } else {
+      struct timespec deadline;
+      clock_gettime(CLOCK_REALTIME, &deadline);
+      deadline.tv_sec += timeout_ms / 1000;
+      deadline.tv_nsec += (timeout_ms % 1000) * 1000000;
+      deadline.tv_sec += deadline.tv_nsec / 1000000000;
+      deadline.tv_nsec %= 1000000000;
+      while (free_.empty()) {
+        if (pthread_cond_timedwait(&frame_freed_, &mutex_, &deadline) != 0)
+          break;
+      }
+    }
+  }
+  FrameCanvas *result = NULL;
+  if (!free_.empty()) {
+    result = free_.back();
+    free_.pop_back();
+    acquired_.push_back(result);
+  }
+  pthread_mutex_unlock(&mutex_);
+  return result;
+}
+
+bool PresentationQueue::Present(FrameCanvas *frame, int64_t present_at_us) {
+  pthread_mutex_lock(&mutex_);
+  const bool acquired = GiveBack(frame);
+  if (acquired) {
+    Entry entry = { frame, present_at_us };
+    queue_.push_back(entry);
+    pthread_cond_signal(&queue_changed_);
+  }
+  pthread_mutex_unlock(&mutex_);
+  return acquired;
+}
+
+bool PresentationQueue::Release(FrameCanvas *frame) {
+  pthread_mutex_lock(&mutex_);
+  const bool acquired = GiveBack(frame);
+  if (acquired) Recycle(frame);
+  pthread_mutex_unlock(&mutex_);
+  return acquired;
+}
+
+bool PresentationQueue::GiveBack(FrameCanvas *frame) {
+  // A canvas handed back twice would end up in free_ twice, and then be
+  // given to two AcquireFrame() callers at once.
+  std::vector<FrameCanvas*>::iterator it
+    = std::find(acquired_.begin(), acquired_.end(), frame);
+  if (it == acquired_.end()) return false;
+  acquired_.erase(it);
+  return true;
+}
+
+void PresentationQueue::Recycle(FrameCanvas *frame) {
+  // The canvas replaced by the very first swap is the matrix' own.
+  if (std::find(frames_.begin(), frames_.end(), frame) == frames_.end())
+    return;
+  free_.push_back(frame);
+  pthread_cond_signal(&frame_freed_);
+}
+
+void PresentationQueue::PresentLoop() {
+  pthread_mutex_lock(&mutex_);
+  while (running_) {
+    if (queue_.empty()) {
+      pthread_cond_wait(&queue_changed_, &mutex_);
+      continue;
+    }
+    const int64_t now = Now();
+    if (queue_.front().present_at_us > now) {
+      const struct timespec until = ToTimespec(queue_.front().present_at_us);
+      pthread_cond_timedwait(&queue_changed_, &mutex_, &until);
+      continue;
+    }
+    // Everything but the newest due frame is outdated already.
+    while (queue_.size() > 1 && queue_[1].present_at_us <= now) {
+      Recycle(queue_.front().frame);
+      queue_.pop_front();
+      ++frames_dropped_;
+    }
+    const Entry entry = queue_.front();
+    queue_.pop_front();
+
+    pthread_mutex_unlock(&mutex_);
+    FrameCanvas *const previous = matrix_->SwapOnVSync(entry.frame);
+    const int64_t lateness = Now() - entry.present_at_us;
+    pthread_mutex_lock(&mutex_);
+
+    ++frames_presented_;
+    total_lateness_us_ += lateness;
+    max_lateness_us_ = std::max(max_lateness_us_, lateness);
+    if (previous != NULL && previous != entry.frame) Recycle(previous);
+  }
+  pthread_mutex_unlock(&mutex_);
+}
+
+int PresentationQueue::queued() const {
+  pthread_mutex_lock(&mutex_);
+  const int result = queue_.size();
+  pthread_mutex_unlock(&mutex_);
+  return result;
+}
+
+uint64_t PresentationQueue::frames_presented() const {
+  pthread_mutex_lock(&mutex_);
+  const uint64_t result = frames_presented_;
+  pthread_mutex_unlock(&mutex_);
+  return result;
+}
+
+uint64_t PresentationQueue::frames_dropped() const {
+  pthread_mutex_lock(&mutex_);
+  const uint64_t result = frames_dropped_;
+  pthread_mutex_unlock(&mutex_);
+  return result;
+}
+
+int64_t PresentationQueue::total_lateness_us() const {
+  pthread_mutex_lock(&mutex_);
+  const int64_t result = total_lateness_us_;
+  pthread_mutex_unlock(&mutex_);
+  return result;
+}
+
+int64_t PresentationQueue::max_lateness_us() const {
+  pthread_mutex_lock(&mutex_);
+  const int64_t result = max_lateness_us_;
+  pthread_mutex_unlock(&mutex_);
+  return result;
+}
+
+}  // namespace rgb_matrix
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""Check that display scenes come up without loading heavy dependencies.
+
+Runs every scene (or the ones named) the way DisplayManager does, but with
+`python -X importtime` and a stub rgbmatrix package (scripts/rgbmatrix_stub)
+that ends the process at the first frame. Scenes that show nothing until
+input arrives (stream, ingest, wall) are stopped after --timeout instead.
+Everything imported up to then must not include the HEAVY_MODULES, and with
+--budget-ms, those imports must not take longer than that. Import times
+depend a lot on the board, so pick the budget on the Pi the display runs on.
+
+    uv run python scripts/check_display_startup.py
+    uv run python scripts/check_display_startup.py --budget-ms 800 spotify wave1
+
+It also checks that importing the real rgbmatrix package doesn't load its
+extension modules yet, which is what lets scenes import it early.
+
+Exits with status 1 if any check fails.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BINDINGS_DIR = PROJECT_ROOT / "bindings" / "python"
+STUB_DIR = Path(__file__).resolve().parent / "rgbmatrix_stub"
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(STUB_DIR))
+
+from rgbmatrix import FRAME_MARKER, MATRIX_MARKER  # noqa: E402  (the stub)
+from server.config import DisplayConfig  # noqa: E402
+from server.scenes import SceneRegistry  # noqa: E402
+
+# Packages that must wait until the panel shows something.
+HEAVY_MODULES = {
+    "cachetools", "fastapi", "numpy", "PIL", "pydantic", "requests", "spotipy",
+    "uvicorn",
+}
+
+# Loaded by "import rgbmatrix" only once one of their names is used.
+RGBMATRIX_EXTENSIONS = {"rgbmatrix.core", "rgbmatrix.graphics", "rgbmatrix.particles"}
+
+IMPORT_TIME_PREFIX = "import time:"
+
+
+def imported_modules(stderr: str):
+    """(module, self time in us) for each -X importtime line, in order."""
+    for line in stderr.splitlines():
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            yield line, None
+            continue
+        self_us, _, name = line[len(IMPORT_TIME_PREFIX):].split("|")
+        if self_us.strip().isdigit():  # Not the column header.
+            yield name.strip(), int(self_us)
+
+
+@dataclass
+class StartupResult:
+    scene: str
+    matrix_ms: float | None = None
+    frame_ms: float | None = None
+    import_ms: float = 0.0
+    heavy: list[str] = field(default_factory=list)
+    error: str = ""
+
+    def failures(self, budget_ms: float | None) -> list[str]:
+        problems = []
+        if self.error:
+            problems.append(self.error)
+        if self.heavy:
+            problems.append("imports " + ", ".join(sorted(self.heavy)) + " before the first frame")
+        if budget_ms is not None and self.import_ms > budget_ms:
+            problems.append(f"imports take {self.import_ms:.0f} ms, budget is {budget_ms:.0f} ms")
+        return problems
+
+
+def parse_startup(scene: str, stderr: str, started: float) -> StartupResult:
+    """Collect the imports before the first frame from -X importtime output."""
+    result = StartupResult(scene)
+    for line, self_us in imported_modules(stderr):
+        if self_us is not None:
+            result.import_ms += self_us / 1000
+            package = line.split(".")[0]
+            if package in HEAVY_MODULES and package not in result.heavy:
+                result.heavy.append(package)
+        elif line.startswith(MATRIX_MARKER):
+            result.matrix_ms = (float(line.split()[-1]) - started) * 1000
+        elif line.startswith(FRAME_MARKER):
+            result.frame_ms = (float(line.split()[-1]) - started) * 1000
+            break
+    return result
+
+
+def check_package_import() -> list[str]:
+    """Extension modules that "import rgbmatrix" loads right away."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import rgbmatrix"],
+        env={**os.environ, "PYTHONPATH": str(BINDINGS_DIR)},
+        capture_output=True, text=True,
+    )
+    return sorted({name for name, self_us in imported_modules(proc.stderr)
+                   if self_us is not None and name in RGBMATRIX_EXTENSIONS})
+
+
+def check_scene(scene, timeout: float) -> StartupResult:
+    cmd = (
+        [sys.executable, "-X", "importtime", "-m", scene.module]
+        + DisplayConfig().to_python_args()
+    )
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join([str(STUB_DIR), str(PROJECT_ROOT)]),
+        **{name: os.environ.get(name) or "unset" for name in scene.env},
+    }
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        cmd, cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE, text=True, start_new_session=True,
+    )
+    try:
+        _, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        _, stderr = proc.communicate()
+    result = parse_startup(scene.name, stderr, started)
+    if result.frame_ms is None and proc.returncode not in (0, -9):
+        last = stderr.strip().splitlines()[-1:] or ["no output"]
+        result.error = f"exited with {proc.returncode}: {last[0]}"
+    elif result.matrix_ms is None:
+        result.error = "never created the matrix"
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenes", nargs="*", help="Scene names (default: all)")
+    parser.add_argument("--timeout", type=float, default=5.0,
+                        help="Seconds to wait for a first frame")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Most time the imports before the first frame may take")
+    args = parser.parse_args()
+
+    scenes = SceneRegistry().scenes()
+    names = args.scenes or sorted(scenes)
+    unknown = [name for name in names if name not in scenes]
+    if unknown:
+        sys.exit(f"Unknown scenes: {', '.join(unknown)}")
+
+    eager = check_package_import()
+    print(f"{'rgbmatrix':12} import loads {', '.join(eager) or 'no extension modules'}")
+    failed = bool(eager)
+    for name in names:
+        result = check_scene(scenes[name], args.timeout)
+        frame = f"{result.frame_ms:.0f} ms" if result.frame_ms is not None else "waits for input"
+        matrix = f"{result.matrix_ms:.0f} ms" if result.matrix_ms is not None else "-"
+        print(f"{name:12} matrix {matrix:>8}  first frame {frame:>15}  "
+              f"imports {result.import_ms:6.1f} ms")
+        for problem in result.failures(args.budget_ms):
+            print(f"{'':12} FAIL: {problem}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Stand-in for the rgbmatrix bindings, for check_display_startup.py.
+
+Everything accepts any arguments and draws nothing. The matrix reports on
+stderr when it is created and when the first frame is swapped in, then ends
+the process: the -X importtime lines before that are what the display
+imported before it showed anything.
+"""
+
+import os
+import sys
+import time
+
+MATRIX_MARKER = "rgbmatrix-stub: matrix"
+FRAME_MARKER = "rgbmatrix-stub: frame"
+
+
+def _report(marker):
+    sys.stderr.write(f"{marker} {time.monotonic():.6f}\n")
+    sys.stderr.flush()
+
+
+class _Anything:
+    """Absorbs any call, attribute access or assignment."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return _Anything()
+
+    def __getattr__(self, name):
+        return _Anything()
+
+
+class RGBMatrixOptions(_Anything):
+    rows = 32
+    cols = 32
+    chain_length = 1
+    parallel = 1
+
+
+class FrameCanvas(_Anything):
+    def __init__(self, width=32, height=32):
+        self.width = width
+        self.height = height
+
+
+class RGBMatrix(_Anything):
+    def __init__(self, options=None, **kwargs):
+        options = options or RGBMatrixOptions()
+        self.width = options.cols * options.chain_length
+        self.height = options.rows * options.parallel
+        _report(MATRIX_MARKER)
+
+    def CreateFrameCanvas(self):
+        return FrameCanvas(self.width, self.height)
+
+    def SwapOnVSync(self, canvas, *args, **kwargs):
+        _report(FRAME_MARKER)
+        os._exit(0)
+
+    ScheduleSwapOnVSync = SwapOnVSync
+
+
+class FrameScheduler(_Anything):
+    def __init__(self, matrix, *args, fps=30, **kwargs):
+        self.matrix = matrix
+        self.fps = fps
+
+    def Run(self, update, render, canvas=None):
+        canvas = canvas or self.matrix.CreateFrameCanvas()
+        update(1.0 / self.fps)
+        render(canvas, 0.0)
+        self.matrix.SwapOnVSync(canvas)
+
+
+VirtualCanvas = PresentationQueue = Compositor = ParticleSystem = _Anything
+AdaptivePWMBits = _Anything
+ConfigureRenderThread = RegisterPixelMapper = _Anything()
+graphics = _Anything()
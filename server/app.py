@@ -1,14 +1,17 @@
 import os
 from contextlib import asynccontextmanager
+from typing import Any
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel, ValidationError
 
-from server.config import config
+from server.config import DisplayConfig, config
 from server.display import DisplayManager
+from server.scenes import SceneRegistry
 
 
 display = DisplayManager(config)
+scenes = SceneRegistry()
 
 
 @asynccontextmanager
@@ -39,25 +42,45 @@ def display_demo(req: DemoRequest):
     return {"status": "running", "pid": pid, "demo": req.demo}
 
 
-@app.post("/display/spotify")
-def display_spotify():
-    if not os.environ.get("CLIENT_ID") or not os.environ.get("CLIENT_SECRET"):
-        raise HTTPException(status_code=500, detail="CLIENT_ID and CLIENT_SECRET must be set")
+@app.get("/display/timing")
+def display_timing(fps: float = Query(30, gt=0), target_hz: float | None = Query(None, gt=0)):
+    """Modelled refresh rate and frame budget of the current display config."""
+    return config.timing_report(fps, target_hz)
 
-    pid = display.start_python(
-        script="server/displays/spotify.py",
-        env={
-            "CLIENT_ID": os.environ["CLIENT_ID"],
-            "CLIENT_SECRET": os.environ["CLIENT_SECRET"],
-        },
-    )
-    return {"status": "running", "pid": pid, "mode": "spotify"}
 
+# Registered before /display/{name} so "timing" isn't taken for a scene.
+@app.post("/display/timing")
+def check_display_timing(
+    candidate: DisplayConfig,
+    fps: float = Query(30, gt=0),
+    target_hz: float | None = Query(None, gt=0),
+):
+    """Validate a candidate config; infeasible ones are rejected with 422."""
+    return candidate.timing_report(fps, target_hz)
+
+
+@app.get("/scenes")
+def list_scenes():
+    return {"scenes": [scene.describe() for scene in scenes.scenes().values()]}
+
+
+@app.post("/display/{name}")
+def display_scene(name: str, params: dict[str, Any] | None = None):
+    scene = scenes.get(name)
+    if scene is None:
+        raise HTTPException(status_code=404, detail=f"Unknown scene '{name}'")
+
+    missing = scene.missing_env(os.environ)
+    if missing:
+        raise HTTPException(status_code=500, detail=f"{' and '.join(missing)} must be set")
+
+    try:
+        validated = scene.params_model.model_validate(params or {})
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
 
-@app.post("/display/wave1")
-def display_wave1():
-    pid = display.start_python(script="server/displays/wave1.py")
-    return {"status": "running", "pid": pid, "mode": "wave1"}
+    pid = display.start_python(module=scene.module, extra_args=scene.to_args(validated))
+    return {"status": "running", "pid": pid, "mode": scene.name}
 
 
 @app.get("/display/status")
@@ -1,38 +1,122 @@
-from pydantic import BaseModel
+from typing import Any
+
+from pydantic import BaseModel, Field, model_validator
+
+from server.timing import (
+    MAX_PWM_BITS, MIN_FLICKER_FREE_HZ, RefreshTiming, frame_budget, max_pwm_bits,
+    refresh_timing,
+)
 
 
 class DisplayConfig(BaseModel):
     rows: int = 32
     cols: int = 64
+    chain_length: int = Field(1, ge=1)
     gpio_mapping: str = "adafruit-hat"
     brightness: int = 100
     slowdown_gpio: int = 4
     pwm_lsb_nanoseconds: int = 300
+    # Upper bound on the refresh rate, as --led-limit-refresh; 0 = none.
     limit_refresh_rate_hz: int = 150
+    # None keeps the library default (MAX_PWM_BITS), unless refresh_target_hz
+    # is set: then it's the highest pwm_bits that still reaches that rate.
+    pwm_bits: int | None = Field(None, ge=1, le=MAX_PWM_BITS)
+    refresh_target_hz: int | None = Field(None, gt=0)
+    # Scheduling: the refresh thread gets the last core to itself, scene
+    # render threads the others. Masks are CPU bitmasks, 0 = any CPU;
+    # priorities are SCHED_FIFO 1..99, 0 = normal scheduling.
+    refresh_priority: int = Field(99, ge=0, le=99)
+    refresh_cpu_mask: int = Field(0b1000, ge=0)
+    render_priority: int = Field(0, ge=0, le=99)
+    render_cpu_mask: int = Field(0b0111, ge=0)
+    lock_memory: bool = False
+
+    @model_validator(mode="after")
+    def _check_refresh_rate(self) -> "DisplayConfig":
+        target = self.refresh_target_hz
+        if target is None:
+            return self
+        if self.pwm_bits is not None and self.timing().max_hz >= target:
+            return self
+
+        suggested = max_pwm_bits(target, **self._panel())
+        if suggested is None:
+            fastest = refresh_timing(pwm_bits=1, **self._panel()).max_hz
+            raise ValueError(
+                f"refresh_target_hz={target} is out of reach for this panel "
+                f"(at most {fastest:.0f} Hz even with pwm_bits=1)"
+            )
+        if self.pwm_bits is not None:
+            raise ValueError(
+                f"pwm_bits={self.pwm_bits} refreshes at most at "
+                f"{self.timing().max_hz:.0f} Hz, below refresh_target_hz={target}; "
+                f"use pwm_bits<={suggested} or leave it unset"
+            )
+        self.pwm_bits = suggested
+        return self
+
+    def _panel(self) -> dict[str, int]:
+        return {
+            "rows": self.rows,
+            "cols": self.cols,
+            "chain_length": self.chain_length,
+            "pwm_lsb_nanoseconds": self.pwm_lsb_nanoseconds,
+            "slowdown_gpio": self.slowdown_gpio,
+        }
+
+    def timing(self) -> RefreshTiming:
+        return refresh_timing(pwm_bits=self.pwm_bits or MAX_PWM_BITS, **self._panel())
+
+    def timing_report(self, fps: float, target_hz: float | None = None) -> dict[str, Any]:
+        """Modelled refresh rate, and the render budget for frames at fps.
+
+        suggested_pwm_bits is the highest that reaches target_hz, by default
+        refresh_target_hz (or the flicker threshold if there is none). It is
+        only a suggestion; set pwm_bits or refresh_target_hz to apply it.
+        """
+        timing = self.timing()
+        refresh_hz = timing.refresh_hz(self.limit_refresh_rate_hz)
+        if target_hz is None:
+            target_hz = self.refresh_target_hz or MIN_FLICKER_FREE_HZ
+        fraction, budget_ms = frame_budget(refresh_hz, fps)
+        return {
+            "pwm_bits": timing.pwm_bits,
+            "max_refresh_hz": round(timing.max_hz, 1),
+            "refresh_hz": round(refresh_hz, 1),
+            "flicker_free": refresh_hz >= MIN_FLICKER_FREE_HZ,
+            "frame_us": round(timing.frame_us, 1),
+            "row_us": round(timing.row_us, 2),
+            "shift_us": round(timing.shift_us, 2),
+            "target_hz": target_hz,
+            "suggested_pwm_bits": max_pwm_bits(target_hz, **self._panel()),
+            "fps": round(refresh_hz / fraction, 2),
+            "framerate_fraction": fraction,
+            "frame_budget_ms": round(budget_ms, 2),
+        }
 
     def to_args(self) -> list[str]:
         """Convert to CLI args for rpi-rgb-led-matrix C binaries (--led-* prefix)."""
+        pwm_bits = [] if self.pwm_bits is None else [f"--led-pwm-bits={self.pwm_bits}"]
         return [
             f"--led-rows={self.rows}",
             f"--led-cols={self.cols}",
+            f"--led-chain={self.chain_length}",
             f"--led-gpio-mapping={self.gpio_mapping}",
             f"--led-brightness={self.brightness}",
             f"--led-slowdown-gpio={self.slowdown_gpio}",
             f"--led-pwm-lsb-nanoseconds={self.pwm_lsb_nanoseconds}",
             f"--led-limit-refresh={self.limit_refresh_rate_hz}",
-        ]
+            f"--led-refresh-priority={self.refresh_priority}",
+            f"--led-refresh-cpu-mask={self.refresh_cpu_mask}",
+        ] + pwm_bits
 
     def to_python_args(self) -> list[str]:
-        """Convert to CLI args for custom Python display scripts."""
-        return [
-            f"--rows={self.rows}",
-            f"--cols={self.cols}",
-            f"--gpio-mapping={self.gpio_mapping}",
-            f"--brightness={self.brightness}",
-            f"--slowdown-gpio={self.slowdown_gpio}",
-            f"--pwm-lsb-nanoseconds={self.pwm_lsb_nanoseconds}",
-            f"--limit-refresh-rate-hz={self.limit_refresh_rate_hz}",
-        ]
+        """Convert to CLI args for Python display scenes (one --field-name per field).
+
+        Unset fields are left out, so the scene's defaults apply.
+        """
+        fields = self.model_dump(exclude={"refresh_target_hz"}, exclude_none=True)
+        return [f"--{name.replace('_', '-')}={value}" for name, value in fields.items()]
 
 
 config = DisplayConfig()
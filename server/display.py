@@ -45,16 +45,15 @@ class DisplayManager:
 
     def start_python(
         self,
-        script: str,
+        module: str,
         extra_args: list[str] | None = None,
         env: dict[str, str] | None = None,
     ) -> int:
-        """Start a Python display script using the current interpreter."""
+        """Start a Python display module (python -m) using the current interpreter."""
         with self._lock:
             self.stop()
-            script_path = str(PROJECT_ROOT / script)
             full_cmd = (
-                [sys.executable, script_path]
+                [sys.executable, "-m", module]
                 + self._config.to_python_args()
                 + (extra_args or [])
             )
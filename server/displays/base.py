@@ -0,0 +1,83 @@
+"""Shared command line handling and matrix setup for display scenes.
+
+Every scene is launched with the flags from DisplayConfig.to_python_args(),
+so they all parse the same set of matrix options.
+"""
+
+import argparse
+
+from server.timing import refresh_timing
+
+
+def parse_bool(value: str) -> bool:
+    """argparse type for the True/False values DisplayConfig passes."""
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise argparse.ArgumentTypeError(f"expected a boolean, got {value!r}")
+
+
+def matrix_arg_parser(description: str) -> argparse.ArgumentParser:
+    """Return an ArgumentParser that accepts the DisplayConfig flags."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--rows", type=int, default=32)
+    parser.add_argument("--cols", type=int, default=64)
+    parser.add_argument("--chain-length", type=int, default=1)
+    parser.add_argument("--gpio-mapping", default="adafruit-hat")
+    parser.add_argument("--brightness", type=int, default=50)
+    parser.add_argument("--slowdown-gpio", type=int, default=4)
+    parser.add_argument("--pwm-lsb-nanoseconds", type=int, default=300)
+    parser.add_argument("--limit-refresh-rate-hz", type=int, default=150)
+    parser.add_argument("--pwm-bits", type=int, default=11)
+    parser.add_argument("--refresh-priority", type=int, default=99)
+    parser.add_argument("--refresh-cpu-mask", type=int, default=0b1000)
+    parser.add_argument("--render-priority", type=int, default=0)
+    parser.add_argument("--render-cpu-mask", type=int, default=0b0111)
+    parser.add_argument("--lock-memory", type=parse_bool, default=False)
+    return parser
+
+
+def create_matrix(args: argparse.Namespace):
+    """Create an RGBMatrix from parsed matrix_arg_parser() arguments.
+
+    This also pins the calling thread, which should be the one rendering,
+    to the render CPUs and applies its priority and the memory lock.
+    """
+    # Lazy import — rgbmatrix only exists on the Pi after make install-python
+    from rgbmatrix import RGBMatrix, RGBMatrixOptions
+
+    options = RGBMatrixOptions()
+    options.rows = args.rows
+    options.cols = args.cols
+    options.chain_length = args.chain_length
+    options.hardware_mapping = args.gpio_mapping
+    options.brightness = args.brightness
+    options.pwm_lsb_nanoseconds = args.pwm_lsb_nanoseconds
+    options.limit_refresh_rate_hz = args.limit_refresh_rate_hz
+    options.pwm_bits = args.pwm_bits
+    options.drop_privileges = False
+    options.gpio_slowdown = args.slowdown_gpio
+    options.refresh_priority = args.refresh_priority
+    options.refresh_cpu_mask = args.refresh_cpu_mask
+    options.render_priority = args.render_priority
+    options.render_cpu_mask = args.render_cpu_mask
+    options.lock_memory = args.lock_memory
+    return RGBMatrix(options=options)
+
+
+def refresh_hz(args: argparse.Namespace) -> float:
+    """Refresh rate the panel runs at with these matrix_arg_parser() arguments.
+
+    --limit-refresh-rate-hz is only a cap; a panel that can't refresh that
+    fast runs at the rate server.timing models for it instead.
+    """
+    timing = refresh_timing(
+        rows=args.rows,
+        cols=args.cols,
+        chain_length=args.chain_length,
+        pwm_bits=args.pwm_bits,
+        pwm_lsb_nanoseconds=args.pwm_lsb_nanoseconds,
+        slowdown_gpio=args.slowdown_gpio,
+    )
+    return timing.refresh_hz(args.limit_refresh_rate_hz)
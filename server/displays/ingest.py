@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Shared-memory ingest display for the RGB LED matrix.
+
+Owns the matrix and shows whatever frames local processes publish through
+server.ingest (see FramePublisher there, or pipe raw RGB24 into
+`python -m server.ingest`). Keeps showing the last frame while idle.
+
+Requires rgbmatrix Python bindings installed (make build-python && make install-python).
+"""
+
+import signal
+import sys
+
+from server.displays.base import create_matrix, matrix_arg_parser
+from server.ingest import DEFAULT_SOCKET_PATH, FrameIngest
+
+SCENE = {
+    "name": "ingest",
+    "description": "Show RGB frames published by local processes over shared memory",
+    "params": {
+        "socket": {"type": "str", "default": "/tmp/pixel-display-ingest.sock"},
+    },
+}
+
+
+class IngestDisplay:
+    def __init__(self, args) -> None:
+        self.matrix = create_matrix(args)
+        self.ingest = FrameIngest(
+            self.matrix.width, self.matrix.height, socket_path=args.socket,
+        )
+
+    def run(self) -> None:
+        canvas = self.matrix.CreateFrameCanvas()
+        width = self.matrix.width
+        height = self.matrix.height
+        while True:
+            frame = self.ingest.wait_frame()
+            if frame is None:
+                continue
+            canvas.SetPixelsRGB(0, 0, width, height, frame)
+            frame.release()
+            canvas = self.matrix.SwapOnVSync(canvas)
+
+    def cleanup(self) -> None:
+        self.ingest.close()
+
+
+def main() -> None:
+    parser = matrix_arg_parser("Shared-memory ingest LED matrix display")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH)
+    args = parser.parse_args()
+
+    display = IngestDisplay(args)
+
+    def handle_signal(signum, frame):
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    try:
+        display.run()
+    finally:
+        display.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@
 """Spotify "now playing" display for the RGB LED matrix.
 
 Shows album art, artist name, and song title when music is playing.
-Shows the Spotify logo when idle.
+Shows the Spotify logo when idle. The matrix comes up with a placeholder
+frame first; the Spotify client and imaging stack load in the background.
 
 Requires CLIENT_ID and CLIENT_SECRET environment variables.
 Requires rgbmatrix Python bindings installed (make build-python && make install-python).
@@ -14,15 +15,17 @@ import signal
 import shutil
 import sys
 import tempfile
-import time
+import threading
+from dataclasses import dataclass
 from pathlib import Path
 
-import requests
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
-from PIL import Image
-from pydantic import BaseModel, field_validator
-from cachetools import cached, TTLCache
+from server.displays.base import create_matrix, matrix_arg_parser, refresh_hz
+
+SCENE = {
+    "name": "spotify",
+    "description": "Album art, artist and title of the currently playing Spotify track",
+    "env": ["CLIENT_ID", "CLIENT_SECRET"],
+}
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 MEDIA_DIR = Path(__file__).resolve().parent / "media"
@@ -36,27 +39,67 @@ graphics = None
 
 def import_rgbmatrix():
     global rgbmatrix, graphics
-    from rgbmatrix import RGBMatrix, RGBMatrixOptions, FrameCanvas
+    from rgbmatrix import Compositor, FrameCanvas, FrameScheduler
     from rgbmatrix import graphics as _graphics
 
     rgbmatrix = type(sys)("rgbmatrix")
-    rgbmatrix.RGBMatrix = RGBMatrix
-    rgbmatrix.RGBMatrixOptions = RGBMatrixOptions
+    rgbmatrix.Compositor = Compositor
     rgbmatrix.FrameCanvas = FrameCanvas
+    rgbmatrix.FrameScheduler = FrameScheduler
     graphics = _graphics
 
 
-class CurrentSong(BaseModel):
+# Lazy import — the HTTP and imaging stack takes far longer to import than the
+# matrix needs to come up, so it is loaded in the background (see
+# SpotifyDisplay._load_dependencies) while a placeholder frame is shown.
+requests = None
+spotipy = None
+SpotifyOAuth = None
+Image = None
+cached = None
+TTLCache = None
+
+
+def import_dependencies():
+    global requests, spotipy, SpotifyOAuth, Image, cached, TTLCache
+    import requests as _requests
+    import spotipy as _spotipy
+    from spotipy.oauth2 import SpotifyOAuth as _SpotifyOAuth
+    from PIL import Image as _Image
+    from cachetools import cached as _cached, TTLCache as _TTLCache
+
+    requests = _requests
+    spotipy = _spotipy
+    SpotifyOAuth = _SpotifyOAuth
+    Image = _Image
+    cached = _cached
+    TTLCache = _TTLCache
+
+
+# Spotify green, used for the start-up placeholder.
+PLACEHOLDER_RGB = (30, 215, 96)
+
+# Scroll speed of the title in pixels per second.
+FRAMES_PER_SECOND = 28
+
+# The album art only changes with the song, which invalidates it; this is
+# just a fallback redraw.
+ART_REDRAW_SECONDS = 60.0
+
+# Frame rate once the picture has not changed for a second (idle logo, static
+# title); also bounds how late a new song shows up.
+IDLE_FRAMES_PER_SECOND = 4
+
+
+@dataclass(frozen=True)
+class CurrentSong:
     artist: str
     title: str
     album_cover: str
 
-    @field_validator("artist")
-    @classmethod
-    def shorten_long_names(cls, v: str) -> str:
-        if v.lower().strip() == "red hot chili peppers":
-            return "RHCP"
-        return v
+    def __post_init__(self) -> None:
+        if self.artist.lower().strip() == "red hot chili peppers":
+            object.__setattr__(self, "artist", "RHCP")
 
     def should_combine_text(self) -> bool:
         return len(self.artist) > 6
@@ -80,45 +123,58 @@ class SpotifyDisplay:
         self.args = args
         self.tmp_dir = Path(tempfile.mkdtemp(prefix="spotify_art_"))
         self.current_song: CurrentSong | None = None
-        self.current_album_image: Image.Image | None = None
-
-        # Spotify client
-        self.sp = spotipy.Spotify(
-            auth_manager=SpotifyOAuth(
-                client_id=os.environ["CLIENT_ID"],
-                client_secret=os.environ["CLIENT_SECRET"],
-                redirect_uri="http://127.0.0.1:8888/callback/",
-                scope="user-read-currently-playing user-library-read",
-                cache_path=str(SPOTIFY_TOKEN_CACHE),
-                open_browser=False,
-            )
-        )
-
-        # Spotify idle logo
-        icon = Image.open(MEDIA_DIR / "spotify.png").convert("RGB")
-        self.spotify_icon = icon.resize((30, 30), Image.LANCZOS)
+        self.current_album_image = None
 
-        # Matrix setup
+        # Matrix setup comes first so the panel shows something while the
+        # heavy dependencies are still importing.
         import_rgbmatrix()
-        options = rgbmatrix.RGBMatrixOptions()
-        options.rows = args.rows
-        options.cols = args.cols
-        options.hardware_mapping = args.gpio_mapping
-        options.brightness = args.brightness
-        options.pwm_lsb_nanoseconds = args.pwm_lsb_nanoseconds
-        options.limit_refresh_rate_hz = args.limit_refresh_rate_hz
-        options.drop_privileges = False
-        options.gpio_slowdown = args.slowdown_gpio
-
-        self.matrix = rgbmatrix.RGBMatrix(options=options)
+        self.matrix = create_matrix(args)
         self.font = graphics.Font()
+        self.show_placeholder()
+
+        self._ready = threading.Event()
+        self._load_error: BaseException | None = None
+        threading.Thread(
+            target=self._load_dependencies, name="spotify-loader", daemon=True,
+        ).start()
+
+    def show_placeholder(self) -> None:
+        """Draw a ring where the album art goes until the client is ready."""
+        canvas = self.matrix.CreateFrameCanvas()
+        center = (self.matrix.height - 2) // 2 + 1
+        graphics.DrawCircle(
+            canvas, center, center, center - 2, graphics.Color(*PLACEHOLDER_RGB)
+        )
+        self.matrix.SwapOnVSync(canvas)
+
+    def _load_dependencies(self) -> None:
+        try:
+            import_dependencies()
+
+            # Spotify client
+            self.sp = spotipy.Spotify(
+                auth_manager=SpotifyOAuth(
+                    client_id=os.environ["CLIENT_ID"],
+                    client_secret=os.environ["CLIENT_SECRET"],
+                    redirect_uri="http://127.0.0.1:8888/callback/",
+                    scope="user-read-currently-playing user-library-read",
+                    cache_path=str(SPOTIFY_TOKEN_CACHE),
+                    open_browser=False,
+                )
+            )
+            self.get_current_song = cached(cache=TTLCache(maxsize=1, ttl=5))(
+                self.fetch_current_song
+            )
 
-        # Pre-built black image for fast album-region clearing
-        img_size = self.matrix.height - 2
-        self.black_rect = Image.new("RGB", (img_size + 2, self.matrix.height), (0, 0, 0))
+            # Spotify idle logo
+            icon = Image.open(MEDIA_DIR / "spotify.png").convert("RGB")
+            self.spotify_icon = icon.resize((30, 30), Image.LANCZOS)
+        except BaseException as e:
+            self._load_error = e
+        finally:
+            self._ready.set()
 
-    @cached(cache=TTLCache(maxsize=1, ttl=5))
-    def get_current_song(self) -> CurrentSong | None:
+    def fetch_current_song(self) -> CurrentSong | None:
         track = self.sp.current_user_playing_track()
         if not track or not track.get("item"):
             return None
@@ -136,98 +192,125 @@ class SpotifyDisplay:
         return CurrentSong(artist=artist, title=title, album_cover=cover_url)
 
     def run(self) -> None:
-        canvas = self.matrix.CreateFrameCanvas()
-        text_color = graphics.Color(255, 255, 255)
-        scroll_x = canvas.width
-        delay = 0.035
-
-        while True:
-            song = self.get_current_song()
-
-            if song:
-                # Song changed — download new art
-                if self.current_song != song:
-                    # Clean old art
-                    for f in self.tmp_dir.glob("*.png"):
-                        f.unlink()
-
-                    self.current_song = song
-                    art_path = song.download_album_art(self.tmp_dir)
-
-                    image = Image.open(art_path).convert("RGB")
-                    img_size = self.matrix.height - 2
-                    self.current_album_image = image.resize(
-                        (img_size, img_size), Image.LANCZOS
-                    )
-
-                    font_file = FONTS_DIR / f"{song.get_font_name()}.bdf"
-                    self.font.LoadFont(str(font_file))
-                    scroll_x = canvas.width
-
-                # Render frame
-                canvas.Clear()
-
-                if song.should_combine_text():
-                    combined = f"{song.artist} - {song.title}"
-                    text_len = graphics.DrawText(
-                        canvas, self.font, scroll_x, 18, text_color, combined
-                    )
-                    scroll_x -= 1
-                    if scroll_x + text_len < 0:
-                        scroll_x = canvas.width
-                else:
-                    # Static artist
-                    artist_x = 32 + (
-                        1
-                        if len(song.artist) == 6
-                        else int(24 / max(len(song.artist), 1))
-                    )
-                    graphics.DrawText(
-                        canvas, self.font, artist_x, 12, text_color, song.artist
-                    )
-
-                    # Title — static or scrolling
-                    if not song.should_scroll_title():
-                        graphics.DrawText(
-                            canvas, self.font, artist_x, 26, text_color, song.title
-                        )
-                    else:
-                        text_len = graphics.DrawText(
-                            canvas, self.font, scroll_x, 26, text_color, song.title
-                        )
-                        scroll_x -= 1
-                        if scroll_x + text_len < 0:
-                            scroll_x = canvas.width
-
-                # Black out the album art region so scrolling text doesn't show through
-                canvas.SetImage(self.black_rect, 0, 0)
-
-                # Album art (drawn on top of the blacked-out region)
-                canvas.SetImage(self.current_album_image, 1, 1)
+        self._ready.wait()
+        if self._load_error is not None:
+            raise self._load_error
+
+        self.text_color = graphics.Color(255, 255, 255)
+        self.scroll_x = self.matrix.width
+        self.scroll_text = ""
+        self.scroll_len = 0
+
+        # The art (or logo) and the text are composited from their own
+        # buffers, so scrolling the text doesn't redraw the art every frame.
+        # The text region starts right of the art; it used to scroll under it.
+        art_width = self.matrix.height
+        self.compositor = rgbmatrix.Compositor(self.matrix.CreateFrameCanvas())
+        self.art_region = self.compositor.Add(
+            self.render_art, 0, 0, art_width, self.matrix.height,
+            interval=ART_REDRAW_SECONDS,
+        )
+        self.text_region = self.compositor.Add(
+            self.render_text, art_width, 0,
+            self.matrix.width - art_width, self.matrix.height,
+        )
 
-            else:
-                # No song playing — show Spotify logo
-                if self.current_song:
-                    canvas.Clear()
+        scheduler = rgbmatrix.FrameScheduler(
+            self.matrix, refresh_hz=refresh_hz(self.args), fps=FRAMES_PER_SECOND,
+            idle_fps=IDLE_FRAMES_PER_SECOND,
+        )
+        scheduler.Run(self.update, self.render)
+
+    def update(self, dt: float) -> None:
+        """Poll the current song (cached) and advance the title scroller."""
+        song = self.get_current_song()
+
+        if song is None:
+            if self.current_song is not None:
                 self.current_song = None
-                canvas.SetImage(self.spotify_icon, 1, 1)
+                self.art_region.Invalidate()
+            return
+
+        # Song changed — download new art
+        if self.current_song != song:
+            # Clean old art
+            for f in self.tmp_dir.glob("*.png"):
+                f.unlink()
+
+            self.current_song = song
+            art_path = song.download_album_art(self.tmp_dir)
+
+            image = Image.open(art_path).convert("RGB")
+            img_size = self.matrix.height - 2
+            self.current_album_image = image.resize(
+                (img_size, img_size), Image.LANCZOS
+            )
+
+            font_file = FONTS_DIR / f"{song.get_font_name()}.bdf"
+            self.font.LoadFont(str(font_file))
+
+            if song.should_combine_text():
+                self.scroll_text = f"{song.artist} - {song.title}"
+            elif song.should_scroll_title():
+                self.scroll_text = song.title
+            else:
+                self.scroll_text = ""
+            self.scroll_len = sum(self.font.CharacterWidth(ord(c)) for c in self.scroll_text)
+            self.scroll_x = self.matrix.width
+            self.art_region.Invalidate()
+            return
+
+        if self.scroll_text:
+            self.scroll_x -= 1
+            if self.scroll_x + self.scroll_len < 0:
+                self.scroll_x = self.matrix.width
+
+    def render(self, canvas, alpha: float) -> None:
+        self.compositor.Render(canvas)
+
+    def render_art(self, canvas, now: float) -> None:
+        if self.current_song is None:
+            # No song playing — show Spotify logo
+            canvas.SetImage(self.spotify_icon, 1, 1)
+        else:
+            canvas.SetImage(self.current_album_image, 1, 1)
+
+    def render_text(self, canvas, now: float) -> None:
+        song = self.current_song
+        if song is None:
+            return
+
+        # Positions are in matrix coordinates; shift them into the region.
+        offset = self.text_region.x
+        if song.should_combine_text():
+            graphics.DrawText(
+                canvas, self.font, self.scroll_x - offset, 18, self.text_color,
+                self.scroll_text,
+            )
+            return
 
-            canvas = self.matrix.SwapOnVSync(canvas)
-            time.sleep(delay)
+        # Static artist
+        artist_x = 32 + (
+            1
+            if len(song.artist) == 6
+            else int(24 / max(len(song.artist), 1))
+        )
+        graphics.DrawText(
+            canvas, self.font, artist_x - offset, 12, self.text_color, song.artist
+        )
+
+        # Title — static or scrolling
+        title_x = artist_x if not song.should_scroll_title() else self.scroll_x
+        graphics.DrawText(
+            canvas, self.font, title_x - offset, 26, self.text_color, song.title
+        )
 
     def cleanup(self) -> None:
         shutil.rmtree(self.tmp_dir, ignore_errors=True)
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Spotify LED matrix display")
-    parser.add_argument("--rows", type=int, default=32)
-    parser.add_argument("--cols", type=int, default=64)
-    parser.add_argument("--gpio-mapping", default="adafruit-hat")
-    parser.add_argument("--brightness", type=int, default=50)
-    parser.add_argument("--slowdown-gpio", type=int, default=4)
-    parser.add_argument("--pwm-lsb-nanoseconds", type=int, default=300)
-    parser.add_argument("--limit-refresh-rate-hz", type=int, default=150)
+    parser = matrix_arg_parser("Spotify LED matrix display")
     args = parser.parse_args()
 
     display = SpotifyDisplay(args)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""Network stream display for the RGB LED matrix.
+
+Listens on UDP and TCP for raw or run-length-encoded RGB frames (see
+server.streaming for the packet format and a loopback test sender) and shows
+the newest one on every vsync. Late and superseded frames are dropped instead
+of queued, so a fast sender never builds up latency.
+
+Requires rgbmatrix Python bindings installed (make build-python && make install-python).
+"""
+
+import signal
+import sys
+import time
+
+from server.displays.base import create_matrix, matrix_arg_parser
+from server.streaming import DEFAULT_PORT, FrameReceiver
+
+SCENE = {
+    "name": "stream",
+    "description": "Show RGB frames streamed over UDP/TCP from another host",
+    "params": {
+        "port": {"type": "int", "default": 7777},
+        "stats_interval": {"type": "float", "default": 10.0},
+    },
+}
+
+
+class StreamDisplay:
+    def __init__(self, args) -> None:
+        self.matrix = create_matrix(args)
+        self.receiver = FrameReceiver(
+            self.matrix.width, self.matrix.height, port=args.port,
+        )
+        self.stats_interval = args.stats_interval
+
+    def report(self) -> None:
+        stats = " ".join(f"{k}={v}" for k, v in self.receiver.stats.summary().items())
+        print(f"stream: {stats}", flush=True)
+
+    def run(self) -> None:
+        canvas = self.matrix.CreateFrameCanvas()
+        width = self.matrix.width
+        height = self.matrix.height
+        next_report = time.monotonic() + self.stats_interval
+        while True:
+            frame = self.receiver.poll(timeout=1.0)
+            if frame is not None:
+                canvas.SetPixelsRGB(0, 0, width, height, frame.rgb)
+                canvas = self.matrix.SwapOnVSync(canvas)
+            if self.stats_interval > 0 and time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + self.stats_interval
+
+    def cleanup(self) -> None:
+        self.report()
+        self.receiver.close()
+
+
+def main() -> None:
+    parser = matrix_arg_parser("Network stream LED matrix display")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--stats-interval", type=float, default=10.0,
+                        help="Seconds between counter reports, 0 to disable")
+    args = parser.parse_args()
+
+    display = StreamDisplay(args)
+
+    def handle_signal(signum, frame):
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    try:
+        display.run()
+    finally:
+        display.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""Tiled wall follower for the RGB LED matrix.
+
+Shows this node's tile of a wall rendered by a leader on another host (see
+server.wall for the protocol and a loopback test setup). Tiles are swapped in
+at the leader's presentation time, tracked with a clock-sync exchange, so all
+nodes of the wall change frames together.
+
+Requires rgbmatrix Python bindings installed (make build-python && make install-python).
+"""
+
+import signal
+import sys
+import time
+
+from server.displays.base import create_matrix, matrix_arg_parser, refresh_hz
+from server.wall import DEFAULT_FOLLOWER_PORT, DEFAULT_LEADER_PORT, WallFollower, now_us
+
+SCENE = {
+    "name": "wall",
+    "description": "Show this panel's tile of a wall driven by a leader node",
+    "params": {
+        "leader": {"type": "str", "default": "127.0.0.1"},
+        "leader_port": {"type": "int", "default": 7800},
+        "port": {"type": "int", "default": 7801},
+        "stats_interval": {"type": "float", "default": 10.0},
+    },
+}
+
+
+class WallDisplay:
+    def __init__(self, args) -> None:
+        self.matrix = create_matrix(args)
+        self.follower = WallFollower(
+            args.leader, self.matrix.width, self.matrix.height,
+            port=args.port, leader_port=args.leader_port,
+        )
+        # SwapOnVSync() returns at the next refresh, up to a period later;
+        # starting half a period early centers that on the target time.
+        self.margin_us = int(500000 / refresh_hz(args))
+        self.stats_interval = args.stats_interval
+
+    def report(self) -> None:
+        stats = " ".join(f"{k}={v}" for k, v in self.follower.summary().items())
+        print(f"wall: {stats}", flush=True)
+
+    def run(self) -> None:
+        canvas = self.matrix.CreateFrameCanvas()
+        width = self.matrix.width
+        height = self.matrix.height
+        next_report = time.monotonic() + self.stats_interval
+        while True:
+            timeout = self.follower.time_until_due(self.margin_us)
+            self.follower.poll(1.0 if timeout is None else timeout)
+            frame = self.follower.due(self.margin_us)
+            if frame is not None:
+                canvas.SetPixelsRGB(0, 0, width, height, frame.rgb)
+                canvas = self.matrix.SwapOnVSync(canvas)
+                self.follower.presented(frame, now_us())
+            if self.stats_interval > 0 and time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + self.stats_interval
+
+    def cleanup(self) -> None:
+        self.report()
+        self.follower.close()
+
+
+def main() -> None:
+    parser = matrix_arg_parser("Tiled wall follower LED matrix display")
+    parser.add_argument("--leader", default="127.0.0.1")
+    parser.add_argument("--leader-port", type=int, default=DEFAULT_LEADER_PORT)
+    parser.add_argument("--port", type=int, default=DEFAULT_FOLLOWER_PORT)
+    parser.add_argument("--stats-interval", type=float, default=10.0,
+                        help="Seconds between counter reports, 0 to disable")
+    args = parser.parse_args()
+
+    display = WallDisplay(args)
+
+    def handle_signal(signum, frame):
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    try:
+        display.run()
+    finally:
+        display.cleanup()
+
+
+if __name__ == "__main__":
+    main()
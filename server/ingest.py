@@ -0,0 +1,266 @@
+"""Shared-memory frame ingest for local renderers.
+
+The matrix owner (the "ingest" scene) creates a shared memory segment holding
+a small header and three RGB frame slots, plus an eventfd used as a doorbell.
+A publisher connects to a Unix socket, receives the eventfd over SCM_RIGHTS
+and the segment name, then writes frames straight into a free slot and rings
+the doorbell. A frame costs the publisher one 8-byte write(); pixel data is
+never copied through a socket or pipe.
+
+There is a single producer: the publisher keeps its connection open while it
+is attached, and the owner refuses anyone else connecting meanwhile. Two
+publishers would hand out the same sequence numbers and pick the same slot.
+
+The header holds the latest published frame (sequence number and slot, in one
+32-bit word so it is updated at once) and the slot the owner is reading. The
+publisher only ever writes into the third slot, so it may run ahead of the
+panel without tearing the frame being shown; frames the owner didn't get to
+are skipped. The owner confirms the frame is still the latest after claiming
+its slot, so a publisher that picked its slot just before can't write into it.
+
+Publishing raw RGB from another program, e.g. ffmpeg:
+
+    ffmpeg -re -i clip.mp4 -vf scale=64:32 -f rawvideo -pix_fmt rgb24 - \\
+        | python -m server.ingest --width 64 --height 32
+"""
+
+import argparse
+import json
+import os
+import selectors
+import socket
+import struct
+import sys
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+DEFAULT_SHM_NAME = "pixel-display-ingest"
+DEFAULT_SOCKET_PATH = "/tmp/pixel-display-ingest.sock"
+
+# magic, width, height, latest frame (sequence << 2 | slot), slot being read
+HEADER = struct.Struct("<4sHHII")
+LATEST = struct.Struct("<I")
+LATEST_OFFSET = 8
+READING = struct.Struct("<I")
+READING_OFFSET = 12
+HEADER_SIZE = 32
+MAGIC = b"PXIN"
+SLOTS = 3
+SEQUENCE_MASK = 0x3FFFFFFF
+
+
+def frame_size(width: int, height: int) -> int:
+    return width * height * 3
+
+
+def _slot_offset(slot: int, width: int, height: int) -> int:
+    return HEADER_SIZE + slot * frame_size(width, height)
+
+
+def _create_shm(name: str, size: int) -> SharedMemory:
+    """Create the segment, replacing one left behind by a killed owner."""
+    try:
+        return SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        stale = SharedMemory(name=name)
+        stale.close()
+        stale.unlink()
+        return SharedMemory(name=name, create=True, size=size)
+
+
+class FrameIngest:
+    """Owner side: creates the shared buffers and waits for published frames."""
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        shm_name: str = DEFAULT_SHM_NAME,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+    ) -> None:
+        self.width = width
+        self.height = height
+        self.socket_path = socket_path
+        self.frames_received = 0
+        self._last_seq = 0
+        self._publisher: socket.socket | None = None
+
+        self.shm = _create_shm(shm_name, HEADER_SIZE + SLOTS * frame_size(width, height))
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, width, height, 0, 0)
+        self.doorbell = os.eventfd(0, os.EFD_CLOEXEC | os.EFD_NONBLOCK)
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(socket_path)
+        self._server.listen()
+        self._server.setblocking(False)
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.doorbell, selectors.EVENT_READ)
+        self._selector.register(self._server, selectors.EVENT_READ)
+
+    def _handshake(self) -> None:
+        conn, _ = self._server.accept()
+        if self._publisher is not None:
+            with conn:
+                conn.sendall(json.dumps({"error": "Another publisher is attached"}).encode())
+            return
+        info = {"shm": self.shm.name, "width": self.width, "height": self.height}
+        socket.send_fds(conn, [json.dumps(info).encode()], [self.doorbell])
+        conn.setblocking(False)
+        self._selector.register(conn, selectors.EVENT_READ)
+        self._publisher = conn
+
+    def _detach(self) -> None:
+        """The publisher closed its connection (or died); let another attach."""
+        try:
+            if self._publisher.recv(1):
+                return
+        except BlockingIOError:
+            return
+        except OSError:
+            pass
+        self._selector.unregister(self._publisher)
+        self._publisher.close()
+        self._publisher = None
+
+    def wait_frame(self, timeout: float | None = None) -> memoryview | None:
+        """Block until a new frame is published; return a view of it.
+
+        Several doorbell rings between two calls collapse into one, so a slow
+        consumer always gets the latest frame. The view stays valid until the
+        next call. Returns None on timeout.
+        """
+        for key, _ in self._selector.select(timeout):
+            if key.fileobj is self._server:
+                self._handshake()
+                continue
+            if key.fileobj is self._publisher:
+                self._detach()
+                continue
+            try:
+                os.eventfd_read(self.doorbell)
+            except BlockingIOError:
+                continue
+            latest = LATEST.unpack_from(self.shm.buf, LATEST_OFFSET)[0]
+            if latest >> 2 == self._last_seq:
+                continue
+            # Claim the slot, then check that it wasn't superseded meanwhile:
+            # a publisher choosing its next slot from then on sees the claim.
+            while True:
+                READING.pack_into(self.shm.buf, READING_OFFSET, latest & 3)
+                current = LATEST.unpack_from(self.shm.buf, LATEST_OFFSET)[0]
+                if current == latest:
+                    break
+                latest = current
+            self._last_seq = latest >> 2
+            self.frames_received += 1
+            offset = _slot_offset(latest & 3, self.width, self.height)
+            return self.shm.buf[offset:offset + frame_size(self.width, self.height)]
+        return None
+
+    def close(self) -> None:
+        self._selector.close()
+        self._server.close()
+        if self._publisher is not None:
+            self._publisher.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.close(self.doorbell)
+        self.shm.close()
+        self.shm.unlink()
+
+
+class FramePublisher:
+    """Publisher side: writes frames into a free slot of the owner's buffers.
+
+    Only one can be attached at a time; connecting while another is raises
+    ConnectionRefusedError.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH) -> None:
+        # Held open until close(); the owner takes its closing as detaching.
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.connect(socket_path)
+            msg, fds, _, _ = socket.recv_fds(self._sock, 4096, 1)
+            info = json.loads(msg)
+            if "error" in info:
+                raise ConnectionRefusedError(info["error"])
+        except BaseException:
+            self._sock.close()
+            raise
+        self.doorbell = fds[0]
+        self.width = info["width"]
+        self.height = info["height"]
+        self.shm = SharedMemory(name=info["shm"])
+        # The owner unlinks the segment; don't let our resource tracker do it.
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        latest = LATEST.unpack_from(self.shm.buf, LATEST_OFFSET)[0]
+        self._seq = latest >> 2
+        self._front = latest & 3
+        self._back = None
+
+    def back_buffer(self) -> memoryview:
+        """Writable view of a slot that is neither the latest nor being read.
+
+        The slot is picked on the first call after publish(), so fill the view
+        before publishing again.
+        """
+        if self._back is None:
+            reading = READING.unpack_from(self.shm.buf, READING_OFFSET)[0]
+            self._back = next(slot for slot in range(SLOTS)
+                              if slot not in (self._front, reading))
+        offset = _slot_offset(self._back, self.width, self.height)
+        return self.shm.buf[offset:offset + frame_size(self.width, self.height)]
+
+    def publish(self) -> None:
+        """Make the back buffer the latest frame and ring the doorbell."""
+        if self._back is None:
+            self.back_buffer()
+        self._front = self._back
+        self._back = None
+        self._seq = (self._seq + 1) & SEQUENCE_MASK
+        LATEST.pack_into(self.shm.buf, LATEST_OFFSET, self._seq << 2 | self._front)
+        os.eventfd_write(self.doorbell, 1)
+
+    def close(self) -> None:
+        os.close(self.doorbell)
+        self.shm.close()
+        self._sock.close()
+
+
+def _read_exactly(stream, view: memoryview) -> bool:
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Publish raw RGB24 frames from stdin to the ingest scene"
+    )
+    parser.add_argument("--width", type=int, required=True)
+    parser.add_argument("--height", type=int, required=True)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH)
+    args = parser.parse_args()
+
+    publisher = FramePublisher(args.socket)
+    if (publisher.width, publisher.height) != (args.width, args.height):
+        sys.exit(f"Panel is {publisher.width}x{publisher.height}, "
+                 f"input is {args.width}x{args.height}")
+    try:
+        # Read each frame directly into the shared back buffer.
+        while _read_exactly(sys.stdin.buffer, publisher.back_buffer()):
+            publisher.publish()
+    finally:
+        publisher.close()
+
+
+if __name__ == "__main__":
+    main()
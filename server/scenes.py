@@ -0,0 +1,158 @@
+"""Scene registry: discovers display modules under server/displays/.
+
+A display module becomes a scene by declaring a module-level ``SCENE`` dict
+next to its ``main()`` entry point:
+
+    SCENE = {
+        "name": "wave1",
+        "description": "Meteor wave animation",
+        "env": [],                  # environment variables that must be set
+        "params": {                 # extra CLI flags, passed as --name=value
+            "speed": {"type": "float", "default": 1.0},
+        },
+    }
+
+Modules are parsed with ``ast`` instead of imported, so the server never pays
+for a scene's dependencies. Parsed metadata and parameter models are cached
+per file and only re-read when the file's mtime changes.
+"""
+
+import ast
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, create_model
+
+DISPLAYS_DIR = Path(__file__).resolve().parent / "displays"
+DISPLAYS_PACKAGE = "server.displays"
+
+logger = logging.getLogger(__name__)
+
+PARAM_TYPES: dict[str, type] = {
+    "int": int,
+    "float": float,
+    "str": str,
+    "bool": bool,
+}
+
+
+class SceneError(ValueError):
+    """Raised when a display module declares an invalid SCENE."""
+
+
+@dataclass(frozen=True)
+class Scene:
+    name: str
+    module: str
+    description: str = ""
+    env: tuple[str, ...] = ()
+    params_model: type[BaseModel] = field(default=BaseModel, repr=False)
+
+    @property
+    def params_schema(self) -> dict[str, Any]:
+        return self.params_model.model_json_schema()
+
+    def missing_env(self, environ: dict[str, str]) -> list[str]:
+        return [name for name in self.env if not environ.get(name)]
+
+    def to_args(self, params: BaseModel) -> list[str]:
+        """Convert validated params to CLI args for the scene's main()."""
+        return [
+            f"--{name.replace('_', '-')}={value}"
+            for name, value in params.model_dump().items()
+        ]
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "env": list(self.env),
+            "params": self.params_schema,
+        }
+
+
+def _read_scene_declaration(path: Path) -> dict[str, Any] | None:
+    """Return the literal SCENE dict of a module, or None if it declares none."""
+    tree = ast.parse(path.read_text(), filename=str(path))
+    declaration = None
+    has_main = False
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == "main":
+            has_main = True
+        elif (
+            isinstance(node, ast.Assign)
+            and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name)
+            and node.targets[0].id == "SCENE"
+        ):
+            try:
+                declaration = ast.literal_eval(node.value)
+            except ValueError as e:
+                raise SceneError(f"{path.name}: SCENE must be a literal dict") from e
+    if declaration is None:
+        return None
+    if not has_main:
+        raise SceneError(f"{path.name}: declares SCENE but has no main()")
+    if not isinstance(declaration, dict) or "name" not in declaration:
+        raise SceneError(f"{path.name}: SCENE must be a dict with a 'name'")
+    return declaration
+
+
+def _build_params_model(name: str, params: dict[str, dict[str, Any]]) -> type[BaseModel]:
+    fields = {}
+    for param, spec in params.items():
+        type_name = spec.get("type", "str")
+        if type_name not in PARAM_TYPES:
+            raise SceneError(f"{name}: unknown type '{type_name}' for param '{param}'")
+        fields[param] = (PARAM_TYPES[type_name], spec.get("default", ...))
+    return create_model(f"{name.title().replace('_', '')}Params", **fields)
+
+
+def _load_scene(path: Path) -> Scene | None:
+    declaration = _read_scene_declaration(path)
+    if declaration is None:
+        return None
+    name = declaration["name"]
+    return Scene(
+        name=name,
+        module=f"{DISPLAYS_PACKAGE}.{path.stem}",
+        description=declaration.get("description", ""),
+        env=tuple(declaration.get("env", ())),
+        params_model=_build_params_model(name, declaration.get("params", {})),
+    )
+
+
+class SceneRegistry:
+    """Caches the scenes declared by the modules in a displays directory."""
+
+    def __init__(self, directory: Path = DISPLAYS_DIR) -> None:
+        self._directory = directory
+        self._lock = threading.Lock()
+        # path -> (mtime_ns, scene or None)
+        self._cache: dict[Path, tuple[int, Scene | None]] = {}
+
+    def scenes(self) -> dict[str, Scene]:
+        """Return all declared scenes by name, re-parsing only changed files."""
+        with self._lock:
+            cache = {}
+            for path in sorted(self._directory.glob("*.py")):
+                if path.name.startswith("_"):
+                    continue
+                mtime = path.stat().st_mtime_ns
+                cached = self._cache.get(path)
+                if cached is None or cached[0] != mtime:
+                    try:
+                        scene = _load_scene(path)
+                    except (SceneError, SyntaxError) as e:
+                        logger.warning("Skipping display module: %s", e)
+                        scene = None
+                    cached = (mtime, scene)
+                cache[path] = cached
+            self._cache = cache
+            return {scene.name: scene for _, scene in cache.values() if scene}
+
+    def get(self, name: str) -> Scene | None:
+        return self.scenes().get(name)
@@ -0,0 +1,365 @@
+"""Raw and run-length-encoded RGB frame streaming over UDP and TCP.
+
+Every frame is one packet: a fixed header followed by the pixel payload.
+Over UDP a packet is one datagram; over TCP each packet is prefixed with its
+length as a little-endian uint32.
+
+    header:  magic "PXST", encoding, flags, width, height, sequence number,
+             sender timestamp (microseconds, CLOCK_REALTIME)
+    payload: ENCODING_RAW  width * height * 3 bytes of RGB
+             ENCODING_RLE  runs of (count, r, g, b), count 1..255
+
+The receiver never queues: it drains everything that arrived, keeps only the
+newest frame and counts the rest as dropped. Frames whose sequence number is
+not newer than the last accepted one arrived late and are dropped as well,
+unless they start a new sender's stream (FLAG_RESET from another address or
+connection than the last frame). A TCP peer announcing a packet longer than
+any frame can be is disconnected.
+
+Sending a test pattern over loopback:
+
+    python -m server.streaming --host 127.0.0.1 --port 7777 --width 64 --height 32
+"""
+
+import argparse
+import math
+import selectors
+import socket
+import struct
+import time
+from dataclasses import dataclass
+
+HEADER = struct.Struct("<4sBBHHIQ")
+MAGIC = b"PXST"
+LENGTH_PREFIX = struct.Struct("<I")
+
+ENCODING_RAW = 0
+ENCODING_RLE = 1
+
+# Set by a sender on its first frame so receivers accept its sequence numbers
+# even if they are lower than those of a previous sender. Only honoured from
+# a new source, so a reordered or replayed first packet can't rewind a stream.
+FLAG_RESET = 0x01
+
+DEFAULT_PORT = 7777
+MAX_DATAGRAM = 65507
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+def rle_encode(rgb: bytes) -> bytes:
+    out = bytearray()
+    view = memoryview(rgb)
+    n = len(rgb) // 3
+    i = 0
+    while i < n:
+        pixel = view[i * 3:i * 3 + 3]
+        run = 1
+        while run < 255 and i + run < n and view[(i + run) * 3:(i + run) * 3 + 3] == pixel:
+            run += 1
+        out.append(run)
+        out += pixel
+        i += run
+    return bytes(out)
+
+
+def rle_decode(payload: bytes, size: int) -> bytes:
+    if len(payload) % 4:
+        raise ValueError("RLE payload is not a sequence of 4-byte runs")
+    out = bytearray()
+    for i in range(0, len(payload), 4):
+        out += payload[i + 1:i + 4] * payload[i]
+    if len(out) != size:
+        raise ValueError(f"RLE payload decodes to {len(out)} bytes, expected {size}")
+    return bytes(out)
+
+
+def encode_frame(rgb: bytes, width: int, height: int, seq: int,
+                 rle: bool = False, flags: int = 0) -> bytes:
+    payload = rle_encode(rgb) if rle else bytes(rgb)
+    encoding = ENCODING_RLE if rle else ENCODING_RAW
+    header = HEADER.pack(MAGIC, encoding, flags, width, height,
+                         seq & 0xFFFFFFFF, now_us())
+    return header + payload
+
+
+@dataclass
+class Frame:
+    seq: int
+    width: int
+    height: int
+    rgb: bytes
+    sent_us: int
+    flags: int = 0
+
+
+def decode_frame(packet: bytes) -> Frame:
+    if len(packet) < HEADER.size:
+        raise ValueError("Packet shorter than header")
+    magic, encoding, flags, width, height, seq, sent_us = HEADER.unpack_from(packet)
+    if magic != MAGIC:
+        raise ValueError("Bad magic")
+    payload = packet[HEADER.size:]
+    size = width * height * 3
+    if encoding == ENCODING_RAW:
+        if len(payload) != size:
+            raise ValueError(f"Raw payload is {len(payload)} bytes, expected {size}")
+        rgb = bytes(payload)
+    elif encoding == ENCODING_RLE:
+        rgb = rle_decode(payload, size)
+    else:
+        raise ValueError(f"Unknown encoding {encoding}")
+    return Frame(seq, width, height, rgb, sent_us, flags)
+
+
+def max_packet_size(width: int, height: int) -> int:
+    """Largest valid packet: RLE with no two neighbours alike, 4 bytes a pixel."""
+    return HEADER.size + 4 * width * height
+
+
+def seq_newer(seq: int, last: int) -> bool:
+    """Serial-number comparison (RFC 1982) so the 32-bit counter may wrap."""
+    return 0 < ((seq - last) & 0xFFFFFFFF) < 0x80000000
+
+
+@dataclass
+class StreamStats:
+    received: int = 0
+    dropped_late: int = 0
+    dropped_superseded: int = 0
+    invalid: int = 0
+    last_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    _latency_sum_ms: float = 0.0
+
+    @property
+    def dropped(self) -> int:
+        return self.dropped_late + self.dropped_superseded
+
+    @property
+    def mean_latency_ms(self) -> float:
+        return self._latency_sum_ms / self.received if self.received else 0.0
+
+    def record_latency(self, latency_ms: float) -> None:
+        self.last_latency_ms = latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        self._latency_sum_ms += latency_ms
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "dropped_late": self.dropped_late,
+            "dropped_superseded": self.dropped_superseded,
+            "invalid": self.invalid,
+            "latency_ms": round(self.mean_latency_ms, 2),
+            "max_latency_ms": round(self.max_latency_ms, 2),
+        }
+
+
+class FrameReceiver:
+    """Accepts frames on a UDP and a TCP socket bound to the same port."""
+
+    def __init__(self, width: int, height: int, host: str = "0.0.0.0",
+                 port: int = DEFAULT_PORT) -> None:
+        self.width = width
+        self.height = height
+        self.stats = StreamStats()
+        self._last_seq: int | None = None
+        self._last_source: object = None
+        self._selector = selectors.DefaultSelector()
+
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.udp.bind((host, port))
+        self.udp.setblocking(False)
+        self._selector.register(self.udp, selectors.EVENT_READ)
+
+        self.tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.tcp.bind((host, port))
+        self.tcp.listen()
+        self.tcp.setblocking(False)
+        self._selector.register(self.tcp, selectors.EVENT_READ)
+        self._tcp_buffers: dict[socket.socket, bytearray] = {}
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self.udp.getsockname()
+
+    def _drain_udp(self, packets: list[tuple[object, bytes]]) -> None:
+        while True:
+            try:
+                data, source = self.udp.recvfrom(MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            packets.append((source, data))
+
+    def _close_tcp(self, conn: socket.socket) -> None:
+        self._selector.unregister(conn)
+        del self._tcp_buffers[conn]
+        conn.close()
+
+    def _drain_tcp(self, conn: socket.socket, packets: list[tuple[object, bytes]]) -> None:
+        buf = self._tcp_buffers[conn]
+        while True:
+            try:
+                data = conn.recv(65536)
+            except BlockingIOError:
+                break
+            except ConnectionError:
+                data = b""
+            if not data:
+                self._close_tcp(conn)
+                break
+            buf += data
+        while len(buf) >= LENGTH_PREFIX.size:
+            (length,) = LENGTH_PREFIX.unpack_from(buf)
+            if length > max_packet_size(self.width, self.height):
+                # Out of sync or not our protocol; don't buffer up to 4 GiB.
+                self.stats.invalid += 1
+                if conn in self._tcp_buffers:
+                    self._close_tcp(conn)
+                break
+            end = LENGTH_PREFIX.size + length
+            if len(buf) < end:
+                break
+            packets.append((conn, bytes(buf[LENGTH_PREFIX.size:end])))
+            del buf[:end]
+
+    def _accept(self) -> socket.socket:
+        conn, _ = self.tcp.accept()
+        conn.setblocking(False)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._tcp_buffers[conn] = bytearray()
+        self._selector.register(conn, selectors.EVENT_READ)
+        return conn
+
+    def _accept_frame(self, source: object, packet: bytes) -> Frame | None:
+        try:
+            frame = decode_frame(packet)
+        except ValueError:
+            self.stats.invalid += 1
+            return None
+        if (frame.width, frame.height) != (self.width, self.height):
+            self.stats.invalid += 1
+            return None
+        reset = frame.flags & FLAG_RESET and source != self._last_source
+        if (self._last_seq is not None and not reset
+                and not seq_newer(frame.seq, self._last_seq)):
+            self.stats.dropped_late += 1
+            return None
+        self._last_seq = frame.seq
+        self._last_source = source
+        self.stats.received += 1
+        self.stats.record_latency((now_us() - frame.sent_us) / 1000)
+        return frame
+
+    def poll(self, timeout: float | None = None) -> Frame | None:
+        """Wait for traffic and return the newest valid frame, or None."""
+        packets: list[tuple[object, bytes]] = []
+        for key, _ in self._selector.select(timeout):
+            if key.fileobj is self.tcp:
+                # Frames often arrive together with the connection.
+                self._drain_tcp(self._accept(), packets)
+            elif key.fileobj is self.udp:
+                self._drain_udp(packets)
+            else:
+                self._drain_tcp(key.fileobj, packets)
+
+        newest = None
+        for source, packet in packets:
+            frame = self._accept_frame(source, packet)
+            if frame is None:
+                continue
+            if newest is not None:
+                self.stats.dropped_superseded += 1
+            newest = frame
+        return newest
+
+    def close(self) -> None:
+        for conn in list(self._tcp_buffers):
+            conn.close()
+        self._selector.close()
+        self.udp.close()
+        self.tcp.close()
+
+
+class FrameSender:
+    """Sends frames to a FrameReceiver; mainly for tests and LAN renderers."""
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT, width: int = 64,
+                 height: int = 32, tcp: bool = False, rle: bool = False) -> None:
+        self.width = width
+        self.height = height
+        self.rle = rle
+        self.seq = 0
+        self._tcp = tcp
+        if tcp:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.connect((host, port))
+
+    def send(self, rgb: bytes, seq: int | None = None) -> int:
+        """Send one frame; returns the sequence number used."""
+        if seq is None:
+            self.seq += 1
+            seq = self.seq
+        flags = FLAG_RESET if seq == 1 else 0
+        packet = encode_frame(rgb, self.width, self.height, seq, self.rle, flags)
+        if self._tcp:
+            self.sock.sendall(LENGTH_PREFIX.pack(len(packet)) + packet)
+        else:
+            self.sock.send(packet)
+        return seq
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+def test_pattern(width: int, height: int, t: float) -> bytes:
+    """A diagonal rainbow that scrolls with time."""
+    out = bytearray(width * height * 3)
+    i = 0
+    for y in range(height):
+        for x in range(width):
+            phase = (x + y) / 16.0 + t
+            out[i] = int(127 + 127 * math.sin(phase))
+            out[i + 1] = int(127 + 127 * math.sin(phase + 2.1))
+            out[i + 2] = int(127 + 127 * math.sin(phase + 4.2))
+            i += 3
+    return bytes(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stream a test pattern to the stream scene")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--width", type=int, default=64)
+    parser.add_argument("--height", type=int, default=32)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--tcp", action="store_true", help="Use TCP instead of UDP")
+    parser.add_argument("--rle", action="store_true", help="Run-length encode frames")
+    args = parser.parse_args()
+
+    sender = FrameSender(args.host, args.port, args.width, args.height,
+                         tcp=args.tcp, rle=args.rle)
+    period = 1.0 / args.fps
+    start = time.monotonic()
+    try:
+        while True:
+            t = time.monotonic() - start
+            sender.send(test_pattern(args.width, args.height, t))
+            time.sleep(max(0.0, period - (time.monotonic() - start - t)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sender.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Refresh-rate model of the rpi-rgb-led-matrix refresh loop.
+
+The refresh thread shows one double row (the upper and lower half of a panel
+are driven together) at a time and runs the full PWM of that row before
+moving on. For each of the pwm_bits bit planes it clocks one bit of every
+column of the chain into the shift registers, latches it, and then lights
+the LEDs for pwm_lsb_nanoseconds << plane. Clocking in the next plane
+happens while the previous one is lit, so a plane costs whichever of the
+two is longer:
+
+    plane  = max(shift, lsb << bit) + latch
+    shift  = cols * chain * (3 + 2 * slowdown) GPIO writes
+    frame  = rows / 2 * sum(plane for bit in 0..pwm_bits-1)
+
+GPIO_WRITE_NS is the cost of one GPIO register write, taken from a Pi 4
+running at --led-slowdown-gpio=1. Check the model against the refresh rate
+the library reports with --led-show-refresh before relying on it for other
+boards. Parallel chains are clocked out together and don't change timing.
+"""
+
+import math
+from dataclasses import dataclass
+
+GPIO_WRITE_NS = 18.0
+
+# Three writes per column (data, clock low, clock high); each SetBits and
+# WriteMaskedBits call is followed by `slowdown` dummy writes.
+WRITES_PER_COLUMN = 3
+DELAYS_PER_COLUMN = 2
+# Row address, strobe high and low, clearing the clock after each plane.
+WRITES_PER_LATCH = 4
+DELAYS_PER_LATCH = 4
+
+MAX_PWM_BITS = 11
+
+# Below this, most people see flicker (and cameras see bars well above it).
+MIN_FLICKER_FREE_HZ = 100
+
+
+@dataclass(frozen=True)
+class RefreshTiming:
+    pwm_bits: int
+    shift_us: float
+    row_us: float
+    frame_us: float
+
+    @property
+    def max_hz(self) -> float:
+        return 1e6 / self.frame_us
+
+    def refresh_hz(self, limit_hz: int = 0) -> float:
+        """Refresh rate the panel runs at with --led-limit-refresh=limit_hz."""
+        return min(self.max_hz, limit_hz) if limit_hz > 0 else self.max_hz
+
+
+def refresh_timing(
+    rows: int,
+    cols: int,
+    chain_length: int = 1,
+    pwm_bits: int = MAX_PWM_BITS,
+    pwm_lsb_nanoseconds: int = 130,
+    slowdown_gpio: int = 1,
+    gpio_write_ns: float = GPIO_WRITE_NS,
+) -> RefreshTiming:
+    """Model the duration of one full refresh of the panel."""
+    # -1 selects a memory barrier instead of dummy writes; about one write.
+    delay = 1 if slowdown_gpio < 0 else slowdown_gpio
+    column_ns = (WRITES_PER_COLUMN + DELAYS_PER_COLUMN * delay) * gpio_write_ns
+    latch_ns = (WRITES_PER_LATCH + DELAYS_PER_LATCH * delay) * gpio_write_ns
+    shift_ns = cols * chain_length * column_ns
+    row_ns = sum(
+        max(shift_ns, pwm_lsb_nanoseconds << bit) + latch_ns
+        for bit in range(pwm_bits)
+    )
+    return RefreshTiming(
+        pwm_bits=pwm_bits,
+        shift_us=shift_ns / 1000,
+        row_us=row_ns / 1000,
+        frame_us=rows // 2 * row_ns / 1000,
+    )
+
+
+def max_pwm_bits(target_hz: float, **panel) -> int | None:
+    """Highest pwm_bits whose refresh reaches target_hz, or None if none does.
+
+    Takes the refresh_timing() arguments other than pwm_bits.
+    """
+    for bits in range(MAX_PWM_BITS, 0, -1):
+        if refresh_timing(pwm_bits=bits, **panel).max_hz >= target_hz:
+            return bits
+    return None
+
+
+def frame_budget(refresh_hz: float, fps: float) -> tuple[int, float]:
+    """Frames paced with SwapOnVSync(framerate_fraction=n) to at most fps.
+
+    Returns n and the render time available per frame in milliseconds.
+    """
+    fraction = max(1, math.ceil(refresh_hz / fps))
+    return fraction, fraction / refresh_hz * 1000
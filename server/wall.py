@@ -0,0 +1,539 @@
+"""Synchronized frame distribution for walls tiled from several matrices.
+
+Scenes started independently on each Pi drift apart. Instead, one leader
+renders the whole wall and sends every follower its tile together with the
+time it should appear, a fixed lead time after rendering. Followers track the
+leader's clock with an NTP-style ping exchange and swap the tile in with
+SwapOnVSync() at that time. They then report back when they did, so the
+leader can tell how far apart the nodes were (skew) and how long tiles took
+to arrive (latency).
+
+Nodes don't share a refresh clock, so two panels still show a frame up to
+one refresh period apart, plus the clock error (at most half the round trip).
+A follower starts its swap half a refresh period early to center that window
+on the target time.
+
+All packets are UDP datagrams, little-endian, times in microseconds:
+
+    tile    magic "PXTL", flags, leader session, sequence number,
+            presentation time (leader clock), x, y, width, height, then raw
+            or run-length-encoded RGB (see server.streaming)
+    sync    magic "PXCK", t0 (follower send), t1 (leader receive),
+            t2 (leader send)
+    report  magic "PXRP", sequence number, received and presented
+            (both converted to the leader clock)
+
+Trying it with three processes on one host:
+
+    python -m server.wall follower --port 7801 &
+    python -m server.wall follower --port 7802 &
+    python -m server.wall leader --width 128 --height 32 \\
+        --node 127.0.0.1:7801@0,0 --node 127.0.0.1:7802@64,0
+
+A leader picks a random session id when it starts. When tiles arrive with a
+new one, the leader was restarted: followers drop what they have pending,
+accept its sequence numbers from scratch and sync their clock again. Tiles
+still arriving from the session before are ignored.
+
+On a Pi, the wall scene (server.displays.wall) is the follower.
+"""
+
+import argparse
+import secrets
+import selectors
+import socket
+import struct
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from server.streaming import MAX_DATAGRAM, rle_decode, rle_encode, seq_newer, test_pattern
+
+TILE_HEADER = struct.Struct("<4sBIIqHHHH")
+SYNC = struct.Struct("<4sqqq")
+REPORT = struct.Struct("<4sIqq")
+TILE_MAGIC = b"PXTL"
+SYNC_MAGIC = b"PXCK"
+REPORT_MAGIC = b"PXRP"
+
+FLAG_RLE = 0x01
+
+DEFAULT_LEADER_PORT = 7800
+DEFAULT_FOLLOWER_PORT = 7801
+DEFAULT_LEAD_MS = 50.0
+
+# Frames the leader remembers for matching reports.
+HISTORY = 256
+
+
+def now_us() -> int:
+    return time.monotonic_ns() // 1000
+
+
+@dataclass
+class RunningStat:
+    count: int = 0
+    last: float = 0.0
+    max: float = 0.0
+    _sum: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.count if self.count else 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.last = value
+        self.max = value if self.count == 1 else max(self.max, value)
+        self._sum += value
+
+
+@dataclass(frozen=True)
+class Tile:
+    host: str
+    port: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @classmethod
+    def parse(cls, spec: str, width: int, height: int) -> "Tile":
+        """Parse "host:port@x,y" for a tile of width x height pixels."""
+        try:
+            address, origin = spec.split("@")
+            host, port = address.rsplit(":", 1)
+            x, y = origin.split(",")
+            return cls(host, int(port), int(x), int(y), width, height)
+        except ValueError:
+            raise ValueError(f"Expected host:port@x,y, got {spec!r}") from None
+
+
+def encode_tile(rgb: bytes, wall_width: int, tile: Tile, session: int, seq: int,
+                present_at_us: int, rle: bool = False) -> bytes:
+    """Cut tile out of a wall_width wide RGB frame and pack it."""
+    row = tile.width * 3
+    pixels = b"".join(
+        rgb[((tile.y + r) * wall_width + tile.x) * 3:][:row] for r in range(tile.height)
+    )
+    payload = rle_encode(pixels) if rle else pixels
+    header = TILE_HEADER.pack(TILE_MAGIC, FLAG_RLE if rle else 0, session,
+                              seq & 0xFFFFFFFF, present_at_us, tile.x, tile.y, tile.width, tile.height)
+    packet = header + payload
+    if len(packet) > MAX_DATAGRAM:
+        raise ValueError(f"Tile packet of {len(packet)} bytes does not fit a datagram")
+    return packet
+
+
+@dataclass
+class TileFrame:
+    session: int
+    seq: int
+    present_at_us: int   # Leader clock.
+    received_us: int     # Local clock.
+    width: int
+    height: int
+    rgb: bytes
+
+
+def decode_tile(packet: bytes, received_us: int) -> TileFrame:
+    if len(packet) < TILE_HEADER.size:
+        raise ValueError("Packet shorter than header")
+    magic, flags, session, seq, present_at_us, _, _, width, height = (
+        TILE_HEADER.unpack_from(packet))
+    if magic != TILE_MAGIC:
+        raise ValueError("Bad magic")
+    payload = packet[TILE_HEADER.size:]
+    size = width * height * 3
+    if flags & FLAG_RLE:
+        rgb = rle_decode(payload, size)
+    elif len(payload) == size:
+        rgb = bytes(payload)
+    else:
+        raise ValueError(f"Raw payload is {len(payload)} bytes, expected {size}")
+    return TileFrame(session, seq, present_at_us, received_us, width, height, rgb)
+
+
+class ClockSync:
+    """Offset of the leader's clock from the local one, from ping round trips.
+
+    Queueing only ever makes a round trip longer and skews its offset, so of
+    the last `window` samples the one with the shortest round trip is used.
+    """
+
+    def __init__(self, window: int = 8) -> None:
+        self._samples: deque[tuple[int, float]] = deque(maxlen=window)
+
+    def reset(self) -> None:
+        self._samples.clear()
+
+    @property
+    def samples(self) -> int:
+        return len(self._samples)
+
+    @property
+    def offset_us(self) -> float:
+        return min(self._samples)[1] if self._samples else 0.0
+
+    @property
+    def rtt_us(self) -> int:
+        return min(self._samples)[0] if self._samples else 0
+
+    def add(self, t0: int, t1: int, t2: int, t3: int) -> None:
+        rtt = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        self._samples.append((rtt, offset))
+
+    def to_local(self, leader_us: int) -> int:
+        return int(leader_us - self.offset_us)
+
+    def to_leader(self, local_us: int) -> int:
+        return int(local_us + self.offset_us)
+
+
+@dataclass
+class WallStats:
+    frames_sent: int = 0
+    reports: int = 0
+    incomplete: int = 0   # Frames not every node reported.
+    skew_ms: RunningStat = field(default_factory=RunningStat)
+    latency_ms: RunningStat = field(default_factory=RunningStat)
+    lateness_ms: RunningStat = field(default_factory=RunningStat)
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "sent": self.frames_sent,
+            "reports": self.reports,
+            "incomplete": self.incomplete,
+            "skew_ms": round(self.skew_ms.mean, 2),
+            "max_skew_ms": round(self.skew_ms.max, 2),
+            "latency_ms": round(self.latency_ms.mean, 2),
+            "max_latency_ms": round(self.latency_ms.max, 2),
+            "lateness_ms": round(self.lateness_ms.mean, 2),
+            "max_lateness_ms": round(self.lateness_ms.max, 2),
+        }
+
+
+class WallLeader:
+    """Sends wall frames to the followers and answers their clock pings."""
+
+    def __init__(self, width: int, height: int, tiles: list[Tile],
+                 host: str = "0.0.0.0", port: int = DEFAULT_LEADER_PORT,
+                 lead_ms: float = DEFAULT_LEAD_MS, rle: bool = False) -> None:
+        for tile in tiles:
+            if tile.x + tile.width > width or tile.y + tile.height > height:
+                raise ValueError(f"Tile at {tile.x},{tile.y} reaches outside the wall")
+        self.width = width
+        self.height = height
+        self.lead_us = int(lead_ms * 1000)
+        self.rle = rle
+        self.session = secrets.randbits(32)
+        self.seq = 0
+        self.stats = WallStats()
+        # Reports come from the address the tiles go to.
+        self._nodes = {(socket.gethostbyname(t.host), t.port): t for t in tiles}
+        self._sent: OrderedDict[int, tuple[int, int]] = OrderedDict()
+        self._presented: dict[int, dict[tuple[str, int], int]] = {}
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.sock, selectors.EVENT_READ)
+
+    def send(self, rgb: bytes, present_at_us: int | None = None) -> int:
+        """Send every node its tile of a full wall frame; returns its seq."""
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        sent_us = now_us()
+        if present_at_us is None:
+            present_at_us = sent_us + self.lead_us
+        for address, tile in self._nodes.items():
+            packet = encode_tile(rgb, self.width, tile, self.session, self.seq,
+                                 present_at_us, self.rle)
+            self.sock.sendto(packet, address)
+        self.stats.frames_sent += 1
+
+        self._sent[self.seq] = (sent_us, present_at_us)
+        if len(self._sent) > HISTORY:
+            oldest, _ = self._sent.popitem(last=False)
+            if self._presented.pop(oldest, None) is not None:
+                self.stats.incomplete += 1
+        return self.seq
+
+    def _record(self, address: tuple[str, int], seq: int,
+                received_us: int, presented_us: int) -> None:
+        if address not in self._nodes or seq not in self._sent:
+            return
+        sent_us, present_at_us = self._sent[seq]
+        self.stats.reports += 1
+        self.stats.latency_ms.add((received_us - sent_us) / 1000)
+        self.stats.lateness_ms.add((presented_us - present_at_us) / 1000)
+        presented = self._presented.setdefault(seq, {})
+        presented[address] = presented_us
+        if len(presented) == len(self._nodes):
+            del self._presented[seq]
+            self.stats.skew_ms.add((max(presented.values()) - min(presented.values())) / 1000)
+
+    def poll(self, timeout: float | None = 0) -> None:
+        """Answer pings and collect reports, waiting up to timeout for traffic."""
+        if not self._selector.select(timeout):
+            return
+        while True:
+            try:
+                packet, address = self.sock.recvfrom(MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            received_us = now_us()
+            if len(packet) == SYNC.size and packet[:4] == SYNC_MAGIC:
+                _, t0, _, _ = SYNC.unpack(packet)
+                self.sock.sendto(SYNC.pack(SYNC_MAGIC, t0, received_us, now_us()), address)
+            elif len(packet) == REPORT.size and packet[:4] == REPORT_MAGIC:
+                _, seq, received, presented = REPORT.unpack(packet)
+                self._record(address, seq, received, presented)
+
+    def close(self) -> None:
+        self._selector.close()
+        self.sock.close()
+
+
+@dataclass
+class FollowerStats:
+    received: int = 0
+    presented: int = 0
+    late: int = 0                 # Arrived after its presentation time.
+    dropped_superseded: int = 0
+    invalid: int = 0
+    leader_restarts: int = 0
+    lateness_ms: RunningStat = field(default_factory=RunningStat)
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "received": self.received,
+            "presented": self.presented,
+            "late": self.late,
+            "dropped": self.dropped_superseded,
+            "invalid": self.invalid,
+            "restarts": self.leader_restarts,
+            "lateness_ms": round(self.lateness_ms.mean, 2),
+            "max_lateness_ms": round(self.lateness_ms.max, 2),
+        }
+
+
+class WallFollower:
+    """Receives one tile of the wall and tells when each frame is due."""
+
+    def __init__(self, leader_host: str, width: int, height: int,
+                 host: str = "0.0.0.0", port: int = DEFAULT_FOLLOWER_PORT,
+                 leader_port: int = DEFAULT_LEADER_PORT,
+                 sync_interval: float = 1.0) -> None:
+        self.width = width
+        self.height = height
+        self.leader = (socket.gethostbyname(leader_host), leader_port)
+        self.sync_interval = sync_interval
+        self.clock = ClockSync()
+        self.stats = FollowerStats()
+        self._pending: deque[TileFrame] = deque()
+        self._session: int | None = None
+        self._previous_session: int | None = None
+        self._last_seq: int | None = None
+        self._next_sync = 0.0
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.sock, selectors.EVENT_READ)
+
+    @property
+    def synced(self) -> bool:
+        return self.clock.samples > 0
+
+    def summary(self) -> dict[str, float]:
+        return {
+            **self.stats.summary(),
+            "offset_ms": round(self.clock.offset_us / 1000, 3),
+            "rtt_ms": round(self.clock.rtt_us / 1000, 3),
+        }
+
+    def _sync(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        self.sock.sendto(SYNC.pack(SYNC_MAGIC, now_us(), 0, 0), self.leader)
+        # Fill the sample window quickly, then just follow the drift.
+        filling = self.clock.samples < 4
+        self._next_sync = now + (self.sync_interval / 10 if filling else self.sync_interval)
+
+    def _accept(self, packet: bytes, received_us: int) -> None:
+        if len(packet) == SYNC.size and packet[:4] == SYNC_MAGIC:
+            _, t0, t1, t2 = SYNC.unpack(packet)
+            self.clock.add(t0, t1, t2, received_us)
+            return
+        try:
+            frame = decode_tile(packet, received_us)
+        except ValueError:
+            self.stats.invalid += 1
+            return
+        if (frame.width, frame.height) != (self.width, self.height):
+            self.stats.invalid += 1
+            return
+        if frame.session != self._session:
+            if frame.session == self._previous_session:
+                self.stats.invalid += 1
+                return
+            self._new_session(frame.session)
+        if self._last_seq is not None and not seq_newer(frame.seq, self._last_seq):
+            self.stats.invalid += 1
+            return
+        self._last_seq = frame.seq
+        self.stats.received += 1
+        if self.synced and self.clock.to_local(frame.present_at_us) < received_us:
+            self.stats.late += 1
+        self._pending.append(frame)
+
+    def _new_session(self, session: int) -> None:
+        """Start over with a (re)started leader: its clock and counter are new."""
+        if self._session is not None:
+            self.stats.leader_restarts += 1
+            self.clock.reset()
+            self._pending.clear()
+            self._next_sync = 0.0
+        self._previous_session = self._session
+        self._session = session
+        self._last_seq = None
+
+    def time_until_due(self, margin_us: int = 0) -> float | None:
+        """Seconds until the next frame is due, None if there is none."""
+        if not self._pending or not self.synced:
+            return None
+        due = self.clock.to_local(self._pending[0].present_at_us) - margin_us
+        return max(0.0, (due - now_us()) / 1e6)
+
+    def poll(self, timeout: float | None = None) -> None:
+        """Ping the leader when it's time, wait up to timeout for packets."""
+        self._sync()
+        until_sync = max(0.0, self._next_sync - time.monotonic())
+        timeout = until_sync if timeout is None else min(timeout, until_sync)
+        if not self._selector.select(timeout):
+            return
+        while True:
+            try:
+                packet = self.sock.recv(MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            self._accept(packet, now_us())
+
+    def due(self, margin_us: int = 0) -> TileFrame | None:
+        """The newest frame due within margin_us; older due frames are dropped."""
+        if not self.synced:
+            return None
+        limit = now_us() + margin_us
+        frame = None
+        while self._pending and self.clock.to_local(self._pending[0].present_at_us) <= limit:
+            if frame is not None:
+                self.stats.dropped_superseded += 1
+            frame = self._pending.popleft()
+        return frame
+
+    def presented(self, frame: TileFrame, presented_us: int) -> None:
+        """Record that frame went on the panel at presented_us (local clock)."""
+        self.stats.presented += 1
+        self.stats.lateness_ms.add(
+            (presented_us - self.clock.to_local(frame.present_at_us)) / 1000)
+        self.sock.sendto(REPORT.pack(REPORT_MAGIC, frame.seq,
+                                     self.clock.to_leader(frame.received_us),
+                                     self.clock.to_leader(presented_us)),
+                         self.leader)
+
+    def close(self) -> None:
+        self._selector.close()
+        self.sock.close()
+
+
+def run_leader(args: argparse.Namespace) -> None:
+    tiles = [Tile.parse(spec, args.tile_width, args.tile_height) for spec in args.node]
+    leader = WallLeader(args.width, args.height, tiles, port=args.port,
+                        lead_ms=args.lead_ms, rle=args.rle)
+    period = 1.0 / args.fps
+    start = next_frame = time.monotonic()
+    next_report = start + args.stats_interval
+    try:
+        while args.duration <= 0 or time.monotonic() - start < args.duration:
+            leader.poll(max(0.0, next_frame - time.monotonic()))
+            now = time.monotonic()
+            if now >= next_frame:
+                leader.send(test_pattern(args.width, args.height, now - start))
+                next_frame = max(next_frame + period, now)
+            if args.stats_interval > 0 and now >= next_report:
+                print("leader:", leader.stats.summary(), flush=True)
+                next_report = now + args.stats_interval
+        # Collect the reports of the last frames.
+        deadline = time.monotonic() + 2 * args.lead_ms / 1000 + 0.1
+        while time.monotonic() < deadline:
+            leader.poll(0.01)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("leader:", leader.stats.summary(), flush=True)
+        leader.close()
+
+
+def run_follower(args: argparse.Namespace) -> None:
+    """A follower without a matrix: frames count as shown when they are due."""
+    follower = WallFollower(args.leader, args.width, args.height, port=args.port,
+                            leader_port=args.leader_port)
+    start = time.monotonic()
+    next_report = start + args.stats_interval
+    try:
+        while args.duration <= 0 or time.monotonic() - start < args.duration:
+            follower.poll(follower.time_until_due())
+            frame = follower.due()
+            if frame is not None:
+                follower.presented(frame, now_us())
+            if args.stats_interval > 0 and time.monotonic() >= next_report:
+                print(f"follower {args.port}:", follower.summary(), flush=True)
+                next_report = time.monotonic() + args.stats_interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"follower {args.port}:", follower.summary(), flush=True)
+        follower.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Synchronized tiled wall over UDP")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="Seconds to run, 0 for ever")
+    parser.add_argument("--stats-interval", type=float, default=5.0)
+    roles = parser.add_subparsers(dest="role", required=True)
+
+    leader = roles.add_parser("leader", help="Render a test pattern and send the tiles")
+    leader.add_argument("--port", type=int, default=DEFAULT_LEADER_PORT)
+    leader.add_argument("--width", type=int, required=True)
+    leader.add_argument("--height", type=int, required=True)
+    leader.add_argument("--node", action="append", required=True,
+                        help="Follower and its tile origin as host:port@x,y")
+    leader.add_argument("--tile-width", type=int, default=64)
+    leader.add_argument("--tile-height", type=int, default=32)
+    leader.add_argument("--fps", type=float, default=30.0)
+    leader.add_argument("--lead-ms", type=float, default=DEFAULT_LEAD_MS)
+    leader.add_argument("--rle", action="store_true", help="Run-length encode tiles")
+
+    follower = roles.add_parser("follower", help="Receive a tile without a matrix")
+    follower.add_argument("--leader", default="127.0.0.1")
+    follower.add_argument("--leader-port", type=int, default=DEFAULT_LEADER_PORT)
+    follower.add_argument("--port", type=int, default=DEFAULT_FOLLOWER_PORT)
+    follower.add_argument("--width", type=int, default=64)
+    follower.add_argument("--height", type=int, default=32)
+
+    args = parser.parse_args()
+    if args.role == "leader":
+        run_leader(args)
+    else:
+        run_follower(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -209,6 +209,7 @@ static int usage(const char *progname) {
 
   fprintf(stderr, "Options:\n"
           "\t-O<streamfile>            : Output to stream-file instead of matrix (Don't need to be root).\n"
+          "\t-K<keyframe-interval>     : With -O: compress the stream, with a keyframe every this many frames.\n"
           "\t-C                        : Center images.\n"
           "\t-m                        : if this is a stream, mmap() it. This can work around IO latencies in SD-card and refilling kernel buffers. This will use physical memory so only use if you have enough to map file size\n"
 
@@ -284,9 +285,10 @@ int main(int argc, char *argv[]) {
   }
 
   const char *stream_output = NULL;
+  int keyframe_interval = 0;
 
   int opt;
-  while ((opt = getopt(argc, argv, "w:t:l:fr:c:P:LhCR:sO:V:D:m")) != -1) {
+  while ((opt = getopt(argc, argv, "w:t:l:fr:c:P:LhCR:sO:K:V:D:m")) != -1) {
     switch (opt) {
     case 'w':
       img_param.wait_ms = roundf(atof(optarg) * 1000.0f);
@@ -337,6 +339,9 @@ int main(int argc, char *argv[]) {
     case 'O':
       stream_output = strdup(optarg);
       break;
+    case 'K':
+      keyframe_interval = atoi(optarg);
+      break;
     case 'V':
       img_param.vsync_multiple = atoi(optarg);
       if (img_param.vsync_multiple < 1) img_param.vsync_multiple = 1;
@@ -384,7 +389,8 @@ int main(int argc, char *argv[]) {
       return 1;
     }
     stream_io = new rgb_matrix::FileStreamIO(fd);
-    global_stream_writer = new rgb_matrix::StreamWriter(stream_io);
+    global_stream_writer = new rgb_matrix::StreamWriter(stream_io,
+                                                        keyframe_interval);
   }
 
   const tmillis_t start_load = GetTimeInMillis();
@@ -95,6 +95,7 @@ static int usage(const char *progname, const char *msg = NULL) {
   fprintf(stderr, "Options:\n"
           "\t-F                 : Full screen without black bars; aspect ratio might suffer\n"
           "\t-O<streamfile>     : Output to stream-file instead of matrix (don't need to be root).\n"
+          "\t-K<interval>       : With -O: compress the stream, with a keyframe every <interval> frames.\n"
           "\t-s <count>         : Skip these number of frames in the beginning.\n"
           "\t-c <count>         : Only show this number of frames (excluding skipped frames).\n"
           "\t-V<vsync-multiple> : Instead of native video framerate, playback framerate\n"
@@ -178,11 +179,12 @@ int main(int argc, char *argv[]) {
   bool forever = false;
   unsigned thread_count = 1;
   int stream_output_fd = -1;
+  int keyframe_interval = 0;
   unsigned int frame_skip = 0;
   int64_t framecount_limit = INT64_MAX;
 
   int opt;
-  while ((opt = getopt(argc, argv, "vO:R:Lfc:s:FV:T:")) != -1) {
+  while ((opt = getopt(argc, argv, "vO:K:R:Lfc:s:FV:T:")) != -1) {
     switch (opt) {
     case 'v':
       verbose = true;
@@ -197,6 +199,9 @@ int main(int argc, char *argv[]) {
         return 1;
       }
       break;
+    case 'K':
+      keyframe_interval = atoi(optarg);
+      break;
     case 'L':
       fprintf(stderr, "-L is deprecated. Use\n\t--led-pixel-mapper=\"U-mapper\" --led-chain=4\ninstead.\n");
       return 1;
@@ -250,7 +255,7 @@ int main(int argc, char *argv[]) {
   StreamWriter *stream_writer = NULL;
   if (stream_output_fd >= 0) {
     stream_io = new rgb_matrix::FileStreamIO(stream_output_fd);
-    stream_writer = new StreamWriter(stream_io);
+    stream_writer = new StreamWriter(stream_io, keyframe_interval);
     if (forever) {
       fprintf(stderr, "-f (forever) doesn't make sense with -O; disabling\n");
       forever = false;